@@ -0,0 +1,65 @@
+# accounts.py
+#
+# 多账号配置：config.ACCOUNTS 为账号列表，每项至少包含 mid，
+# 可选 cookie / name / intro / avatar / device（墨水屏设备名，决定渲染输出目录）。
+# 未配置 ACCOUNTS 时沿用单账号配置（MY_MID / BILI_COOKIE / ACCOUNT_NAME / ...），行为与原来一致。
+# 列表中的第一个账号为默认账号：接口未带 ?mid= 时使用它，旧数据迁移时也归属于它。
+
+from typing import Any, Dict, List
+
+import config
+
+
+def _normalize(raw: Dict[str, Any]) -> Dict[str, Any]:
+    mid = str(raw.get("mid") or "").strip()
+    if not mid:
+        raise ValueError(f"ACCOUNTS 中的账号缺少 mid: {raw!r}")
+    return {
+        "mid": mid,
+        "cookie": raw.get("cookie") or getattr(config, "BILI_COOKIE", ""),
+        "name": raw.get("name") or mid,
+        "intro": raw.get("intro") or "",
+        "avatar": raw.get("avatar") or "",
+        "device": str(raw.get("device") or mid),
+    }
+
+
+def load_accounts() -> List[Dict[str, Any]]:
+    raw_accounts = getattr(config, "ACCOUNTS", None)
+    if not raw_accounts:
+        raw_accounts = [{
+            "mid": getattr(config, "MY_MID", ""),
+            "cookie": getattr(config, "BILI_COOKIE", ""),
+            "name": getattr(config, "ACCOUNT_NAME", ""),
+            "intro": getattr(config, "ACCOUNT_INTRO", ""),
+            "avatar": getattr(config, "AVATAR_PATH", ""),
+        }]
+
+    accounts: List[Dict[str, Any]] = []
+    seen = set()
+    for raw in raw_accounts:
+        acc = _normalize(raw)
+        if acc["mid"] in seen:
+            raise ValueError(f"ACCOUNTS 中的 mid 重复: {acc['mid']}")
+        seen.add(acc["mid"])
+        accounts.append(acc)
+    return accounts
+
+
+ACCOUNTS = load_accounts()
+DEFAULT_MID = ACCOUNTS[0]["mid"]
+
+
+def get_account(mid: str | int | None = None) -> Dict[str, Any]:
+    """
+    按 mid 取账号配置，mid 为空时返回默认账号；未配置的 mid 抛出 KeyError。
+    """
+    key = str(mid) if mid not in (None, "") else DEFAULT_MID
+    for acc in ACCOUNTS:
+        if acc["mid"] == key:
+            return acc
+    raise KeyError(key)
+
+
+def resolve_mid(mid: str | int | None = None) -> str:
+    return str(mid) if mid not in (None, "") else DEFAULT_MID
@@ -0,0 +1,498 @@
+# analytics.py
+#
+# 分析型查询：涨幅榜（top movers）、发布后第 N 天的 cohort 曲线、全站分位数、互动率排行、播放异常。
+# 安装了 duckdb 时，通过 DuckDB 的 sqlite 扩展直接 ATTACH biliinsights.db 做列式计算；
+# 未安装（或 ATTACH 失败）时自动回退到 SQLite + NumPy，接口与返回结构完全一致。
+# 所有查询按账号（mid，默认账号）过滤。
+
+import threading
+import warnings
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+from accounts import resolve_mid
+from cohort import COHORT_MAX_DAYS
+from db import (
+    DB_PATH,
+    ENGAGEMENT_RATES,
+    VIDEO_DAILY_SQL,
+    get_conn,
+    get_data_version,
+    iter_latest_video_snapshots,
+)
+
+try:
+    import duckdb
+except ImportError:  # duckdb 为可选依赖
+    duckdb = None
+
+
+VIDEO_METRICS = ("view", "like", "coin", "favorite", "reply", "danmaku", "share")
+RANKING_METRICS = VIDEO_METRICS + tuple(ENGAGEMENT_RATES)
+DEFAULT_PERCENTILES = (25, 50, 75, 90)
+
+# 日粒度视频快照（每天最后一次采样）
+_VIDEO_DAILY = f"({VIDEO_DAILY_SQL}) AS daily"
+
+_duck_conn = None
+_duck_lock = threading.Lock()
+_duck_failed = False
+
+
+def _check_metric(metric: str) -> str:
+    if metric not in VIDEO_METRICS:
+        raise ValueError(f"unsupported metric: {metric!r}")
+    return metric
+
+
+def _get_duck_conn():
+    """
+    懒加载一个进程内共享的 DuckDB 连接，并以只读方式 ATTACH SQLite 数据库。
+    失败一次后本进程不再尝试，直接走 SQLite。
+    """
+    global _duck_conn, _duck_failed
+    if duckdb is None or _duck_failed:
+        return None
+    if _duck_conn is not None:
+        return _duck_conn
+
+    with _duck_lock:
+        if _duck_conn is not None:
+            return _duck_conn
+        try:
+            conn = duckdb.connect()
+            conn.execute("INSTALL sqlite; LOAD sqlite;")
+            conn.execute(
+                "ATTACH ? AS bili (TYPE SQLITE, READ_ONLY);",
+                [str(DB_PATH.resolve())],
+            )
+            conn.execute("USE bili;")
+            _duck_conn = conn
+        except Exception as e:
+            print(f"[analytics] DuckDB 初始化失败，回退到 SQLite: {e!r}")
+            _duck_failed = True
+            return None
+    return _duck_conn
+
+
+def get_backend() -> str:
+    return "duckdb" if _get_duck_conn() is not None else "sqlite"
+
+
+def _resolve_backend(backend: str | None) -> str:
+    if backend == "duckdb" and _get_duck_conn() is None:
+        return "sqlite"
+    return backend or get_backend()
+
+
+def _query(sql: str, params: Sequence[Any] = (), backend: str | None = None) -> List[Dict[str, Any]]:
+    backend = _resolve_backend(backend)
+    if backend == "duckdb":
+        cur = _get_duck_conn().cursor()
+        try:
+            cur.execute(sql, list(params))
+            cols = [c[0] for c in cur.description]
+            return [dict(zip(cols, row)) for row in cur.fetchall()]
+        finally:
+            cur.close()
+
+    conn = get_conn()
+    try:
+        cur = conn.cursor()
+        cur.execute(sql, tuple(params))
+        return [dict(r) for r in cur.fetchall()]
+    finally:
+        conn.close()
+
+
+def _latest_video_date(mid: str, backend: str | None = None) -> str | None:
+    rows = _query("SELECT MAX(snapshot_date) AS d FROM video_snapshots WHERE mid = ?;", (mid,), backend)
+    return rows[0]["d"] if rows and rows[0]["d"] else None
+
+
+def _percentiles(values: np.ndarray, ps: Sequence[int]) -> Dict[str, float]:
+    if values.size == 0:
+        return {f"p{p}": None for p in ps}
+    qs = np.percentile(values, ps)
+    return {f"p{p}": float(q) for p, q in zip(ps, qs)}
+
+
+# ==========================
+# 涨幅榜
+# ==========================
+
+def movers(metric: str = "view",
+           window: int = 1,
+           limit: int = 10,
+           mid: str | None = None,
+           backend: str | None = None) -> Dict[str, Any]:
+    """
+    全部视频在最近 window 天内的 metric 增量，返回增量最大（top）与最小（bottom）的各 limit 条。
+
+    单次查询完成：只扫描最新快照日与基准日（window 天前或更早的最近一个快照日）两天的数据
+    （走 (mid, snapshot_date) 索引），ROW_NUMBER 取每个视频每天的最后一次采样，
+    LAG 把基准日与最新日配成一行求差，再用两个排名窗口同时截取首尾。
+    基准日缺少采样时，仅在基准日之后发布的视频按 0 起算，其余视频不参与排行。
+    """
+    metric = _check_metric(metric)
+    if window < 1:
+        raise ValueError(f"window must be >= 1: {window!r}")
+    backend = _resolve_backend(backend)
+    mid = resolve_mid(mid)
+    limit = max(int(limit), 0)
+
+    latest = _latest_video_date(mid, backend)
+    if latest is None:
+        return {"metric": metric, "window": window, "snapshot_date": None, "top": [], "bottom": []}
+    cutoff_day = date.fromisoformat(latest) - timedelta(days=window)
+    # 基准日结束时刻（次日本地 00:00，与 snapshot_date / snapshot_ts 的换算一致），
+    # 早于此发布且缺少基准采样的视频无法计算增量
+    next_day = cutoff_day + timedelta(days=1)
+    cutoff_ts = int(datetime(next_day.year, next_day.month, next_day.day).timestamp())
+
+    sql = f"""
+        WITH base_day AS (
+            SELECT MAX(snapshot_date) AS d
+            FROM video_snapshots
+            WHERE mid = ? AND snapshot_date <= ?
+        ),
+        ranked AS (
+            SELECT bvid, title, pubdate, snapshot_date, "{metric}" AS v,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY bvid, snapshot_date
+                       ORDER BY snapshot_ts DESC, id DESC
+                   ) AS rn
+            FROM video_snapshots
+            WHERE mid = ? AND (snapshot_date = ? OR snapshot_date = (SELECT d FROM base_day))
+        ),
+        paired AS (
+            SELECT bvid, title, pubdate, snapshot_date, v,
+                   LAG(v) OVER w AS base_v,
+                   LAG(snapshot_date) OVER w AS base_date
+            FROM ranked
+            WHERE rn = 1
+            WINDOW w AS (PARTITION BY bvid ORDER BY snapshot_date)
+        ),
+        deltas AS (
+            SELECT bvid, title, pubdate, snapshot_date, v AS value,
+                   COALESCE(v, 0) - COALESCE(base_v, 0) AS delta
+            FROM paired
+            WHERE snapshot_date = ?
+              AND (base_date IS NOT NULL OR COALESCE(pubdate, 0) >= ?)
+        ),
+        ordered AS (
+            SELECT *,
+                   ROW_NUMBER() OVER (ORDER BY delta DESC, bvid ASC) AS r_top,
+                   ROW_NUMBER() OVER (ORDER BY delta ASC, bvid ASC) AS r_bottom
+            FROM deltas
+        )
+        SELECT bvid, title, pubdate, snapshot_date, value, delta, r_top, r_bottom
+        FROM ordered
+        WHERE r_top <= ? OR r_bottom <= ?;
+    """
+    rows = _query(
+        sql,
+        (mid, cutoff_day.isoformat(), mid, latest, latest, cutoff_ts, limit, limit),
+        backend,
+    )
+
+    def pick(key: str) -> List[Dict[str, Any]]:
+        out = []
+        for r in sorted((r for r in rows if r[key] <= limit), key=lambda r: r[key]):
+            item = {k: r[k] for k in ("bvid", "title", "pubdate", "snapshot_date", "value", "delta")}
+            item["metric"] = metric
+            item["window"] = window
+            out.append(item)
+        return out
+
+    return {
+        "metric": metric,
+        "window": window,
+        "snapshot_date": latest,
+        "top": pick("r_top"),
+        "bottom": pick("r_bottom"),
+    }
+
+
+def top_movers(metric: str = "view",
+               window: int = 1,
+               limit: int = 10,
+               mid: str | None = None,
+               backend: str | None = None) -> List[Dict[str, Any]]:
+    """
+    最新快照相对 window 天前的增量，按增量倒序取前 limit 条（movers 的 top 部分）。
+    """
+    return movers(metric, window=window, limit=limit, mid=mid, backend=backend)["top"]
+
+
+# ==========================
+# cohort：发布后第 N 天
+# ==========================
+
+def cohort_curves(metric: str = "view",
+                  days: int = 30,
+                  bvid: str | None = None,
+                  percentiles: Sequence[int] = DEFAULT_PERCENTILES,
+                  mid: str | None = None,
+                  backend: str | None = None) -> Dict[str, Any]:
+    """
+    以“发布后第 N 天”为横轴，对该账号全部视频计算 metric 的分位数带；
+    若提供 bvid，额外返回该视频自身的曲线。
+    数据取自快照任务增量维护的 video_cohort 矩阵，读出后还原为 视频 × 天数 的 NumPy 矩阵
+    （缺少采样的格子为 NaN），各天的分位数沿列一次算出。
+    该矩阵已预先算好，始终直接从 SQLite 按主键区间读取，backend 参数仅为与其他查询保持一致。
+    """
+    metric = _check_metric(metric)
+    if days < 0 or days > COHORT_MAX_DAYS:
+        raise ValueError(f"days must be within 0..{COHORT_MAX_DAYS}: {days!r}")
+
+    conn = get_conn()
+    try:
+        conn.row_factory = None
+        rows = conn.execute(
+            f'SELECT bvid, age, "{metric}" FROM video_cohort WHERE mid = ? AND age <= ?;',
+            (resolve_mid(mid), days),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    n = len(rows)
+    index: Dict[str, int] = {}
+    video_idx = np.fromiter((index.setdefault(r[0], len(index)) for r in rows), dtype=np.int64, count=n)
+    ages = np.fromiter((r[1] for r in rows), dtype=np.int64, count=n)
+    vals = np.fromiter((r[2] or 0 for r in rows), dtype=np.float64, count=n)
+
+    matrix = np.full((len(index), days + 1), np.nan)
+    matrix[video_idx, ages] = vals
+
+    counts = np.count_nonzero(~np.isnan(matrix), axis=0)
+    if index:
+        with warnings.catch_warnings():
+            # 没有任何视频达到的天数整列为 NaN，结果按 None 返回
+            warnings.simplefilter("ignore", RuntimeWarning)
+            qs = np.nanpercentile(matrix, percentiles, axis=0)
+    else:
+        qs = np.full((len(percentiles), days + 1), np.nan)
+
+    bands: List[Dict[str, Any]] = []
+    for age in range(days + 1):
+        item: Dict[str, Any] = {"day": age, "count": int(counts[age])}
+        item.update({
+            f"p{p}": (float(qs[i, age]) if counts[age] else None)
+            for i, p in enumerate(percentiles)
+        })
+        bands.append(item)
+
+    target = None
+    if bvid:
+        pos = index.get(bvid)
+        row = matrix[pos] if pos is not None else np.full(days + 1, np.nan)
+        target = [
+            {"day": int(age), "value": int(row[age])}
+            for age in np.flatnonzero(~np.isnan(row))
+        ]
+
+    return {"metric": metric, "days": days, "bands": bands, "target": target}
+
+
+# ==========================
+# 全站分位数
+# ==========================
+
+def metric_percentiles(metric: str = "view",
+                       percentiles: Sequence[int] = DEFAULT_PERCENTILES,
+                       mid: str | None = None,
+                       backend: str | None = None) -> Dict[str, Any]:
+    """
+    最新快照日该账号所有视频 metric 的分位数。
+    """
+    metric = _check_metric(metric)
+    backend = _resolve_backend(backend)
+    mid = resolve_mid(mid)
+
+    latest = _latest_video_date(mid, backend)
+    if latest is None:
+        return {"metric": metric, "snapshot_date": None, "count": 0}
+
+    if backend == "duckdb":
+        qs = ", ".join(
+            f'quantile_cont("{metric}", {p / 100.0}) AS p{p}' for p in percentiles
+        )
+        rows = _query(
+            f"SELECT COUNT(*) AS count, {qs} FROM {_VIDEO_DAILY} WHERE mid = ? AND snapshot_date = ?;",
+            (mid, latest),
+            backend,
+        )
+        result = {k: (float(v) if k != "count" and v is not None else v) for k, v in rows[0].items()}
+    else:
+        rows = _query(
+            f'SELECT "{metric}" AS v FROM {_VIDEO_DAILY} WHERE mid = ? AND snapshot_date = ?;',
+            (mid, latest),
+            backend,
+        )
+        vals = np.fromiter((r["v"] or 0 for r in rows), dtype=np.float64, count=len(rows))
+        result = {"count": int(vals.size)}
+        result.update(_percentiles(vals, percentiles))
+
+    result.update({"metric": metric, "snapshot_date": latest})
+    return result
+
+
+# ==========================
+# 互动率排行
+# ==========================
+
+# 每个账号缓存一份最新快照的列式排行表，数据版本变化（有新采样）时重建
+_ranking_cache: Dict[str, Dict[str, Any]] = {}
+_ranking_lock = threading.Lock()
+
+
+def _percent_rank(values: np.ndarray) -> np.ndarray:
+    """
+    百分位排名：全部视频中取值不高于该视频的比例（0~100），相同取值排名相同。
+    """
+    if values.size == 0:
+        return values.astype(np.float64)
+    ordered = np.sort(values)
+    return np.searchsorted(ordered, values, side="right") * (100.0 / values.size)
+
+
+def _build_ranking_table(mid: str, version: str) -> Dict[str, Any]:
+    rows = iter_latest_video_snapshots(mid)
+    columns = next(rows, None)
+    data = list(rows) if columns is not None else []
+    idx = {name: i for i, name in enumerate(columns or ())}
+
+    n = len(data)
+    values: Dict[str, np.ndarray] = {}
+    for k in VIDEO_METRICS:
+        i = idx.get(k)
+        values[k] = np.fromiter((r[i] or 0 for r in data), dtype=np.float64, count=n)
+
+    for name, (nums, den) in ENGAGEMENT_RATES.items():
+        num = np.sum([values[k] for k in nums], axis=0) if n else np.zeros(0)
+        out = np.zeros(n, dtype=np.float64)
+        np.divide(num, values[den], out=out, where=values[den] > 0)
+        values[name] = out
+
+    text = {
+        k: [r[idx[k]] for r in data] if k in idx else [None] * n
+        for k in ("bvid", "title", "pubdate", "snapshot_date")
+    }
+    return {
+        "version": version,
+        "count": n,
+        "snapshot_date": max((d for d in text["snapshot_date"] if d), default=None),
+        "text": text,
+        "values": values,
+        "pct": {k: _percent_rank(v) for k, v in values.items()},
+    }
+
+
+def ranking_table(mid: str | None = None) -> Dict[str, Any]:
+    """
+    最新快照的列式排行表：各计数、互动率（ENGAGEMENT_RATES）与各指标的百分位排名均为 NumPy 数组，
+    一次性批量算出。按数据版本缓存，没有新采样时后续请求直接复用。
+    """
+    mid = resolve_mid(mid)
+    version = get_data_version(mid)
+    with _ranking_lock:
+        table = _ranking_cache.get(mid)
+        if table is None or table["version"] != version:
+            table = _build_ranking_table(mid, version)
+            _ranking_cache[mid] = table
+    return table
+
+
+def invalidate_ranking(version: str | None = None) -> None:
+    """
+    清空排行表缓存（daemon 数据变化后的缓存失效回调）。
+    """
+    with _ranking_lock:
+        _ranking_cache.clear()
+
+
+def video_ranking(metric: str = "engagement_rate",
+                  limit: int = 20,
+                  offset: int = 0,
+                  ascending: bool = False,
+                  min_view: int = 0,
+                  mid: str | None = None) -> Dict[str, Any]:
+    """
+    按 metric 对最新快照排序分页；每条附带全部计数、互动率及各指标在全账号中的百分位排名。
+    min_view 用于排除播放量过小、比率失真的视频。
+    """
+    if metric not in RANKING_METRICS:
+        raise ValueError(f"unsupported metric: {metric!r}")
+    table = ranking_table(mid)
+    values, pct, text = table["values"], table["pct"], table["text"]
+
+    candidates = np.flatnonzero(values["view"] >= min_view)
+    key = values[metric][candidates]
+    order = np.argsort(key if ascending else -key, kind="stable")
+    ranked = candidates[order]
+    page = ranked[max(offset, 0): max(offset, 0) + max(limit, 0)]
+
+    items = []
+    for rank, i in enumerate(page, start=max(offset, 0) + 1):
+        item: Dict[str, Any] = {
+            "rank": rank,
+            "bvid": text["bvid"][i],
+            "title": text["title"][i],
+            "pubdate": text["pubdate"][i],
+            "value": float(values[metric][i]),
+        }
+        item.update({k: int(values[k][i]) for k in VIDEO_METRICS})
+        item.update({k: float(values[k][i]) for k in ENGAGEMENT_RATES})
+        item["percentile"] = {k: round(float(pct[k][i]), 2) for k in RANKING_METRICS}
+        items.append(item)
+
+    return {
+        "metric": metric,
+        "snapshot_date": table["snapshot_date"],
+        "count": int(ranked.size),
+        "offset": max(offset, 0),
+        "items": items,
+    }
+
+
+# ==========================
+# 播放异常
+# ==========================
+
+def anomalies(snapshot_date: str | None = None,
+              limit: int = 50,
+              mid: str | None = None) -> Dict[str, Any]:
+    """
+    读取快照任务写入 anomalies 表的检测结果（默认最近一个有结果的快照日），按 z 分数从高到低排列，
+    每条附带未来 FORECAST_DAYS 天的播放预测。
+    """
+    mid = resolve_mid(mid)
+    if snapshot_date is not None:
+        date.fromisoformat(snapshot_date)
+
+    conn = get_conn()
+    try:
+        if snapshot_date is None:
+            row = conn.execute(
+                "SELECT MAX(snapshot_date) FROM anomalies WHERE mid = ?;", (mid,)
+            ).fetchone()
+            snapshot_date = row[0]
+        rows = conn.execute(
+            """
+            SELECT a.bvid, t.title, a.delta, a.baseline, a.scale, a.zscore,
+                   a.forecast_delta, a.forecast_view, a.forecast_days
+            FROM anomalies a
+            LEFT JOIN video_titles t ON t.mid = a.mid AND t.bvid = a.bvid
+            WHERE a.mid = ? AND a.snapshot_date = ?
+            ORDER BY a.zscore DESC
+            LIMIT ?;
+            """,
+            (mid, snapshot_date, max(limit, 0)),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    return {"snapshot_date": snapshot_date, "items": [dict(r) for r in rows]}
@@ -0,0 +1,223 @@
+# anomaly.py
+#
+# 播放增长异常检测与短期预测：每轮快照结束后，对账号下全部视频一次性计算。
+# 从 video_snapshots 读出截至快照日最近 LOOKBACK_DAYS 天、每天最后一次采样的播放数，
+# 还原为 视频 × 天数 的累计矩阵（未采样的格子为 NaN），换算为日均增量后：
+#   - 以快照日之前 BASELINE_DAYS 天增量的中位数 / MAD 作为稳健基线，计算快照日的修正 z 分数，
+#     超过 Z_THRESHOLD（且增量不少于 MIN_DELTA）记为异常，即“突然被推荐起量”；
+#   - 用带阻尼趋势的 Holt 指数平滑拟合日增量，外推未来 FORECAST_DAYS 天的播放。
+# 各步骤均沿视频维度向量化，只有 Holt 平滑按天循环。结果写入 anomalies 表，由 /api/analytics/anomalies 读取。
+
+import sqlite3
+import time
+import warnings
+from datetime import date, timedelta
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+# 读取的天数：基线 BASELINE_DAYS 天 + 快照日，再留出少量余量供 Holt 平滑预热
+LOOKBACK_DAYS = 35
+BASELINE_DAYS = 28
+# 基线内至少要有这么多个有效增量，否则（如刚发布的视频）不做判定
+MIN_BASELINE_POINTS = 5
+Z_THRESHOLD = 3.5
+MIN_DELTA = 100
+# MAD 换算为标准差的系数；MAD 为 0 时改用平均绝对偏差（换算系数 1.2533），尺度下限 1 次/天
+MAD_TO_SIGMA = 1.4826
+MEANAD_TO_SIGMA = 1.2533
+MIN_SCALE = 1.0
+
+FORECAST_DAYS = 7
+HOLT_ALPHA = 0.5
+HOLT_BETA = 0.2
+HOLT_PHI = 0.9
+
+
+def create_table(cur: sqlite3.Cursor) -> None:
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS anomalies (
+            mid TEXT NOT NULL,
+            snapshot_date TEXT NOT NULL,
+            bvid TEXT NOT NULL,
+            delta REAL,
+            baseline REAL,
+            scale REAL,
+            zscore REAL,
+            forecast_delta REAL,
+            forecast_view INTEGER,
+            forecast_days INTEGER,
+            detected_ts INTEGER,
+            PRIMARY KEY (mid, snapshot_date, bvid)
+        ) WITHOUT ROWID;
+        """
+    )
+
+
+def load_view_matrix(cur: sqlite3.Cursor,
+                     mid: str,
+                     end_date: str,
+                     days: int = LOOKBACK_DAYS) -> Tuple[List[str], np.ndarray]:
+    """
+    截至 end_date（含）最近 days 天的播放累计矩阵，每行一个视频，每列一天，取当天最后一次采样。
+    """
+    start = (date.fromisoformat(end_date) - timedelta(days=days - 1)).isoformat()
+    # 逐行转换为 Python 对象是主要开销：日期在 SQL 端换算为列号，各列再整体转为数组
+    cur.execute(
+        """
+        SELECT bvid, CAST(julianday(snapshot_date) - julianday(?) AS INTEGER),
+               COALESCE(view, 0), COALESCE(snapshot_ts, 0), id
+        FROM video_snapshots
+        WHERE mid = ? AND snapshot_date BETWEEN ? AND ?;
+        """,
+        (start, mid, start, end_date),
+    )
+    rows = cur.fetchall()
+    if not rows:
+        return [], np.empty((0, days))
+
+    bvid_col, day_col, view_col, ts_col, id_col = zip(*rows)
+    n = len(rows)
+    index: Dict[str, int] = {}
+    video_idx = np.array([index.setdefault(b, len(index)) for b in bvid_col], dtype=np.int64)
+    day_idx = np.array(day_col, dtype=np.int64)
+    vals = np.array(view_col, dtype=np.float64)
+    ts = np.array(ts_col, dtype=np.int64)
+    ids = np.array(id_col, dtype=np.int64)
+
+    # 同一格子有多次采样时取 (snapshot_ts, id) 最大的一条：按该顺序排序后保留每个格子的最后一次出现
+    order = np.lexsort((ids, ts))
+    cells = (video_idx * days + day_idx)[order]
+    _, last = np.unique(cells[::-1], return_index=True)
+    pick = order[n - 1 - last]
+
+    matrix = np.full((len(index), days), np.nan)
+    matrix[video_idx[pick], day_idx[pick]] = vals[pick]
+    return list(index), matrix
+
+
+def daily_rates(cum: np.ndarray) -> np.ndarray:
+    """
+    累计矩阵 → 日均增量矩阵：每个有采样的格子取与上一次采样之差除以间隔天数
+    （自适应轮询下老视频隔几天才采样一次），没有采样或此前无采样的格子为 NaN。
+    """
+    n, days = cum.shape
+    cols = np.arange(days)
+    observed = ~np.isnan(cum)
+    last_seen = np.maximum.accumulate(np.where(observed, cols, -1), axis=1)
+    prev = np.concatenate([np.full((n, 1), -1), last_seen[:, :-1]], axis=1)
+    valid = observed & (prev >= 0)
+
+    prev_vals = np.take_along_axis(cum, np.maximum(prev, 0), axis=1)
+    gaps = np.maximum(cols - prev, 1)
+    return np.where(valid, (cum - prev_vals) / gaps, np.nan)
+
+
+def robust_zscores(rates: np.ndarray, baseline_days: int = BASELINE_DAYS) -> Dict[str, np.ndarray]:
+    """
+    最后一列相对其之前 baseline_days 列的修正 z 分数：(x - 中位数) / 稳健尺度。
+    基线有效点不足 MIN_BASELINE_POINTS 或最后一天无采样时 z 为 NaN。
+    """
+    x = rates[:, -1]
+    base = rates[:, -1 - baseline_days:-1]
+    enough = np.count_nonzero(~np.isnan(base), axis=1) >= MIN_BASELINE_POINTS
+
+    with warnings.catch_warnings():
+        # 全为 NaN 的行（无基线）结果为 NaN，随后由 enough 屏蔽
+        warnings.simplefilter("ignore", RuntimeWarning)
+        median = np.nanmedian(base, axis=1)
+        dev = np.abs(base - median[:, None])
+        mad = np.nanmedian(dev, axis=1)
+        mean_ad = np.nanmean(dev, axis=1)
+
+    scale = np.where(mad > 0, mad * MAD_TO_SIGMA, mean_ad * MEANAD_TO_SIGMA)
+    scale = np.maximum(np.nan_to_num(scale), MIN_SCALE)
+    z = np.where(enough, (x - median) / scale, np.nan)
+    return {"value": x, "baseline": median, "scale": scale, "zscore": z}
+
+
+def holt_forecast(rates: np.ndarray, horizon: int = FORECAST_DAYS) -> np.ndarray:
+    """
+    带阻尼趋势的 Holt 指数平滑，对每行日增量同时拟合，返回未来 1..horizon 天的预测日增量（n × horizon，不小于 0）。
+    缺少采样的天只按趋势外推、不更新；整行没有有效增量时预测为 NaN。
+    """
+    n, days = rates.shape
+    level = np.full(n, np.nan)
+    trend = np.zeros(n)
+    for t in range(days):
+        x = rates[:, t]
+        has = ~np.isnan(x)
+        fresh = has & np.isnan(level)
+        update = has & ~fresh
+
+        predicted = level + HOLT_PHI * trend
+        new_level = HOLT_ALPHA * x + (1 - HOLT_ALPHA) * predicted
+        new_trend = HOLT_BETA * (new_level - level) + (1 - HOLT_BETA) * HOLT_PHI * trend
+
+        level = np.where(fresh, x, np.where(update, new_level, predicted))
+        trend = np.where(update, new_trend, np.where(fresh, 0.0, HOLT_PHI * trend))
+
+    damp = np.cumsum(HOLT_PHI ** np.arange(1, horizon + 1))
+    return np.maximum(level[:, None] + trend[:, None] * damp, 0.0)
+
+
+def score_matrix(cum: np.ndarray,
+                 baseline_days: int = BASELINE_DAYS,
+                 horizon: int = FORECAST_DAYS) -> Dict[str, np.ndarray]:
+    """
+    对累计矩阵做完整的一轮计算：最后一列的 z 分数、异常标记与短期预测。
+    """
+    rates = daily_rates(cum)
+    result = robust_zscores(rates, baseline_days)
+    forecast = holt_forecast(rates, horizon)
+
+    # 预测起点为每行最后一次采样的累计值
+    observed = ~np.isnan(cum)
+    last_col = cum.shape[1] - 1 - np.argmax(observed[:, ::-1], axis=1)
+    last_value = cum[np.arange(cum.shape[0]), last_col]
+
+    result["anomaly"] = (result["zscore"] >= Z_THRESHOLD) & (result["value"] >= MIN_DELTA)
+    result["forecast_delta"] = forecast[:, 0]
+    result["forecast_view"] = last_value + forecast.sum(axis=1)
+    return result
+
+
+def detect_anomalies(cur: sqlite3.Cursor,
+                     mid: str,
+                     snapshot_date: str,
+                     lookback: int = LOOKBACK_DAYS) -> Dict[str, Any]:
+    """
+    对某账号某快照日做一轮检测，重写 anomalies 表中该日的结果。返回检测统计。
+    """
+    t0 = time.perf_counter()
+    bvids, cum = load_view_matrix(cur, mid, snapshot_date, lookback)
+    cur.execute("DELETE FROM anomalies WHERE mid = ? AND snapshot_date = ?;", (mid, snapshot_date))
+    if not bvids:
+        return {"videos": 0, "anomalies": 0, "elapsed_ms": 0.0}
+
+    res = score_matrix(cum)
+    now = int(time.time())
+    hits = np.flatnonzero(res["anomaly"])
+    cur.executemany(
+        """
+        INSERT INTO anomalies (
+            mid, snapshot_date, bvid, delta, baseline, scale, zscore,
+            forecast_delta, forecast_view, forecast_days, detected_ts
+        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+        """,
+        [
+            (
+                mid, snapshot_date, bvids[i],
+                float(res["value"][i]), float(res["baseline"][i]), float(res["scale"][i]),
+                float(res["zscore"][i]), float(res["forecast_delta"][i]),
+                int(round(res["forecast_view"][i])), FORECAST_DAYS, now,
+            )
+            for i in hits
+        ],
+    )
+    return {
+        "videos": len(bvids),
+        "anomalies": int(hits.size),
+        "elapsed_ms": (time.perf_counter() - t0) * 1000,
+    }
@@ -1,22 +1,83 @@
 # app.py
 
-from flask import Flask, jsonify, request, send_from_directory, send_file
-import os
-from config import MY_MID
+from flask import Flask, Response, jsonify, request, send_from_directory
+import json
+from datetime import date
+import config
+from accounts import ACCOUNTS, get_account, resolve_mid
 from db import (
     init_db,
+    get_accounts,
+    get_data_version,
     get_latest_account_snapshot,
     get_last_two_account_snapshots,
     get_latest_video_snapshots,
+    iter_latest_video_snapshots,
     get_account_history,
     get_video_history,
+    search_videos,
 )
+import analytics
+import render_cache
+from render_targets import RENDER_TARGETS
+import series
+from daemon import Daemon, on_data_changed, read_status
+
+try:
+    import orjson
+except ImportError:  # 可选依赖，缺失时使用标准库 json 编码
+    orjson = None
 
 app = Flask(__name__)
 
 with app.app_context():
     init_db()
 
+# 进程内 daemon 每轮数据变化后清空内存缓存（见 daemon.on_data_changed）
+on_data_changed(render_cache.invalidate)
+on_data_changed(series.invalidate)
+on_data_changed(analytics.invalidate_ranking)
+
+
+def _mid_arg() -> str | None:
+    """
+    所有接口均支持 ?mid= 选择账号，未提供时为默认账号（config 中的第一个账号）。
+    """
+    return request.args.get("mid") or None
+
+
+# 流式 JSON 数组每次编码、写出的元素个数
+STREAM_CHUNK_ROWS = 200
+
+
+def _encode_list(items: list) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(items)
+    return json.dumps(items, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _stream_json_array(items) -> Response:
+    """
+    把可迭代的元素按 STREAM_CHUNK_ROWS 分批编码为 JSON 数组并逐块写出，
+    响应体不会在内存中整体构造，内存占用与元素总数无关。
+    items 应为生成器：它在响应开始写出时才被迭代，此时已离开请求上下文。
+    """
+    def generate():
+        yield b"["
+        sep = b""
+        batch = []
+        for item in items:
+            batch.append(item)
+            if len(batch) >= STREAM_CHUNK_ROWS:
+                yield sep + _encode_list(batch)[1:-1]
+                sep = b","
+                batch = []
+        if batch:
+            yield sep + _encode_list(batch)[1:-1]
+        yield b"]"
+
+    return Response(generate(), mimetype="application/json")
+
 
 # ===== 前端页面 =====
 
@@ -27,10 +88,20 @@ def index():
 
 # ===== 账号 API =====
 
+@app.route("/api/accounts")
+def api_accounts():
+    configured = {a["mid"] for a in ACCOUNTS}
+    rows = get_accounts()
+    for r in rows:
+        r["configured"] = r["mid"] in configured
+    return jsonify(rows)
+
+
 @app.route("/api/account/profile")
 def api_account_profile():
-    latest = get_latest_account_snapshot()
-    snaps = get_last_two_account_snapshots()
+    mid = _mid_arg()
+    latest = get_latest_account_snapshot(mid)
+    snaps = get_last_two_account_snapshots(mid)
 
     daily_diff = None
     if len(snaps) >= 2:
@@ -52,11 +123,15 @@ def api_account_profile():
             "inc_total_share": diff("total_share"),
         }
 
+    try:
+        account = get_account(mid)
+    except KeyError:
+        account = {}
     resp = {
-        "mid": MY_MID,
-        "name": None,
+        "mid": resolve_mid(mid),
+        "name": account.get("name"),
         "face": None,
-        "sign": None,
+        "sign": account.get("intro"),
         "snapshot": latest,
         "daily_diff": daily_diff,
     }
@@ -65,7 +140,7 @@ def api_account_profile():
 
 @app.route("/api/account/latest")
 def api_account_latest():
-    snapshot = get_latest_account_snapshot()
+    snapshot = get_latest_account_snapshot(_mid_arg())
     if not snapshot:
         return jsonify({"error": "no account snapshot"}), 404
     return jsonify(snapshot)
@@ -73,7 +148,7 @@ def api_account_latest():
 
 @app.route("/api/account/snapshot")
 def api_account_snapshot():
-    latest = get_latest_account_snapshot()
+    latest = get_latest_account_snapshot(_mid_arg())
     if not latest:
         return jsonify({"error": "no snapshot"}), 404
     return jsonify(latest)
@@ -81,7 +156,7 @@ def api_account_snapshot():
 
 @app.route("/api/account/daily_diff")
 def api_account_daily_diff():
-    rows = get_last_two_account_snapshots()
+    rows = get_last_two_account_snapshots(_mid_arg())
     if len(rows) < 2:
         return jsonify({"error": "not enough data"}), 400
 
@@ -105,74 +180,197 @@ def api_account_daily_diff():
     return jsonify(result)
 
 
+def _points_arg() -> int | None:
+    """
+    ?points=N：对长序列做 LTTB 降采样，只返回 N 个点；未提供时返回完整序列。
+    """
+    points = request.args.get("points", type=int)
+    if points is not None and points < series.MIN_POINTS:
+        raise ValueError(f"points must be >= {series.MIN_POINTS}: {points!r}")
+    return points
+
+
 @app.route("/api/account/history")
 def api_account_history():
     days = request.args.get("days", type=int)
-    rows = get_account_history(days)
-    return jsonify(rows)
+    mid = _mid_arg()
+    metric = request.args.get("metric", "follower")
+    try:
+        points = _points_arg()
+        if points is not None and metric not in series.ACCOUNT_METRICS:
+            raise ValueError(f"unsupported metric: {metric!r}")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if points is None:
+        return jsonify(get_account_history(days, mid=mid))
+
+    def build():
+        rows = get_account_history(days, mid=mid)
+        x = [date.fromisoformat(r["snapshot_date"]).toordinal() for r in rows]
+        return series.downsample_rows(rows, points, metric, x)
+
+    key = ("account", resolve_mid(mid), days, metric, points)
+    return jsonify(series.cached_downsample(key, get_data_version(resolve_mid(mid)), build))
+
+
+@app.route("/api/account/series")
+def api_account_series():
+    metric = request.args.get("metric", "follower")
+    window = request.args.get("window", 30, type=int)
+    agg = request.args.get("agg", "delta")
+    try:
+        result = series.account_series(metric, window=window, agg=agg, mid=_mid_arg())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
 
 
 # ===== 视频 API =====
 
+def _iter_latest_videos(mid: str | None, with_rates: bool = False):
+    """
+    逐行把游标产出的元组转换为 JSON 对象；with_rates 时附带各项互动率（由查询直接算出）。
+    """
+    rows = iter_latest_video_snapshots(mid, with_rates=with_rates)
+    columns = next(rows, None)
+    if columns is None:
+        return
+    for r in rows:
+        yield dict(zip(columns, r))
+
+
 @app.route("/api/videos/latest")
 def api_videos_latest():
-    rows = get_latest_video_snapshots()
-    return jsonify(rows)
+    return _stream_json_array(_iter_latest_videos(_mid_arg()))
 
 
 @app.route("/api/videos/overview")
 def api_videos_overview():
-    rows = get_latest_video_snapshots()
-    result = []
-
-    for r in rows:
-        view = int(r.get("view") or 0)
-        like = int(r.get("like") or 0)
-        coin = int(r.get("coin") or 0)
-        favorite = int(r.get("favorite") or 0)
-        reply = int(r.get("reply") or 0)
-        danmaku = int(r.get("danmaku") or 0)
-
-        if view > 0:
-            like_rate = like / view
-            coin_rate = coin / view
-            fav_rate = favorite / view
-            reply_rate = reply / view
-            danmaku_rate = danmaku / view
-            engagement_rate = (like + coin + favorite + reply + danmaku) / view
-        else:
-            like_rate = coin_rate = fav_rate = reply_rate = danmaku_rate = 0.0
-            engagement_rate = 0.0
-
-        item = dict(r)
-        item.update(
-            {
-                "like_rate": like_rate,
-                "coin_rate": coin_rate,
-                "fav_rate": fav_rate,
-                "reply_rate": reply_rate,
-                "danmaku_rate": danmaku_rate,
-                "engagement_rate": engagement_rate,
-            }
-        )
-        result.append(item)
-
-    return jsonify(result)
+    return _stream_json_array(_iter_latest_videos(_mid_arg(), with_rates=True))
 
 
 @app.route("/api/video/<bvid>/history")
 def api_video_history(bvid: str):
-    rows = get_video_history(bvid)
+    resolution = request.args.get("resolution", "day")
+    mid = _mid_arg()
+    metric = request.args.get("metric", "view")
+    try:
+        points = _points_arg()
+        if points is not None and metric not in analytics.VIDEO_METRICS:
+            raise ValueError(f"unsupported metric: {metric!r}")
+        if points is None:
+            rows = get_video_history(bvid, resolution=resolution, mid=mid)
+        else:
+            # 按 metric 选点（默认播放量），保留行的其余字段原样返回
+            def build():
+                rows = get_video_history(bvid, resolution=resolution, mid=mid)
+                return series.downsample_rows(rows, points, metric, [r["snapshot_ts"] or 0 for r in rows])
+
+            key = ("video", bvid, resolution, mid, metric, points)
+            rows = series.cached_downsample(key, get_data_version(mid), build)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     if not rows:
         return jsonify({"error": "no data for this bvid"}), 404
     return jsonify(rows)
 
 
+# ===== 分析 API =====
+
+@app.route("/api/analytics/backend")
+def api_analytics_backend():
+    return jsonify({"backend": analytics.get_backend()})
+
+
+@app.route("/api/analytics/movers")
+def api_analytics_movers():
+    metric = request.args.get("metric", "view")
+    window = request.args.get("window", 1, type=int)
+    limit = request.args.get("limit", 10, type=int)
+    try:
+        rows = analytics.top_movers(metric, window=window, limit=limit, mid=_mid_arg())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(rows)
+
+
+@app.route("/api/videos/search")
+def api_videos_search():
+    q = (request.args.get("q") or "").strip()
+    limit = max(1, min(request.args.get("limit", 20, type=int), 200))
+    if not q:
+        return jsonify([])
+    return jsonify(search_videos(q, mid=_mid_arg(), limit=limit))
+
+
+@app.route("/api/videos/movers")
+def api_videos_movers():
+    metric = request.args.get("metric", "view")
+    window = request.args.get("window", 1, type=int)
+    limit = request.args.get("limit", 10, type=int)
+    try:
+        result = analytics.movers(metric, window=window, limit=limit, mid=_mid_arg())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
+@app.route("/api/videos/ranking")
+def api_videos_ranking():
+    metric = request.args.get("metric", "engagement_rate")
+    limit = request.args.get("limit", 20, type=int)
+    offset = request.args.get("offset", 0, type=int)
+    min_view = request.args.get("min_view", 0, type=int)
+    ascending = request.args.get("order", "desc") == "asc"
+    try:
+        result = analytics.video_ranking(
+            metric, limit=limit, offset=offset, ascending=ascending, min_view=min_view, mid=_mid_arg()
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
+@app.route("/api/analytics/cohort")
+def api_analytics_cohort():
+    metric = request.args.get("metric", "view")
+    days = request.args.get("days", 30, type=int)
+    bvid = request.args.get("bvid")
+    try:
+        result = analytics.cohort_curves(metric, days=days, bvid=bvid, mid=_mid_arg())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
+@app.route("/api/analytics/anomalies")
+def api_analytics_anomalies():
+    snapshot_date = request.args.get("date")
+    limit = max(1, min(request.args.get("limit", 50, type=int), 500))
+    try:
+        result = analytics.anomalies(snapshot_date, limit=limit, mid=_mid_arg())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
+@app.route("/api/analytics/percentiles")
+def api_analytics_percentiles():
+    metric = request.args.get("metric", "view")
+    try:
+        result = analytics.metric_percentiles(metric, mid=_mid_arg())
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify(result)
+
+
 @app.route("/api/esp32/full")
 def api_esp32_full():
-    latest = get_latest_account_snapshot()
-    snaps = get_last_two_account_snapshots()
-    videos = get_latest_video_snapshots()
+    mid = _mid_arg()
+    latest = get_latest_account_snapshot(mid)
+    snaps = get_last_two_account_snapshots(mid)
+    videos = get_latest_video_snapshots(mid)
 
     daily_diff = None
     if len(snaps) >= 2:
@@ -198,18 +396,61 @@ def api_esp32_full():
         "videos": videos
     })
 
+def _dashboard_response(kind: str, mimetype: str, target: str | None = None):
+    if target is not None and target not in RENDER_TARGETS:
+        return jsonify({"error": "unknown target"}), 404
+    try:
+        if kind == "png":
+            entry = render_cache.get_preview(_mid_arg(), target)
+        else:
+            entry = render_cache.get_dashboard(_mid_arg(), target)
+    except KeyError:
+        return jsonify({"error": "unknown mid"}), 404
+    resp = Response(entry[kind], mimetype=mimetype)
+    if entry["version"]:
+        resp.set_etag(entry["version"])
+    return resp.make_conditional(request)
+
+
 @app.route("/api/esp32/dashboard.bin")
 def api_esp32_dashboard_bin():
-    bin_path = os.path.join("esp_output", "dashboard7c_800x480.bin")
-    if not os.path.exists(bin_path):
-        return jsonify({"error": "dashboard bin not found"}), 404
-    return send_file(bin_path, mimetype="application/octet-stream", as_attachment=False)
+    # 渲染结果落后于最新数据时按需重新渲染，见 render_cache
+    return _dashboard_response("bin", "application/octet-stream")
+
+
+@app.route("/api/esp32/preview.png")
+@app.route("/api/esp32/dashboard.png")
+def api_esp32_dashboard_png():
+    # 预览图不在渲染时写出，首次请求时从帧缓冲生成
+    return _dashboard_response("png", "image/png")
+
+
+@app.route("/api/esp32/<target>/dashboard.bin")
+def api_esp32_target_dashboard_bin(target: str):
+    # 按渲染目标（见 render_targets.RENDER_TARGETS）返回对应屏幕的帧缓冲
+    return _dashboard_response("bin", "application/octet-stream", target)
+
+
+@app.route("/api/esp32/<target>/preview.png")
+@app.route("/api/esp32/<target>/dashboard.png")
+def api_esp32_target_dashboard_png(target: str):
+    return _dashboard_response("png", "image/png", target)
+
+# ===== 常驻调度状态 =====
+
+@app.route("/api/daemon/status")
+def api_daemon_status():
+    status = read_status()
+    if not status:
+        return jsonify({"error": "daemon not running"}), 404
+    return jsonify(status)
+
 
 # ===== ESP32 简化接口（备用） =====
 
 @app.route("/api/esp32/summary")
 def api_esp32_summary():
-    rows = get_last_two_account_snapshots()
+    rows = get_last_two_account_snapshots(_mid_arg())
     if len(rows) < 2:
         return jsonify({"error": "not enough data"}), 400
 
@@ -231,4 +472,7 @@ def api_esp32_summary():
 
 
 if __name__ == "__main__":
+    # 可选：在 Web 进程内同时运行调度（config.DAEMON_IN_APP = True）
+    if getattr(config, "DAEMON_IN_APP", False):
+        Daemon().start_thread()
     app.run(host="0.0.0.0", port=8765, debug=False)
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# bench/bench_analytics.py
+#
+# 对比 analytics.py 在 DuckDB 与 SQLite 两种后端下的耗时。
+# 用法（在项目根目录）：
+#   python bench/bench_analytics.py --db biliinsights.db --repeat 5
+#   python bench/bench_analytics.py --videos 2000 --days 365   # 使用仿真数据库
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+def timeit(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="analytics backend benchmark")
+    parser.add_argument("--db", default=None, help="已有数据库；不指定则使用仿真数据库")
+    parser.add_argument("--videos", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.db is None:
+        from synth_data import synthetic_db
+        args.db = str(synthetic_db(args.videos, args.days))
+
+    db.DB_PATH = Path(args.db)
+    db.init_db()  # 旧版本生成的仿真库补齐 mid 等新列
+    import analytics
+
+    backends = ["sqlite"]
+    if analytics.get_backend() == "duckdb":
+        backends.append("duckdb")
+    else:
+        print("[bench] duckdb 不可用，仅测试 SQLite。")
+
+    cases = {
+        "top_movers(view, 1)": lambda b: analytics.top_movers("view", 1, 10, backend=b),
+        "top_movers(view, 30)": lambda b: analytics.top_movers("view", 30, 10, backend=b),
+        "movers(view, 7) top+bottom": lambda b: analytics.movers("view", 7, 10, backend=b),
+        "cohort_curves(view, 30)": lambda b: analytics.cohort_curves("view", 30, backend=b),
+        "metric_percentiles(view)": lambda b: analytics.metric_percentiles("view", backend=b),
+    }
+
+    print(f"[bench] db={args.db} repeat={args.repeat}")
+    print(f"{'case':<28}" + "".join(f"{b:>12}" for b in backends))
+    for name, fn in cases.items():
+        cols = []
+        for b in backends:
+            sec = timeit(lambda: fn(b), args.repeat)
+            cols.append(f"{sec * 1000:>10.1f}ms")
+        print(f"{name:<28}" + "".join(cols))
+
+    # 互动率排行与后端无关：首次构建整表，之后命中按数据版本的缓存
+    analytics._ranking_cache.clear()
+    cold = timeit(lambda: analytics.video_ranking("coins_per_like", 20), 1)
+    warm = timeit(lambda: analytics.video_ranking("coins_per_like", 20), args.repeat)
+    print(f"{'video_ranking(cold / warm)':<28}{cold * 1000:>10.1f}ms{warm * 1000:>10.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
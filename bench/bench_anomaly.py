@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+# bench/bench_anomaly.py
+#
+# 播放异常检测基准：
+#   1. 纯计算：在仿真数据库上读出 视频 × 天数 的完整累计矩阵（默认 5000 × 365），
+#      计时 daily_rates + 稳健 z 分数 + Holt 预测整轮计算；
+#   2. 注入检验：随机挑选部分视频，把快照日的增量放大为平时的若干倍，统计检出率与误报数；
+#   3. 端到端：detect_anomalies（按 LOOKBACK_DAYS 读库 + 计算 + 写表）在数据库副本上的耗时。
+# 整轮计算超过 --max-ms 时以非零状态退出。
+#
+# 用法（在项目根目录）：
+#   python bench/bench_anomaly.py --videos 5000 --days 365
+
+import argparse
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import anomaly  # noqa: E402
+
+
+def best_of(fn, repeat: int):
+    times = []
+    result = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - t0)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="播放异常检测基准")
+    parser.add_argument("--videos", type=int, default=5000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--inject", type=int, default=50, help="注入异常的视频数")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--max-ms", type=float, default=500.0)
+    args = parser.parse_args()
+
+    from synth_data import synthetic_db
+
+    src = synthetic_db(args.videos, args.days)
+    conn = sqlite3.connect(src)
+    cur = conn.cursor()
+    mid, end_date = cur.execute(
+        "SELECT mid, MAX(snapshot_date) FROM video_snapshots GROUP BY mid LIMIT 1;"
+    ).fetchone()
+
+    t0 = time.perf_counter()
+    bvids, cum = anomaly.load_view_matrix(cur, mid, end_date, args.days)
+    load = time.perf_counter() - t0
+    conn.close()
+    print(f"[bench] 矩阵 {cum.shape[0]} × {cum.shape[1]}，读库 {load * 1000:.0f}ms")
+
+    elapsed, res = best_of(lambda: anomaly.score_matrix(cum), args.repeat)
+    print(f"[bench] 整轮计算 {elapsed * 1000:.1f}ms，异常 {int(res['anomaly'].sum())} 条")
+
+    # 注入：挑选基线有效的视频，把最后一天的增量改为 基线 + 10 倍尺度 + MIN_DELTA
+    rng = np.random.default_rng(0)
+    eligible = np.flatnonzero(~np.isnan(res["zscore"]) & ~res["anomaly"])
+    chosen = rng.choice(eligible, size=min(args.inject, eligible.size), replace=False)
+    spiked = cum.copy()
+    boost = res["baseline"][chosen] + 10 * res["scale"][chosen] + anomaly.MIN_DELTA
+    spiked[chosen, -1] += np.maximum(boost, 0)
+    flagged = anomaly.score_matrix(spiked)["anomaly"]
+    hit = int(flagged[chosen].sum())
+    false_pos = int(flagged.sum()) - hit - int(res["anomaly"].sum())
+    print(f"[bench] 注入 {chosen.size} 条，检出 {hit} 条，新增误报 {false_pos} 条")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "anomaly.db")
+        shutil.copy(src, path)
+        conn = sqlite3.connect(path)
+        anomaly.create_table(conn.cursor())
+        run, found = best_of(lambda: anomaly.detect_anomalies(conn.cursor(), mid, end_date), args.repeat)
+        conn.commit()
+        conn.close()
+    print(
+        f"[bench] detect_anomalies（读取最近 {anomaly.LOOKBACK_DAYS} 天）：{run * 1000:.0f}ms，"
+        f"视频 {found['videos']} 条，异常 {found['anomalies']} 条"
+    )
+
+    ok = elapsed * 1000 <= args.max_ms and hit == chosen.size
+    print(f"[bench] {'OK' if ok else '未达标'}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
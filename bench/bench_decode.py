@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# bench/bench_decode.py
+#
+# view 接口响应解码基准：对比 “标准库 json 解析完整 dict” 与 “loads_json（orjson）+ 提取 VideoStat”
+# 两条路径的 CPU 时间，以及保留整轮快照结果时的内存峰值（tracemalloc）。
+# 数据为录制的回放数据（--fixtures），或替身服务器的合成目录（含 pages / ugc_season 等大块子树）。
+#
+# 用法（在项目根目录）：
+#   python bench/bench_decode.py --videos 5000
+#   python bench/bench_decode.py --fixtures bench/fixtures/my_channel.json --repeat 5
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bili_api  # noqa: E402
+from standin_server import synthetic_catalog  # noqa: E402
+
+
+def load_payloads(args) -> list:
+    if args.fixtures:
+        with open(args.fixtures, encoding="utf-8") as f:
+            views = (json.load(f).get("view") or {}).values()
+        return [json.dumps(v, ensure_ascii=False).encode("utf-8") for v in views]
+    return [
+        json.dumps({"code": 0, "message": "0", "ttl": 1, "data": v}, ensure_ascii=False).encode("utf-8")
+        for v in synthetic_catalog(args.videos)
+    ]
+
+
+def decode_full(payloads: list) -> list:
+    # 原有路径：resp.json() 得到完整 dict，取 data 子树
+    return [json.loads(p)["data"] for p in payloads]
+
+
+def decode_compact(payloads: list) -> list:
+    out = []
+    for p in payloads:
+        info = bili_api.loads_json(p)["data"]
+        out.append(bili_api._video_stat(info.get("bvid") or "", info))
+    return out
+
+
+def measure(fn, payloads: list, repeat: int):
+    cpu = []
+    for _ in range(repeat):
+        t0 = time.process_time()
+        fn(payloads)
+        cpu.append(time.process_time() - t0)
+
+    tracemalloc.start()
+    result = fn(payloads)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return min(cpu), peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description="view 响应解码基准")
+    parser.add_argument("--videos", type=int, default=5000)
+    parser.add_argument("--fixtures", default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    payloads = load_payloads(args)
+    size = sum(len(p) for p in payloads)
+    print(
+        f"[bench] payloads={len(payloads)}  total={size / 1e6:.1f} MB  "
+        f"decoder={'orjson' if bili_api.orjson is not None else 'json'}"
+    )
+
+    for name, fn in (("json + full dict", decode_full), ("loads_json + VideoStat", decode_compact)):
+        cpu, peak = measure(fn, payloads, args.repeat)
+        print(
+            f"[bench] {name:<24} cpu={cpu * 1000:8.1f} ms ({cpu / len(payloads) * 1e6:6.1f} us/video)  "
+            f"peak={peak / 1e6:7.2f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+# bench/bench_render.py
+#
+# 墨水屏看板渲染微基准：
+#   - import esp_render 的耗时（字体改为按需加载后应接近 0）；
+#   - 数据准备（build_account_context / build_video_context）只执行一次；
+#   - render_dashboard 首次（加载字体、测量缓存为空）与之后各次的耗时，以及 7C 帧缓冲转换耗时；
+#   - 长标题截断：二分查找版 trunc_text 与逐字缩短的原始写法对比；
+#   - 预览图：逐像素写入 RGB 的原始写法与查找表一次索引（调色板图）对比，以及两者 PNG 编码的耗时 / 大小；
+#   - 全部渲染目标（render_targets.RENDER_TARGETS）逐个渲染与进程池并行渲染的耗时对比。
+#
+# 用法（在项目根目录）：
+#   python bench/bench_render.py --videos 300 --days 60 --repeat 20
+#   python bench/bench_render.py --db biliinsights.db
+
+import argparse
+import io
+import os
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+
+def trunc_linear(er, text: str, max_width: int, font) -> str:
+    # 原始写法：从整句开始逐字缩短，每个候选都测量一次
+    w, _ = er.measure_text(text, font)
+    if w <= max_width:
+        return text
+    for i in range(len(text), 0, -1):
+        t = text[:i] + "…"
+        w2, _ = er.measure_text(t, font)
+        if w2 <= max_width:
+            return t
+    return text
+
+
+def preview_loop(er, codes):
+    # 原始写法：逐像素查字典写入
+    h, w = codes.shape
+    sim = er.Image.new("RGB", (w, h), er.WHITE)
+    sim_px = sim.load()
+    code_to_rgb = {code: rgb for code, rgb in er.PALETTE_7C}
+    for y in range(h):
+        for x in range(w):
+            sim_px[x, y] = code_to_rgb.get(int(codes[y, x]), (255, 255, 255))
+    return sim
+
+
+def png_bytes(img, level: int) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", compress_level=level)
+    return buf.getvalue()
+
+
+def timed(fn, repeat: int):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description="墨水屏看板渲染微基准")
+    parser.add_argument("--db", default=None, help="使用已有数据库；缺省时使用仿真数据库")
+    parser.add_argument("--videos", type=int, default=300)
+    parser.add_argument("--days", type=int, default=60)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    if args.db:
+        db.DB_PATH = Path(args.db)
+    else:
+        from synth_data import synthetic_db
+
+        db.DB_PATH = Path(synthetic_db(args.videos, args.days))
+    db.init_db()
+
+    t0 = time.perf_counter()
+    import esp_render as er
+    print(f"[bench] import esp_render: {(time.perf_counter() - t0) * 1000:.1f}ms  字体: {er.font_path() or 'Pillow 默认字体'}")
+
+    t0 = time.perf_counter()
+    account_ctx = er.build_account_context()
+    video_ctx = er.build_video_context()
+    print(f"[bench] 数据准备（一次）: {(time.perf_counter() - t0) * 1000:.1f}ms")
+
+    t0 = time.perf_counter()
+    img = er.render_dashboard(account_ctx, video_ctx)
+    cold = time.perf_counter() - t0
+    warm = timed(lambda: er.render_dashboard(account_ctx, video_ctx), args.repeat)
+    print(
+        f"[bench] render_dashboard: 首次 {cold * 1000:.1f}ms，"
+        f"之后中位数 {statistics.median(warm) * 1000:.1f}ms（{args.repeat} 次）"
+    )
+    info = er._text_bbox.cache_info()
+    print(f"[bench] 文字测量缓存: 命中 {info.hits}，未命中 {info.misses}")
+
+    if img.mode == "P":
+        t_codes = timed(lambda: er.palette_codes(img), args.repeat)
+        print(f"[bench] palette_codes: 中位数 {statistics.median(t_codes) * 1000:.1f}ms")
+        codes = er.palette_codes(img)
+    else:
+        codes = er.error_diffusion_codes(img.convert("RGB"))
+
+    t_loop = timed(lambda: preview_loop(er, codes), 1)[0]
+    t_lut = statistics.median(timed(lambda: er.preview_image(codes), args.repeat))
+    sim = er.preview_image(codes)
+    assert sim.convert("RGB").tobytes() == preview_loop(er, codes).tobytes()
+    print(f"[bench] 预览图生成: 逐像素 {t_loop * 1000:.1f}ms，查找表 {t_lut * 1000:.2f}ms")
+    sim_rgb = sim.convert("RGB")
+    for label, im, level in (("RGB", sim_rgb, 6), ("调色板", sim, er.PNG_COMPRESS_LEVEL)):
+        t_png = statistics.median(timed(lambda: png_bytes(im, level), args.repeat))
+        print(
+            f"[bench] PNG 编码 {label} compress_level={level}: {t_png * 1000:.1f}ms，"
+            f"{len(png_bytes(im, level))} 字节"
+        )
+
+    font = er.FONTS.metric_label
+    titles = [("【合集】" + "超长的中文视频标题用于测试截断效果" * k) for k in (1, 4, 16)]
+    for title in titles:
+        er._text_bbox.cache_clear()
+        t_bin = timed(lambda: er.trunc_text(None, title, 400, font), 1)[0]
+        er._text_bbox.cache_clear()
+        t_lin = timed(lambda: trunc_linear(er, title, 400, font), 1)[0]
+        assert er.trunc_text(None, title, 400, font) == trunc_linear(er, title, 400, font)
+        print(
+            f"[bench] trunc_text {len(title):>4} 字: 二分 {t_bin * 1000:7.2f}ms，逐字 {t_lin * 1000:7.2f}ms"
+        )
+
+    from render_targets import RENDER_TARGETS
+
+    names = list(RENDER_TARGETS)
+    with tempfile.TemporaryDirectory() as tmp:
+        er.OUTPUT_DIR = tmp  # 头像扩散缓存也写到临时目录
+        t0 = time.perf_counter()
+        for name in names:
+            er.render_target(name, account_ctx, video_ctx, tmp, "bench")
+        seq = time.perf_counter() - t0
+
+        t0 = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=min(len(names), os.cpu_count() or 1)) as pool:
+            for f in [pool.submit(er.render_target, n, account_ctx, video_ctx, tmp, "bench") for n in names]:
+                f.result()
+        par = time.perf_counter() - t0
+    print(
+        f"[bench] {len(names)} 个渲染目标（{', '.join(names)}）：逐个 {seq * 1000:.0f}ms，"
+        f"进程池并行 {par * 1000:.0f}ms（含进程启动）"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# bench/bench_retry.py
+#
+# 在本地故障注入替身服务器上跑一次完整快照，观察重试 / 熔断 / 延迟重试队列的效果。
+# 成功数低于 --min-success、有故障却没有重试（或重试数超过故障数）、熔断结果与 --expect-trips 不符时以非零状态退出；
+# --expect-trips 缺省按错误率判断：不低于熔断阈值时应至少熔断一次，低于阈值的 1/3 时不应熔断，介于两者之间不检查。
+# 用法（在项目根目录）：
+#   python bench/bench_retry.py --videos 200 --error-rate 0.15
+#   python bench/bench_retry.py --videos 60 --error-rate 0.7
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import bili_api  # noqa: E402
+import db  # noqa: E402
+import snapshot_job  # noqa: E402
+from standin_server import FAULT_KINDS, StandinState, serve, synthetic_catalog  # noqa: E402
+
+
+class CountingPolicy(bili_api.RetryPolicy):
+    """
+    记录请求内重试的次数（每次重试前调用一次 backoff）。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.retries = 0
+
+    def backoff(self, attempt, err):
+        self.retries += 1
+        return super().backoff(attempt, err)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="retry / circuit breaker benchmark")
+    parser.add_argument("--videos", type=int, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.15)
+    parser.add_argument("--faults", default=",".join(FAULT_KINDS))
+    parser.add_argument("--min-success", type=float, default=None,
+                        help="成功视频占比下限（缺省：错误率低于熔断阈值时为 1.0，否则为 0.8）")
+    parser.add_argument("--expect-trips", choices=("auto", "none", "some", "any"), default="auto")
+    args = parser.parse_args()
+
+    threshold = bili_api.BREAKER.error_rate
+    high = args.error_rate >= threshold
+    min_success = args.min_success if args.min_success is not None else (0.8 if high else 1.0)
+    expect_trips = args.expect_trips
+    if expect_trips == "auto":
+        expect_trips = "some" if high else ("none" if args.error_rate < threshold / 3 else "any")
+
+    state = StandinState(
+        synthetic_catalog(args.videos),
+        error_rate=args.error_rate,
+        faults=[f for f in args.faults.split(",") if f],
+        timeout_sec=1.0,
+    )
+    server = serve(state)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    bili_api.set_api_base(base)
+    # 缩短等待，便于快速跑完
+    bili_api.REQUEST_TIMEOUT = 0.5
+    bili_api.DEFAULT_RETRY = CountingPolicy(max_attempts=4, base_delay=0.02, max_delay=0.5)
+    bili_api.BREAKER.cooldown = 1.0
+    # 替身服务器不限流，客户端限流只会拉长耗时
+    bili_api.RATE_LIMITER = bili_api.RateLimiter(0)
+    snapshot_job.RATE_LIMITER = bili_api.RATE_LIMITER
+    snapshot_job.DEFERRED_RETRY_DELAY = 0.5
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bench.db"
+        bili_api.WBI_CACHE_PATH = Path(tmp) / "wbi_keys.json"
+        t0 = time.perf_counter()
+        summary = snapshot_job.run_snapshot()
+        elapsed = time.perf_counter() - t0
+
+    server.shutdown()
+    print(
+        f"[bench] videos={args.videos} error_rate={args.error_rate} "
+        f"requests={state.counters['requests']} faults={state.counters['faults']}"
+    )
+    success = summary.get("success") or 0
+    trips = summary.get("breaker_trips") or 0
+    retries = bili_api.DEFAULT_RETRY.retries
+    faults = state.counters["faults"]
+    print(
+        f"[bench] success={success} failed={summary.get('failed')} retries={retries} "
+        f"breaker_trips={trips} elapsed={elapsed:.1f}s"
+    )
+
+    checks = [
+        (f"成功 {success}/{args.videos}（下限 {min_success:.0%}）", success >= min_success * args.videos),
+        (f"重试 {retries} 次 / 故障 {faults} 次", 0 < retries <= faults if faults else retries == 0),
+        (f"熔断 {trips} 次（期望 {expect_trips}）", expect_trips == "any" or (trips > 0) == (expect_trips == "some")),
+    ]
+    failed = False
+    for label, ok in checks:
+        failed |= not ok
+        print(f"[bench] {label}  {'OK' if ok else '不符合预期'}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# bench/bench_snapshot.py
+#
+# 端到端快照基准：在本地替身服务器（合成目录或录制的回放数据）上完整执行 run_snapshot，
+# 统计总耗时、请求数与吞吐。数据库写入临时目录，不影响 biliinsights.db。
+# 用法（在项目根目录）：
+#   python bench/bench_snapshot.py --videos 600 --latency-ms 50
+#   python bench/bench_snapshot.py --fixtures bench/fixtures/my_channel.json --rate-limit 20
+#   python bench/bench_snapshot.py --accounts 12 --videos 100 --latency-ms 50 --global-rate 40
+#
+#   python bench/bench_snapshot.py --videos 300 --cookie-rate 10 --credentials 4 --banned 1
+#
+# --accounts N 模拟 N 个账号（共用同一份替身目录）并发抓取，--global-rate 为客户端全局限流。
+# --credentials N 使用 N 个凭据（Cookie 为 c0..cN-1），服务端按 --cookie-rate 对每个 Cookie 限流，
+# 前 --banned 个凭据一律返回风控 code，用于观察凭据池的轮换与隔离。
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import accounts  # noqa: E402
+import bili_api  # noqa: E402
+import db  # noqa: E402
+import snapshot_job  # noqa: E402
+from standin_server import FAULT_KINDS, build_state, serve  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description="end-to-end snapshot benchmark")
+    parser.add_argument("--videos", type=int, default=600)
+    parser.add_argument("--fixtures", default=None)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--faults", default=",".join(FAULT_KINDS))
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0)
+    parser.add_argument("--page-sleep", type=float, default=0.0, help="投稿列表翻页间隔（秒）")
+    parser.add_argument("--accounts", type=int, default=1, help="模拟的账号数")
+    parser.add_argument("--workers", type=int, default=None, help="并发抓取的账号数")
+    parser.add_argument("--global-rate", type=float, default=0.0, help="客户端全局限流（次/秒，0 为不限）")
+    parser.add_argument("--cookie-rate", type=float, default=0.0, help="服务端每个 Cookie 的限流（次/秒）")
+    parser.add_argument("--credentials", type=int, default=1, help="凭据池中的凭据数")
+    parser.add_argument("--credential-rate", type=float, default=None,
+                        help="客户端每个凭据的限流（次/秒，默认为 --cookie-rate 的 90%%）")
+    parser.add_argument("--banned", type=int, default=0, help="被服务端封禁的凭据数")
+    parser.add_argument("--tracemalloc", action="store_true",
+                        help="统计快照期间的内存峰值（含替身服务器线程，开启后耗时明显增加）")
+    args = parser.parse_args()
+
+    cookies = [f"c{i}" for i in range(args.credentials)]
+    args.banned_cookies = ",".join(cookies[:args.banned])
+    state = build_state(args)
+    server = serve(state)
+    bili_api.set_api_base(f"http://127.0.0.1:{server.server_address[1]}")
+    bili_api.REQUEST_TIMEOUT = 2.0
+    bili_api.BREAKER.cooldown = 2.0
+    snapshot_job.DEFERRED_RETRY_DELAY = 1.0
+    bili_api.RATE_LIMITER = bili_api.RateLimiter(args.global_rate)
+    snapshot_job.RATE_LIMITER = bili_api.RATE_LIMITER
+    cred_rate = args.cookie_rate * 0.9 if args.credential_rate is None else args.credential_rate
+    bili_api.POOL = bili_api.CredentialPool(
+        [bili_api.Credential(c, c, cred_rate) for c in cookies], quarantine_sec=30.0,
+    )
+    snapshot_job.POOL = bili_api.POOL
+
+    orig_fetch_archives = bili_api.fetch_user_archives
+    snapshot_job.fetch_user_archives = (
+        lambda mid, **kw: orig_fetch_archives(mid, sleep_sec=args.page_sleep, **kw)
+    )
+
+    mids = [str(100000 + i) for i in range(args.accounts)]
+    accounts.ACCOUNTS[:] = [
+        {"mid": m, "cookie": None, "name": m, "intro": "", "avatar": "", "device": m} for m in mids
+    ]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db.DB_PATH = Path(tmp) / "bench.db"
+        bili_api.WBI_CACHE_PATH = Path(tmp) / "wbi_keys.json"
+        if args.tracemalloc:
+            tracemalloc.start()
+        t0 = time.perf_counter()
+        c0 = time.process_time()
+        summary = snapshot_job.run_all_snapshots(mids=mids, workers=args.workers)
+        cpu = time.process_time() - c0
+        elapsed = time.perf_counter() - t0
+        peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+        tracemalloc.stop()
+
+    server.shutdown()
+    requests_n = state.counters["requests"]
+    print(
+        f"[bench] accounts={args.accounts} videos={len(state.catalog)} latency_ms={args.latency_ms} "
+        f"rate_limit={args.rate_limit} global_rate={args.global_rate} error_rate={args.error_rate}"
+    )
+    print(
+        f"[bench] success={summary.get('success')} failed={summary.get('failed')} "
+        f"requests={requests_n} faults={state.counters['faults']} "
+        f"rate_limited={state.counters['rate_limited']} breaker_trips={summary.get('breaker_trips')} "
+        f"client_wait={summary.get('rate_limit_wait')}s"
+    )
+    print(f"[bench] elapsed={elapsed:.2f}s  throughput={requests_n / elapsed:.1f} req/s  "
+          f"cpu={cpu:.2f}s (含替身服务器)" + (f"  peak={peak / 1e6:.1f} MB" if peak is not None else ""))
+    print(f"[bench] server requests by cookie: {state.by_cookie}  banned={state.counters['banned']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+# bench/bench_stream.py
+#
+# /api/videos/latest 与 /api/videos/overview 流式输出的内存基准：
+# 在不同规模的仿真数据库上逐块读取响应，用 tracemalloc 记录请求期间的内存峰值，
+# 并与原有 “整表物化为 dict 列表 + jsonify” 的做法对比。
+# 流式接口的峰值应与视频数量无关：超出 --max-peak-kb，或最大规模相对最小规模增长超过 --max-growth 倍时以非零状态退出。
+#
+# 用法（在项目根目录）：
+#   python bench/bench_stream.py --sizes 1000,5000,20000 --days 3
+
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import db  # noqa: E402
+
+ENDPOINTS = ("/api/videos/latest", "/api/videos/overview")
+
+
+def measure_stream(client, path: str):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    resp = client.get(path, buffered=False)
+    size = 0
+    for chunk in resp.response:
+        size += len(chunk)
+    resp.close()
+    elapsed = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, peak, elapsed
+
+
+def measure_materialized(app):
+    # 原有路径：get_latest_video_snapshots 物化全部行，jsonify 一次性构造完整响应体
+    from flask import jsonify
+
+    with app.test_request_context():
+        tracemalloc.start()
+        t0 = time.perf_counter()
+        body = jsonify(db.get_latest_video_snapshots()).get_data()
+        elapsed = time.perf_counter() - t0
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return len(body), peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="流式视频列表接口内存基准")
+    parser.add_argument("--sizes", default="1000,5000,20000", help="逗号分隔的视频数量")
+    parser.add_argument("--days", type=int, default=3)
+    parser.add_argument("--max-peak-kb", type=float, default=2048.0)
+    parser.add_argument("--max-growth", type=float, default=1.5)
+    args = parser.parse_args()
+
+    from synth_data import synthetic_db
+
+    sizes = [int(s) for s in args.sizes.split(",") if s.strip()]
+    dbs = {n: synthetic_db(n, args.days) for n in sizes}
+
+    db.DB_PATH = Path(dbs[sizes[0]])
+    import app as web
+
+    client = web.app.test_client()
+    peaks = {path: [] for path in ENDPOINTS}
+
+    print(f"{'videos':>8} {'endpoint':<22} {'body':>10} {'peak':>10} {'time':>9}")
+    for n in sizes:
+        db.DB_PATH = Path(dbs[n])
+        for path in ENDPOINTS:
+            size, peak, elapsed = measure_stream(client, path)
+            peaks[path].append(peak)
+            print(f"{n:>8} {path:<22} {size / 1e6:>8.2f}MB {peak / 1e3:>8.0f}KB {elapsed * 1000:>7.0f}ms")
+        size, peak, elapsed = measure_materialized(web.app)
+        print(f"{n:>8} {'(dict 列表 + jsonify)':<22} {size / 1e6:>8.2f}MB {peak / 1e3:>8.0f}KB {elapsed * 1000:>7.0f}ms")
+
+    failed = False
+    for path, values in peaks.items():
+        growth = values[-1] / max(values[0], 1)
+        ok = values[-1] <= args.max_peak_kb * 1e3 and growth <= args.max_growth
+        failed |= not ok
+        print(
+            f"[bench] {path}: 峰值 {values[0] / 1e3:.0f}KB → {values[-1] / 1e3:.0f}KB，"
+            f"增长 {growth:.2f}x  {'OK' if ok else '超出上限'}"
+        )
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+# bench/record_fixtures.py
+#
+# 用真实 Cookie 访问 B 站接口一次，把 nav / arc.search / view / relation.stat 的响应录制成回放数据，
+# 之后由 bench/standin_server.py --fixtures 在本地回放，基准测试不再依赖网络和 Cookie。
+# nav 响应只保留 wbi_img，避免把账号信息写入文件。
+#
+# 用法（在项目根目录）：
+#   python bench/record_fixtures.py --out bench/fixtures/my_channel.json [--limit 100]
+
+import argparse
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bili_api  # noqa: E402
+from accounts import DEFAULT_MID  # noqa: E402
+
+ENDPOINTS = {
+    "/x/web-interface/nav": "nav",
+    "/x/space/wbi/arc/search": "arc_search",
+    "/x/web-interface/view": "view",
+    "/x/relation/stat": "relation_stat",
+}
+
+
+class FixtureRecorder:
+
+    def __init__(self):
+        self.fixtures: Dict[str, Any] = {"nav": None, "arc_search": {}, "view": {}, "relation_stat": None}
+
+    def __call__(self, url: str, params: Dict[str, Any], data: Dict[str, Any]) -> None:
+        path = "/" + url.split("://", 1)[-1].split("/", 1)[-1]
+        kind = ENDPOINTS.get(path.rstrip("/"))
+        if kind == "nav":
+            wbi_img = (data.get("data") or {}).get("wbi_img")
+            self.fixtures["nav"] = {"code": 0, "message": "0", "data": {"wbi_img": wbi_img}}
+        elif kind == "arc_search":
+            self.fixtures["arc_search"][str(params.get("pn", 1))] = data
+        elif kind == "view":
+            self.fixtures["view"][str(params.get("bvid"))] = data
+        elif kind == "relation_stat":
+            self.fixtures["relation_stat"] = data
+
+
+def main():
+    parser = argparse.ArgumentParser(description="录制 B 站接口响应作为回放数据")
+    parser.add_argument("--out", type=Path, required=True)
+    parser.add_argument("--limit", type=int, default=None, help="最多录制多少条视频详情")
+    args = parser.parse_args()
+
+    recorder = FixtureRecorder()
+    bili_api.set_recorder(recorder)
+
+    archives = bili_api.fetch_user_archives(DEFAULT_MID)
+    print(f"[record] 投稿 {len(archives)} 条")
+    for i, v in enumerate(archives[: args.limit] if args.limit else archives, start=1):
+        try:
+            bili_api.fetch_video_info(v["bvid"])
+        except Exception as e:
+            print(f"[record] view {v.get('bvid')} 失败: {e}")
+        if i % 20 == 0:
+            print(f"[record] 已录制 {i} 条视频详情")
+    bili_api.fetch_user_fans(DEFAULT_MID)
+
+    args.out.parent.mkdir(parents=True, exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(recorder.fixtures, f, ensure_ascii=False)
+    print(
+        f"[record] 已写入 {args.out}：arc.search {len(recorder.fixtures['arc_search'])} 页，"
+        f"view {len(recorder.fixtures['view'])} 条"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,397 @@
+#!/usr/bin/env python3
+# bench/standin_server.py
+#
+# 本地 B 站接口替身：提供 nav / arc.search / view / relation.stat 四个接口。
+# 数据来源为合成的投稿目录（任意规模），或 bench/record_fixtures.py 录制的真实响应；
+# 可配置响应延迟、故障注入（412 / 429 / 风控 code / 超时 / 非 JSON 响应）与令牌桶限流
+# （全局限流，以及按 Cookie 的限流 / 封禁，用于验证凭据池的轮换与隔离）。
+# 配合 BILI_API_BASE / bili_api.set_api_base 使用，无需 Cookie 和网络即可端到端跑快照。
+#
+# 用法（在项目根目录）：
+#   python bench/standin_server.py --port 18765 --videos 600 --error-rate 0.2
+#   python bench/standin_server.py --fixtures bench/fixtures/my_channel.json --latency-ms 80 --rate-limit 20
+#   BILI_API_BASE=http://127.0.0.1:18765 python snapshot_job.py
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Tuple
+from urllib.parse import parse_qs, urlencode, urlparse
+
+FAULT_KINDS = ("http412", "http429", "code-352", "code-799", "timeout", "badjson")
+
+DEFAULT_WBI_IMG = {
+    "img_url": "https://i0.hdslb.com/bfs/wbi/7cd084941338484aae1ad9425b84077c.png",
+    "sub_url": "https://i0.hdslb.com/bfs/wbi/4932caff0ff746eab6f01bf08b70ac45.png",
+}
+MIXIN_KEY_ENC_TAB = [
+    46, 47, 18, 2, 53, 8, 23, 32, 15, 50, 10, 31, 58, 3, 45, 35,
+    27, 43, 5, 49, 33, 9, 42, 19, 29, 28, 14, 39, 12, 38, 41, 13,
+    37, 48, 7, 16, 24, 55, 40, 61, 26, 17, 0, 1, 60, 51, 30, 4,
+    22, 25, 54, 21, 56, 59, 6, 63, 57, 62, 11, 36, 20, 34, 44, 52,
+]
+
+
+def _mixin_key(wbi_img: Dict[str, str]) -> str:
+    img_key = wbi_img["img_url"].rsplit("/", 1)[-1].split(".")[0]
+    sub_key = wbi_img["sub_url"].rsplit("/", 1)[-1].split(".")[0]
+    orig = img_key + sub_key
+    return "".join(orig[i] for i in MIXIN_KEY_ENC_TAB[:32])
+
+
+def wbi_signature_ok(query: Dict[str, str], wbi_img: Dict[str, str]) -> bool:
+    """
+    按当前 nav 下发的 key 校验 w_rid（与真实接口一致：签名错误返回 -403）。
+    """
+    params = dict(query)
+    w_rid = params.pop("w_rid", None)
+    if w_rid is None:
+        return False
+    q = urlencode(dict(sorted(params.items())))
+    return hashlib.md5((q + _mixin_key(wbi_img)).encode("utf-8")).hexdigest() == w_rid
+
+
+def _heavy_fields(rng: random.Random, i: int, pub: int) -> Dict[str, Any]:
+    """
+    真实 view 接口中快照用不到、但体积占大头的子树：分 P、UP 主、权限、荣誉、合集。
+    """
+    owner = {"mid": 12345, "name": "替身UP主", "face": "https://i0.hdslb.com/bfs/face/" + "f" * 40 + ".jpg"}
+    pages = [
+        {"cid": 500000 + i * 10 + p, "page": p + 1, "from": "vupload", "part": f"P{p + 1} 替身分P标题",
+         "duration": rng.randint(30, 900), "vid": "", "weblink": "",
+         "dimension": {"width": 1920, "height": 1080, "rotate": 0},
+         "first_frame": "https://i0.hdslb.com/bfs/storyff/" + "a" * 40 + ".jpg"}
+        for p in range(rng.randint(1, 3))
+    ]
+    fields: Dict[str, Any] = {
+        "desc": "替身视频简介。" * rng.randint(5, 40),
+        "owner": owner,
+        "pages": pages,
+        "rights": {k: rng.randint(0, 1) for k in (
+            "bp", "elec", "download", "movie", "pay", "hd5", "no_reprint", "autoplay",
+            "ugc_pay", "is_cooperation", "ugc_pay_preview", "no_background", "clean_mode",
+            "is_stein_gate", "is_360", "no_share", "arc_pay", "free_watch")},
+        "honor_reply": {"honor": [{"aid": 100000 + i, "type": 4, "desc": "第 1 期每周必看", "weekly_recommend_num": 0}]},
+        "subtitle": {"allow_submit": False, "list": []},
+        "desc_v2": [{"raw_text": "替身视频简介", "type": 1, "biz_id": 0}],
+        "dimension": {"width": 1920, "height": 1080, "rotate": 0},
+        "pic": "https://i0.hdslb.com/bfs/archive/" + "b" * 40 + ".jpg",
+        "tname": "日常", "copyright": 1, "state": 0, "cid": pages[0]["cid"],
+    }
+    if i % 4 == 0:
+        fields["ugc_season"] = {
+            "id": 9000 + i // 20, "title": "替身合集", "cover": fields["pic"], "mid": 12345,
+            "sections": [{
+                "id": 1, "title": "正片", "type": 1,
+                "episodes": [
+                    {"id": e, "aid": 100000 + e, "cid": 500000 + e * 10, "title": f"合集第 {e} 集",
+                     "arc": {"aid": 100000 + e, "pic": fields["pic"], "title": f"合集第 {e} 集",
+                             "pubdate": pub, "ctime": pub, "duration": 300,
+                             "stat": {"view": rng.randint(100, 10 ** 5), "danmaku": 1, "reply": 1,
+                                      "fav": 1, "coin": 1, "share": 1, "like": 1}}}
+                    for e in range(20)
+                ],
+            }],
+        }
+    return fields
+
+
+def synthetic_catalog(n_videos: int, seed: int = 42) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    now = int(time.time())
+    catalog = []
+    for i in range(n_videos):
+        pub = now - i * 86400 * 3 - rng.randint(0, 86400)
+        view = int(rng.lognormvariate(8.5, 1.4))
+        catalog.append({
+            **_heavy_fields(rng, i, pub),
+            "bvid": f"BV1sb{i:07d}",
+            "aid": 100000 + i,
+            "title": f"替身视频 #{i}",
+            "created": pub,
+            "pubdate": pub,
+            "duration": rng.randint(30, 1800),
+            "stat": {
+                "view": view,
+                "like": view // rng.randint(8, 30),
+                "coin": view // rng.randint(20, 80),
+                "favorite": view // rng.randint(15, 60),
+                "reply": view // rng.randint(100, 400),
+                "danmaku": view // rng.randint(50, 300),
+                "share": view // rng.randint(200, 800),
+            },
+        })
+    return catalog
+
+
+def load_fixtures(path: str) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    读取录制的回放数据，返回 (catalog, responses)。
+    catalog 按录制时的投稿顺序排列，只包含录到了 view 详情的视频。
+    """
+    with open(path, encoding="utf-8") as f:
+        fx = json.load(f)
+
+    views = {bvid: resp["data"] for bvid, resp in (fx.get("view") or {}).items()
+             if resp.get("code") == 0}
+    catalog: List[Dict[str, Any]] = []
+    pages = fx.get("arc_search") or {}
+    for pn in sorted(pages, key=int):
+        vlist = ((pages[pn].get("data") or {}).get("list") or {}).get("vlist") or []
+        for item in vlist:
+            info = views.get(item.get("bvid"))
+            if info is not None:
+                catalog.append(dict(info, created=item.get("created") or info.get("pubdate")))
+
+    responses = {"nav": fx.get("nav"), "relation_stat": fx.get("relation_stat"), "view": fx.get("view")}
+    return catalog, responses
+
+
+class _Bucket:
+    """
+    令牌桶：rate 次/秒，桶容量同为 rate；0 表示不限流。调用方持锁。
+    """
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.ts = time.monotonic()
+
+    def take(self) -> bool:
+        if self.rate <= 0:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.rate, self.tokens + (now - self.ts) * self.rate)
+        self.ts = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class StandinState:
+
+    def __init__(self, catalog: List[Dict[str, Any]],
+                 error_rate: float = 0.0,
+                 faults=FAULT_KINDS,
+                 latency_ms: float = 0.0,
+                 timeout_sec: float = 15.0,
+                 rate_limit: float = 0.0,
+                 responses: Dict[str, Any] | None = None,
+                 seed: int = 0,
+                 cookie_rate: float = 0.0,
+                 banned_cookies=()):
+        self.catalog = catalog
+        self.by_bvid = {v["bvid"]: v for v in catalog}
+        self.responses = responses or {}
+        self.error_rate = error_rate
+        self.faults = tuple(faults)
+        self.latency_ms = latency_ms
+        self.timeout_sec = timeout_sec
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counters: Dict[str, int] = {"requests": 0, "faults": 0, "rate_limited": 0, "banned": 0}
+
+        self.rate_limit = rate_limit
+        self.bucket = _Bucket(rate_limit)
+        # 按 Cookie 限流（模拟单个会话的频率上限）；banned_cookies 中的 Cookie 一律返回风控 code
+        self.cookie_rate = cookie_rate
+        self.cookie_buckets: Dict[str, _Bucket] = {}
+        self.banned_cookies = set(banned_cookies)
+        self.by_cookie: Dict[str, int] = {}
+        self.nav_requests = 0
+
+    def take_token(self, cookie: str = "") -> bool:
+        with self.lock:
+            self.by_cookie[cookie] = self.by_cookie.get(cookie, 0) + 1
+            bucket = self.cookie_buckets.setdefault(cookie, _Bucket(self.cookie_rate))
+            if self.bucket.take() and bucket.take():
+                return True
+            self.counters["rate_limited"] += 1
+            return False
+
+    def is_banned(self, cookie: str) -> bool:
+        if cookie not in self.banned_cookies:
+            return False
+        with self.lock:
+            self.counters["banned"] += 1
+        return True
+
+    def pick_fault(self) -> str | None:
+        with self.lock:
+            self.counters["requests"] += 1
+            if self.faults and self.rng.random() < self.error_rate:
+                self.counters["faults"] += 1
+                return self.rng.choice(self.faults)
+        return None
+
+    def latency(self) -> float:
+        # 平均 latency_ms，±50% 均匀抖动
+        if not self.latency_ms:
+            return 0.0
+        with self.lock:
+            return self.latency_ms * self.rng.uniform(0.5, 1.5) / 1000.0
+
+
+def _ok(data: Any) -> Dict[str, Any]:
+    return {"code": 0, "message": "0", "ttl": 1, "data": data}
+
+
+def make_handler(state: StandinState):
+
+    class Handler(BaseHTTPRequestHandler):
+
+        def log_message(self, fmt, *args):  # 静默
+            pass
+
+        def _send(self, status: int, body: bytes, ctype: str = "application/json") -> None:
+            try:
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                # 客户端已超时断开（timeout 故障）
+                pass
+
+        def _json(self, obj: Any, status: int = 200) -> None:
+            self._send(status, json.dumps(obj, ensure_ascii=False).encode("utf-8"))
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            q = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+
+            delay = state.latency()
+            if delay:
+                time.sleep(delay)
+
+            cookie = self.headers.get("Cookie", "")
+            fault = state.pick_fault()
+            if state.is_banned(cookie):
+                return self._json({"code": -352, "message": "风控校验失败"})
+            if not state.take_token(cookie):
+                return self._json({"code": -799, "message": "请求过于频繁，请稍后再试"})
+            if fault == "http412":
+                return self._send(412, b"<html>request blocked</html>", "text/html")
+            if fault == "http429":
+                return self._send(429, b"<html>too many requests</html>", "text/html")
+            if fault == "code-352":
+                return self._json({"code": -352, "message": "风控校验失败"})
+            if fault == "code-799":
+                return self._json({"code": -799, "message": "请求过于频繁，请稍后再试"})
+            if fault == "timeout":
+                time.sleep(state.timeout_sec)
+                return self._json({"code": -500, "message": "timeout"})
+            if fault == "badjson":
+                return self._send(200, b"<!DOCTYPE html><html>...", "text/html")
+
+            route = url.path.rstrip("/")
+            if route == "/x/web-interface/nav":
+                with state.lock:
+                    state.nav_requests += 1
+                if state.responses.get("nav"):
+                    return self._json(state.responses["nav"])
+                return self._json(_ok({"wbi_img": DEFAULT_WBI_IMG}))
+
+            if route == "/x/space/wbi/arc/search":
+                nav = state.responses.get("nav")
+                wbi_img = ((nav or {}).get("data") or {}).get("wbi_img") or DEFAULT_WBI_IMG
+                if not wbi_signature_ok(q, wbi_img):
+                    return self._json({"code": -403, "message": "访问权限不足"})
+                ps = int(q.get("ps", 30))
+                pn = int(q.get("pn", 1))
+                page = state.catalog[(pn - 1) * ps: pn * ps]
+                vlist = [
+                    {"bvid": v["bvid"], "aid": v["aid"], "title": v["title"],
+                     "created": v["created"], "play": v["stat"]["view"]}
+                    for v in page
+                ]
+                count = len(state.catalog)
+                return self._json(_ok({
+                    "list": {"vlist": vlist},
+                    "page": {"pn": pn, "ps": ps, "count": count, "pages": max(1, -(-count // ps))},
+                }))
+
+            if route == "/x/web-interface/view":
+                recorded = (state.responses.get("view") or {}).get(q.get("bvid", ""))
+                if recorded is not None:
+                    return self._json(recorded)
+                v = state.by_bvid.get(q.get("bvid", ""))
+                if v is None:
+                    return self._json({"code": -404, "message": "啥都木有"})
+                return self._json(_ok(v))
+
+            if route == "/x/relation/stat":
+                if state.responses.get("relation_stat"):
+                    return self._json(state.responses["relation_stat"])
+                return self._json(_ok({"mid": int(q.get("vmid", 0) or 0), "following": 10,
+                                       "follower": 12345}))
+
+            self._json({"code": -404, "message": "not found"}, status=404)
+
+    return Handler
+
+
+def serve(state: StandinState, host: str = "127.0.0.1", port: int = 0) -> ThreadingHTTPServer:
+    """
+    在后台线程启动替身服务器，返回 server（server.server_address 为实际端口）。
+    """
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    t = threading.Thread(target=server.serve_forever, daemon=True)
+    t.start()
+    return server
+
+
+def build_state(args) -> StandinState:
+    responses = None
+    if getattr(args, "fixtures", None):
+        catalog, responses = load_fixtures(args.fixtures)
+    else:
+        catalog = synthetic_catalog(args.videos)
+    return StandinState(
+        catalog,
+        error_rate=args.error_rate,
+        faults=[f for f in args.faults.split(",") if f],
+        latency_ms=args.latency_ms,
+        rate_limit=args.rate_limit,
+        responses=responses,
+        cookie_rate=getattr(args, "cookie_rate", 0.0),
+        banned_cookies=[c for c in (getattr(args, "banned_cookies", "") or "").split(",") if c],
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本地 B 站接口替身服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=18765)
+    parser.add_argument("--videos", type=int, default=600, help="合成目录的视频数")
+    parser.add_argument("--fixtures", default=None, help="录制的回放数据（优先于合成目录）")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--faults", default=",".join(FAULT_KINDS),
+                        help=f"注入的故障类型，逗号分隔：{','.join(FAULT_KINDS)}")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="每秒请求上限（0 为不限）")
+    parser.add_argument("--cookie-rate", type=float, default=0.0, help="每个 Cookie 每秒请求上限（0 为不限）")
+    parser.add_argument("--banned-cookies", default="", help="一律返回风控 code 的 Cookie，逗号分隔")
+    args = parser.parse_args()
+
+    state = build_state(args)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    print(
+        f"[standin] http://{args.host}:{args.port}  videos={len(state.catalog)} "
+        f"error_rate={args.error_rate} latency_ms={args.latency_ms} rate_limit={args.rate_limit}"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -3,25 +3,59 @@
 # Original project licensed under the MIT License.
 # Copyright © SocialSisterYi
 
+import os
+import json
 import time
+import random
 import hashlib
+import threading
 import urllib.parse
-from functools import reduce
-from typing import Dict, Any, List, Tuple
+from collections import deque
+from pathlib import Path
+from typing import Callable, Collection, Dict, Any, List, NamedTuple
 
 import requests
 
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，未安装时使用标准库 json
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # Windows：WBI key 刷新只做进程内互斥
+    fcntl = None
+
+import config
+from accounts import ACCOUNTS
 from config import BILI_COOKIE
 
 # =============================
 # 基础配置
 # =============================
 
-SPACE_ARCHIVE_URL = "https://api.bilibili.com/x/space/wbi/arc/search"
-NAV_URL = "https://api.bilibili.com/x/web-interface/nav"
-VIEW_URL = "https://api.bilibili.com/x/web-interface/view"
-RELATION_STAT_URL = "https://api.bilibili.com/x/relation/stat"
-SPACE_ACC_INFO_URL = "https://api.bilibili.com/x/space/acc/info"
+# 接口根地址：可通过环境变量 BILI_API_BASE 或 config.BILI_API_BASE 指向本地替身服务器（基准测试 / 回放）
+DEFAULT_API_BASE = "https://api.bilibili.com"
+API_BASE = os.environ.get("BILI_API_BASE") or getattr(config, "BILI_API_BASE", DEFAULT_API_BASE)
+
+SPACE_ARCHIVE_URL = ""
+NAV_URL = ""
+VIEW_URL = ""
+RELATION_STAT_URL = ""
+SPACE_ACC_INFO_URL = ""
+
+
+def set_api_base(base: str) -> None:
+    global API_BASE, SPACE_ARCHIVE_URL, NAV_URL, VIEW_URL, RELATION_STAT_URL, SPACE_ACC_INFO_URL
+    API_BASE = base.rstrip("/")
+    SPACE_ARCHIVE_URL = f"{API_BASE}/x/space/wbi/arc/search"
+    NAV_URL = f"{API_BASE}/x/web-interface/nav"
+    VIEW_URL = f"{API_BASE}/x/web-interface/view"
+    RELATION_STAT_URL = f"{API_BASE}/x/relation/stat"
+    SPACE_ACC_INFO_URL = f"{API_BASE}/x/space/acc/info"
+
+
+set_api_base(API_BASE)
 
 COMMON_HEADERS = {
     "User-Agent": (
@@ -35,6 +69,430 @@ COMMON_HEADERS = {
     "Cookie": BILI_COOKIE,
 }
 
+# 进程内共享的连接池：常驻进程（daemon）下复用 TCP/TLS 连接
+SESSION = requests.Session()
+
+
+def _headers(referer: str | None = None) -> Dict[str, str]:
+    """
+    Cookie 由 request_json 按凭据池的选择填入，这里只处理 Referer。
+    """
+    headers = dict(COMMON_HEADERS)
+    if referer:
+        headers["Referer"] = referer
+    return headers
+
+# =============================
+# 重试策略 & 熔断
+# =============================
+
+# HTTP 状态码：412 / 429 为风控 / 限流，5xx 为服务端临时错误
+RETRYABLE_HTTP_STATUS = {412, 429, 500, 502, 503, 504}
+RISK_HTTP_STATUS = {412, 429}
+# 业务 code：-412 请求被拦截，-352 风控校验失败，-799 请求过于频繁
+RISK_CODES = {-412, -352, -799}
+
+
+class BiliAPIError(RuntimeError):
+    """
+    B 站接口错误。retryable 表示是否值得重试，risk 表示是否触发了风控 / 限流。
+    """
+
+    def __init__(self, message: str, code: int | None = None,
+                 http_status: int | None = None,
+                 retryable: bool = False, risk: bool = False):
+        super().__init__(message)
+        self.code = code
+        self.http_status = http_status
+        self.retryable = retryable
+        self.risk = risk
+
+
+def classify_error(e: Exception) -> BiliAPIError:
+    """
+    把底层异常归类为 BiliAPIError：超时 / 连接错误 / JSON 解析失败 / 5xx 可重试，
+    412 / 429 及风控 code 可重试且计入风控，其余视为不可重试。
+    """
+    if isinstance(e, BiliAPIError):
+        return e
+    if isinstance(e, requests.exceptions.HTTPError):
+        status = e.response.status_code if e.response is not None else None
+        return BiliAPIError(
+            f"HTTP {status}: {e}", http_status=status,
+            retryable=status in RETRYABLE_HTTP_STATUS,
+            risk=status in RISK_HTTP_STATUS,
+        )
+    if isinstance(e, (requests.exceptions.Timeout, requests.exceptions.ConnectionError)):
+        return BiliAPIError(f"network: {e!r}", retryable=True)
+    if isinstance(e, (json.JSONDecodeError, requests.exceptions.JSONDecodeError)):
+        # 被风控时经常返回 HTML 页面，JSON 解析失败
+        return BiliAPIError(f"invalid json: {e!r}", retryable=True)
+    if isinstance(e, requests.exceptions.RequestException):
+        return BiliAPIError(f"request: {e!r}", retryable=True)
+    return BiliAPIError(repr(e))
+
+
+class RetryPolicy:
+    """
+    指数退避 + 抖动（equal jitter）：第 n 次重试前等待 uniform(cap / 2, cap)，
+    cap = min(max_delay, base * 2^(n-1))，风控类错误的 cap 额外乘以 risk_factor（同样不超过 max_delay）。
+    保留一半的确定等待，避免风控后立即重试。
+    """
+
+    def __init__(self, max_attempts: int = 4, base_delay: float = 1.0,
+                 max_delay: float = 30.0, risk_factor: float = 3.0):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.risk_factor = risk_factor
+
+    def backoff(self, attempt: int, err: BiliAPIError) -> float:
+        cap = min(self.max_delay, self.base_delay * (2 ** (attempt - 1)))
+        if err.risk:
+            cap = min(self.max_delay, cap * self.risk_factor)
+        return random.uniform(cap / 2, cap)
+
+
+class CircuitBreaker:
+    """
+    滑动窗口内错误率超过阈值时熔断（open）：所有调用方暂停 cooldown 秒。
+    冷却结束后进入半开（half_open），只放行一个探测请求，其余调用方继续等待；
+    探测成功则恢复（closed），失败则再次熔断 cooldown 秒。线程安全。
+    """
+
+    def __init__(self, window: int = 20, min_calls: int = 8,
+                 error_rate: float = 0.5, cooldown: float = 60.0):
+        self.window = deque(maxlen=window)
+        self.min_calls = min_calls
+        self.error_rate = error_rate
+        self.cooldown = cooldown
+        self.state = "closed"
+        self.open_until = 0.0
+        self.trips = 0
+        self._probe: int | None = None
+        self._probe_since = 0.0
+        self._cond = threading.Condition()
+
+    def wait_if_open(self) -> float:
+        """
+        熔断期间阻塞到可以发出请求为止，返回等待的秒数。
+        """
+        waited = 0.0
+        warned = False
+        with self._cond:
+            while True:
+                now = time.time()
+                if self.state == "closed":
+                    return waited
+                if self.state == "open":
+                    delay = self.open_until - now
+                    if delay <= 0:
+                        self._start_probe(now)
+                        return waited
+                elif now - self._probe_since >= self.cooldown:
+                    # 探测请求迟迟没有结果（调用方异常退出等），换由当前调用方重新探测
+                    self._start_probe(now)
+                    return waited
+                else:
+                    delay = self._probe_since + self.cooldown - now
+                if not warned:
+                    print(f"[warn] 熔断中（{self.state}），暂停最多 {delay:.1f}s 后再请求")
+                    warned = True
+                t0 = time.time()
+                self._cond.wait(delay)
+                waited += time.time() - t0
+
+    def _start_probe(self, now: float) -> None:
+        self.state = "half_open"
+        self._probe = threading.get_ident()
+        self._probe_since = now
+
+    def _open(self, reason: str) -> None:
+        self.state = "open"
+        self.open_until = time.time() + self.cooldown
+        self.trips += 1
+        self.window.clear()
+        print(f"[warn] {reason}，熔断 {self.cooldown:.0f}s（累计第 {self.trips} 次）")
+
+    def record(self, ok: bool) -> None:
+        with self._cond:
+            if self.state != "closed":
+                # 熔断前已发出的请求晚到的结果不计；只有探测请求决定恢复还是再次熔断
+                if self.state == "half_open" and self._probe == threading.get_ident():
+                    self._probe = None
+                    if ok:
+                        self.state = "closed"
+                        self.window.clear()
+                        print("[info] 探测请求成功，熔断恢复")
+                    else:
+                        self._open("探测请求失败")
+                    self._cond.notify_all()
+                return
+            self.window.append(ok)
+            if ok or len(self.window) < self.min_calls:
+                return
+            failures = self.window.count(False)
+            total = len(self.window)
+            if failures / total >= self.error_rate:
+                self._open(f"错误率 {failures}/{total} 超过阈值")
+
+
+class RateLimiter:
+    """
+    令牌桶限流：平均 rate 次/秒，允许 burst 次突发；rate <= 0 表示不限流。线程安全，
+    多账号并发抓取时所有线程共用一个全局限流器，总请求速率不随账号数增加。
+    """
+
+    def __init__(self, rate: float = 0.0, burst: float | None = None):
+        self.rate = rate
+        self.burst = burst if burst is not None else max(1.0, rate)
+        self.tokens = self.burst
+        self.tokens_ts = time.monotonic()
+        self.waited = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.tokens_ts) * self.rate)
+            self.tokens_ts = now
+            # 先预占令牌，不足部分换算为需要等待的时间；锁外睡眠，其他线程按顺序排在后面
+            self.tokens -= 1
+            delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+            self.waited += delay
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def ready_in(self) -> float:
+        """
+        不消耗令牌，估算还需等待多久才有可用令牌（秒）。
+        """
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            tokens = min(self.burst, self.tokens + (time.monotonic() - self.tokens_ts) * self.rate)
+        return 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+
+
+class Credential:
+    """
+    凭据池中的一个 Cookie：自带令牌桶（rate 次/秒）与健康状态。
+    health 为成功率的指数滑动平均；触发风控时隔离 quarantine 秒（连续触发时翻倍）。
+    """
+
+    def __init__(self, name: str, cookie: str, rate: float = 0.0):
+        self.name = name
+        self.cookie = cookie
+        self.bucket = RateLimiter(rate)
+        self.health = 1.0
+        self.quarantined_until = 0.0
+        self.quarantines = 0
+        self.requests = 0
+        self.failures = 0
+        self.last_error: str | None = None
+
+    def quarantined(self, now: float | None = None) -> bool:
+        return self.quarantined_until > (now if now is not None else time.time())
+
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        rate = self.bucket.rate
+        return {
+            "name": self.name,
+            "requests": self.requests,
+            "failures": self.failures,
+            "health": round(self.health, 3),
+            "quarantined": self.quarantined(),
+            "quarantines": self.quarantines,
+            "rate": rate,
+            # 实际请求数占令牌桶容量（rate × 时长）的比例；不限速的凭据为 None
+            "utilization": round(self.requests / (rate * elapsed), 3) if rate > 0 and elapsed > 0 else None,
+            "last_error": self.last_error,
+        }
+
+
+class CredentialPool:
+    """
+    Cookie 凭据池：每次请求选择未被隔离、令牌就绪且最健康的凭据；
+    全部被隔离时选最早解除隔离的一个（不额外等待，由重试退避与熔断器控制节奏）。线程安全。
+    """
+
+    def __init__(self, credentials: List[Credential],
+                 quarantine_sec: float = 600.0,
+                 max_quarantine_sec: float = 6 * 3600.0):
+        if not credentials:
+            raise ValueError("凭据池为空")
+        self.credentials = credentials
+        self.quarantine_sec = quarantine_sec
+        self.max_quarantine_sec = max_quarantine_sec
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+
+    def _find(self, cookie: str | None) -> Credential | None:
+        if not cookie:
+            return None
+        for c in self.credentials:
+            if c.cookie == cookie:
+                return c
+        return None
+
+    def acquire(self, prefer: str | None = None) -> Credential:
+        """
+        选择凭据并消耗它的一个令牌（令牌不足时阻塞等待）。
+        prefer 为优先使用的 Cookie：它未被隔离且令牌就绪时直接使用。
+        """
+        now = time.time()
+        with self._lock:
+            preferred = self._find(prefer)
+            if preferred is not None and not preferred.quarantined(now) and preferred.bucket.ready_in() == 0:
+                chosen = preferred
+            else:
+                healthy = [c for c in self.credentials if not c.quarantined(now)]
+                if healthy:
+                    chosen = max(healthy, key=lambda c: (c.health / (1.0 + c.bucket.ready_in()), -c.requests))
+                else:
+                    chosen = min(self.credentials, key=lambda c: c.quarantined_until)
+            chosen.requests += 1
+        chosen.bucket.acquire()
+        return chosen
+
+    def report(self, cred: Credential, ok: bool, err: "BiliAPIError | None" = None) -> None:
+        with self._lock:
+            cred.health = 0.8 * cred.health + (0.2 if ok else 0.0)
+            if ok:
+                return
+            cred.failures += 1
+            cred.last_error = str(err) if err is not None else None
+            if err is not None and err.risk and len(self.credentials) > 1:
+                cred.quarantines += 1
+                cooldown = min(self.max_quarantine_sec,
+                               self.quarantine_sec * (2 ** (cred.quarantines - 1)))
+                cred.quarantined_until = time.time() + cooldown
+                print(
+                    f"[warn] 凭据 {cred.name} 触发风控（{err}），隔离 {cooldown:.0f}s"
+                    f"（累计第 {cred.quarantines} 次）"
+                )
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.started_at = time.time()
+            for c in self.credentials:
+                c.requests = 0
+                c.failures = 0
+
+    def stats(self) -> List[Dict[str, Any]]:
+        elapsed = time.time() - self.started_at
+        with self._lock:
+            return [c.stats(elapsed) for c in self.credentials]
+
+
+def build_credential_pool() -> CredentialPool:
+    """
+    凭据来源（按 Cookie 去重）：config.CREDENTIALS、config.BILI_COOKIE、各账号的 cookie。
+    只访问公开接口，任一凭据都可以抓取任一账号的数据。
+    """
+    default_rate = getattr(config, "CREDENTIAL_RATE", 0.0)
+    raw = list(getattr(config, "CREDENTIALS", None) or [])
+    raw.append({"name": "default", "cookie": BILI_COOKIE})
+    raw.extend({"name": f"mid:{a['mid']}", "cookie": a["cookie"]} for a in ACCOUNTS)
+
+    creds: List[Credential] = []
+    seen = set()
+    for i, item in enumerate(raw):
+        cookie = item.get("cookie") or ""
+        if cookie in seen:
+            continue
+        seen.add(cookie)
+        creds.append(Credential(item.get("name") or f"cred{i}", cookie, item.get("rate", default_rate)))
+    return CredentialPool(creds, quarantine_sec=getattr(config, "CREDENTIAL_QUARANTINE_SEC", 600.0))
+
+def loads_json(content: bytes) -> Any:
+    """
+    解析响应体：优先 orjson（比标准库快数倍），否则 json.loads。
+    两者的解析错误均为 json.JSONDecodeError 的子类，classify_error 无需区分。
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+DEFAULT_RETRY = RetryPolicy()
+BREAKER = CircuitBreaker()
+# 全局请求速率上限（次/秒），0 为不限。缺省 2 次/秒：单账号数百条投稿的快照几分钟内完成，
+# 多账号并发抓取时总速率也不会超过该值，远低于触发风控（-412 / -799）的频率
+DEFAULT_API_RATE_LIMIT = 2.0
+RATE_LIMITER = RateLimiter(getattr(config, "API_RATE_LIMIT", DEFAULT_API_RATE_LIMIT))
+POOL = build_credential_pool()
+REQUEST_TIMEOUT = 10.0
+
+# 响应录制回调：fn(url, params, data)，由 bench/record_fixtures.py 设置，用于生成回放数据
+_recorder: Callable[[str, Dict[str, Any], Dict[str, Any]], None] | None = None
+
+
+def set_recorder(fn: Callable[[str, Dict[str, Any], Dict[str, Any]], None] | None) -> None:
+    global _recorder
+    _recorder = fn
+
+
+def request_json(url: str,
+                 params: Dict[str, Any] | None = None,
+                 headers: Dict[str, str] | None = None,
+                 policy: RetryPolicy | None = None,
+                 timeout: float | None = None,
+                 what: str = "",
+                 cookie: str | None = None,
+                 no_retry_codes: Collection[int] = ()) -> Dict[str, Any]:
+    """
+    统一的 GET + JSON 解析 + code 检查，按 policy 重试，并受全局熔断器与限流器约束。
+    每次尝试从凭据池选择 Cookie（cookie 参数为优先使用的凭据），重试时可换用其他凭据。
+    返回 code == 0 的完整响应；重试耗尽或遇到不可重试错误时抛出 BiliAPIError。
+    no_retry_codes 中的 code 即使属于风控类也不重试，直接抛给调用方处理（如 WBI 签名被拒绝）。
+    """
+    policy = policy or DEFAULT_RETRY
+    what = what or url.rsplit("/", 1)[-1]
+    last: BiliAPIError | None = None
+
+    for attempt in range(1, policy.max_attempts + 1):
+        BREAKER.wait_if_open()
+        RATE_LIMITER.acquire()
+        cred = POOL.acquire(prefer=cookie)
+        req_headers = dict(headers or COMMON_HEADERS)
+        req_headers["Cookie"] = cred.cookie
+        try:
+            resp = SESSION.get(url, params=params, headers=req_headers,
+                               timeout=timeout or REQUEST_TIMEOUT)
+            resp.raise_for_status()
+            data = loads_json(resp.content)
+            code = data.get("code", 0)
+            if code != 0:
+                raise BiliAPIError(
+                    f"{what} code={code} msg={data.get('message')!r}",
+                    code=code, retryable=code in RISK_CODES and code not in no_retry_codes,
+                    risk=code in RISK_CODES,
+                )
+            BREAKER.record(True)
+            POOL.report(cred, True)
+            if _recorder is not None:
+                _recorder(url, dict(params or {}), data)
+            return data
+        except Exception as e:
+            last = classify_error(e)
+            # 业务层的确定性错误（视频不存在等）说明服务本身正常，不计入熔断
+            BREAKER.record(not last.retryable)
+            POOL.report(cred, not last.retryable, last)
+            if not last.retryable or attempt >= policy.max_attempts:
+                break
+            delay = policy.backoff(attempt, last)
+            print(
+                f"[warn] {what} 失败({attempt}/{policy.max_attempts}): {last}，"
+                f"{delay:.1f}s 后重试"
+            )
+            time.sleep(delay)
+
+    raise last
+
 # =============================
 # WBI 签名
 # =============================
@@ -47,12 +505,15 @@ MIXIN_KEY_ENC_TAB = [
 ]
 
 
+# 预先计算的下标：mixin key 只取重排后的前 32 位
+_MIXIN_INDEXES = MIXIN_KEY_ENC_TAB[:32]
+
+
 def _get_mixin_key(orig: str) -> str:
-    return reduce(lambda s, i: s + orig[i], MIXIN_KEY_ENC_TAB, "")[:32]
+    return "".join(orig[i] for i in _MIXIN_INDEXES)
 
 
-def _sign_wbi(params: Dict[str, Any], img_key: str, sub_key: str) -> Dict[str, Any]:
-    mixin_key = _get_mixin_key(img_key + sub_key)
+def _sign_wbi(params: Dict[str, Any], mixin_key: str) -> Dict[str, Any]:
     curr_time = int(time.time())
 
     params = dict(params)
@@ -71,29 +532,142 @@ def _sign_wbi(params: Dict[str, Any], img_key: str, sub_key: str) -> Dict[str, A
     return filtered
 
 
-_WBI_KEYS: Tuple[str, str] | None = None
-_WBI_KEYS_TS: float | None = None
+# WBI key 缓存：进程内 + 磁盘（wbi_keys.json），cron 每次启动的新进程也无需重新请求 nav。
+# 刷新时持有进程内锁与文件锁（fcntl，Windows 下仅进程内），并发调用方只有一个真正请求 nav，
+# 其余等待后直接读取刷新结果。
+WBI_CACHE_PATH = Path(getattr(config, "WBI_CACHE_PATH", "wbi_keys.json"))
 _WBI_KEYS_TTL = 3600  # 1h
 
+# 签名被拒绝（密钥已轮换）时返回的 code：-403 访问权限不足，-352 风控校验失败
+WBI_REJECT_CODES = {-403, -352}
 
-def _get_wbi_keys() -> Tuple[str, str]:
-    global _WBI_KEYS, _WBI_KEYS_TS
-    now = time.time()
+_WBI_KEYS: Dict[str, Any] | None = None
+_wbi_lock = threading.Lock()
+
+
+def _wbi_fresh(keys: Dict[str, Any] | None, now: float) -> bool:
+    # 切换了接口根地址（如本地替身服务器）时，之前缓存的 key 不再适用
+    return (bool(keys) and keys.get("api_base") == API_BASE
+            and now - keys.get("fetched_at", 0) < _WBI_KEYS_TTL)
+
+
+def _read_wbi_cache() -> Dict[str, Any] | None:
+    try:
+        with open(WBI_CACHE_PATH, encoding="utf-8") as f:
+            keys = json.load(f)
+        if not keys.get("mixin_key"):
+            return None
+        return keys
+    except (OSError, ValueError):
+        return None
+
+
+def _write_wbi_cache(keys: Dict[str, Any]) -> None:
+    tmp = WBI_CACHE_PATH.with_name(WBI_CACHE_PATH.name + f".{os.getpid()}.tmp")
+    try:
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(keys, f)
+        os.replace(tmp, WBI_CACHE_PATH)
+    except OSError as e:
+        print(f"[warn] 写入 WBI key 缓存失败: {e!r}")
+
+
+class _FileLock:
+    """
+    跨进程互斥（fcntl.flock）；不支持 fcntl 的平台上为空操作。
+    """
 
-    if _WBI_KEYS and _WBI_KEYS_TS and (now - _WBI_KEYS_TS < _WBI_KEYS_TTL):
-        return _WBI_KEYS
+    def __init__(self, path: Path):
+        self.path = path
+        self.fd = None
 
-    resp = requests.get(NAV_URL, headers=COMMON_HEADERS, timeout=10)
-    resp.raise_for_status()
-    data = resp.json()
+    def __enter__(self):
+        if fcntl is not None:
+            try:
+                self.fd = open(self.path, "a")
+                fcntl.flock(self.fd, fcntl.LOCK_EX)
+            except OSError:
+                self.fd = None
+        return self
 
-    wbi_img = data["data"]["wbi_img"]
-    img_key = wbi_img["img_url"].rsplit("/", 1)[-1].split(".")[0]
-    sub_key = wbi_img["sub_url"].rsplit("/", 1)[-1].split(".")[0]
+    def __exit__(self, *exc):
+        if self.fd is not None:
+            fcntl.flock(self.fd, fcntl.LOCK_UN)
+            self.fd.close()
+            self.fd = None
 
-    _WBI_KEYS = (img_key, sub_key)
-    _WBI_KEYS_TS = now
-    return _WBI_KEYS
+
+def _get_wbi_keys() -> Dict[str, Any]:
+    """
+    返回 {"img_key", "sub_key", "mixin_key", "fetched_at", "api_base"}，按内存 → 磁盘 → nav 接口的顺序取得。
+    """
+    global _WBI_KEYS
+    now = time.time()
+    keys = _WBI_KEYS
+    if _wbi_fresh(keys, now):
+        return keys
+
+    with _wbi_lock, _FileLock(WBI_CACHE_PATH.with_name(WBI_CACHE_PATH.name + ".lock")):
+        # 等锁期间可能已由其他线程 / 进程刷新
+        now = time.time()
+        if _wbi_fresh(_WBI_KEYS, now):
+            return _WBI_KEYS
+        keys = _read_wbi_cache()
+        if _wbi_fresh(keys, now):
+            _WBI_KEYS = keys
+            return keys
+
+        data = request_json(NAV_URL, what="nav")
+        wbi_img = data["data"]["wbi_img"]
+        img_key = wbi_img["img_url"].rsplit("/", 1)[-1].split(".")[0]
+        sub_key = wbi_img["sub_url"].rsplit("/", 1)[-1].split(".")[0]
+
+        keys = {
+            "img_key": img_key,
+            "sub_key": sub_key,
+            "mixin_key": _get_mixin_key(img_key + sub_key),
+            "fetched_at": now,
+            "api_base": API_BASE,
+        }
+        _write_wbi_cache(keys)
+        _WBI_KEYS = keys
+        return keys
+
+
+def invalidate_wbi_keys(mixin_key: str | None = None) -> None:
+    """
+    签名请求被拒绝时调用：作废内存与磁盘中的 WBI key。
+    传入 mixin_key 时只在缓存仍是这把 key 时作废，避免把其他调用方刚刷新的 key 也清掉。
+    """
+    global _WBI_KEYS
+    with _wbi_lock:
+        if mixin_key is None or (_WBI_KEYS and _WBI_KEYS.get("mixin_key") == mixin_key):
+            _WBI_KEYS = None
+        cached = _read_wbi_cache()
+        if cached and (mixin_key is None or cached.get("mixin_key") == mixin_key):
+            try:
+                WBI_CACHE_PATH.unlink()
+            except OSError:
+                pass
+    print("[warn] WBI 签名被拒绝，已作废缓存的 WBI key，将重新获取")
+
+
+def request_signed(url: str, params: Dict[str, Any], what: str = "",
+                   cookie: str | None = None) -> Dict[str, Any]:
+    """
+    WBI 签名请求：签名被拒绝时不做常规重试，立即作废缓存的 key，用新 key 重新签名后再试
+    （这一次按常规策略重试，-352 仍可能是真正的风控）。
+    """
+    mixin_key = _get_wbi_keys()["mixin_key"]
+    try:
+        return request_json(url, params=_sign_wbi(params, mixin_key), what=what, cookie=cookie,
+                            no_retry_codes=WBI_REJECT_CODES)
+    except BiliAPIError as e:
+        if e.code not in WBI_REJECT_CODES:
+            raise
+        invalidate_wbi_keys(mixin_key)
+        mixin_key = _get_wbi_keys()["mixin_key"]
+        return request_json(url, params=_sign_wbi(params, mixin_key), what=what, cookie=cookie)
 
 
 # =============================
@@ -110,9 +684,9 @@ def fetch_user_archives(
     page_size: int = 30,
     max_pages: int = 100,
     sleep_sec: float = 0.5,
+    cookie: str | None = None,
 ) -> List[Dict[str, Any]]:
 
-    img_key, sub_key = _get_wbi_keys()
     all_videos: List[Dict[str, Any]] = []
 
     for pn in range(1, max_pages + 1):
@@ -131,23 +705,13 @@ def fetch_user_archives(
             "dm_cover_img_str": DM_COVER_IMG_STR,
         }
 
-        signed_params = _sign_wbi(base_params, img_key, sub_key)
-
-        resp = requests.get(
+        # 任一页最终失败都直接抛出，避免静默截断投稿列表导致账号汇总偏小
+        data = request_signed(
             SPACE_ARCHIVE_URL,
-            params=signed_params,
-            headers=COMMON_HEADERS,
-            timeout=10,
+            base_params,
+            what=f"arc.search page {pn}",
+            cookie=cookie,
         )
-        resp.raise_for_status()
-        data = resp.json()
-
-        code = data.get("code", 0)
-        if code != 0:
-            print(
-                f"[warn] arc.search page {pn} code={code} msg={data.get('message')!r}"
-            )
-            break
 
         d = data.get("data") or {}
         vlist = (d.get("list") or {}).get("vlist") or []
@@ -178,7 +742,43 @@ def fetch_user_archives(
 # 单视频详细信息
 # =============================
 
-def fetch_video_info(bvid: str) -> Dict[str, Any]:
+class VideoStat(NamedTuple):
+    """
+    快照只需要的视频字段。view 接口的完整响应含 pages / owner / rights / honor_reply /
+    ugc_season 等大块子树，解析后立即提取为该记录，完整 dict 随即释放。
+    """
+    bvid: str
+    title: str
+    pubdate: int | None
+    duration: int | None
+    view: int
+    like: int
+    coin: int
+    favorite: int
+    reply: int
+    danmaku: int
+    share: int
+
+
+def _video_stat(bvid: str, info: Dict[str, Any]) -> VideoStat:
+    stat = info.get("stat") or {}
+    return VideoStat(
+        bvid,
+        info.get("title") or "",
+        info.get("pubdate"),
+        info.get("duration"),
+        stat.get("view") or 0,
+        stat.get("like") or 0,
+        stat.get("coin") or 0,
+        stat.get("favorite") or 0,
+        stat.get("reply") or 0,
+        stat.get("danmaku") or 0,
+        stat.get("share") or 0,
+    )
+
+def fetch_video_info(bvid: str,
+                     policy: RetryPolicy | None = None,
+                     cookie: str | None = None) -> Dict[str, Any]:
     """
     调用 /x/web-interface/view 获取单视频完整信息：
     - title / desc / pubdate / duration
@@ -186,36 +786,40 @@ def fetch_video_info(bvid: str) -> Dict[str, Any]:
     - stat（view/like/coin/favorite/reply/danmaku/share/...）
     """
     params = {"bvid": bvid}
-    headers = dict(COMMON_HEADERS)
-    headers["Referer"] = f"https://www.bilibili.com/video/{bvid}"
+    headers = _headers(referer=f"https://www.bilibili.com/video/{bvid}")
 
-    resp = requests.get(VIEW_URL, params=params, headers=headers, timeout=10)
-    resp.raise_for_status()
-    data = resp.json()
-    if data.get("code") != 0:
-        raise RuntimeError(f"view 接口错误: {data}")
+    data = request_json(VIEW_URL, params=params, headers=headers, policy=policy,
+                        what=f"view {bvid}", cookie=cookie)
 
     info = data["data"]
     return info
 
 
+def fetch_video_stat(bvid: str,
+                     policy: RetryPolicy | None = None,
+                     cookie: str | None = None) -> VideoStat:
+    """
+    同 fetch_video_info，但只返回快照需要的字段（VideoStat）。
+    """
+    headers = _headers(referer=f"https://www.bilibili.com/video/{bvid}")
+    data = request_json(VIEW_URL, params={"bvid": bvid}, headers=headers, policy=policy,
+                        what=f"view {bvid}", cookie=cookie)
+    return _video_stat(bvid, data["data"])
+
+
 # =============================
 # 粉丝数
 # =============================
 
-def fetch_user_fans(mid: int) -> Dict[str, Any]:
+def fetch_user_fans(mid: int, cookie: str | None = None) -> Dict[str, Any]:
     """
     获取指定 mid 的粉丝数 / 关注数。
     """
     params = {"vmid": mid}
-    headers = dict(COMMON_HEADERS)
-    headers["Referer"] = f"https://space.bilibili.com/{mid}"
+    headers = _headers(referer=f"https://space.bilibili.com/{mid}")
 
-    resp = requests.get(RELATION_STAT_URL, params=params, headers=headers, timeout=10)
-    resp.raise_for_status()
-    data = resp.json()
-    if data.get("code") != 0:
-        raise RuntimeError(f"relation.stat 接口错误: {data}")
+    data = request_json(RELATION_STAT_URL, params=params, headers=headers,
+                        what="relation.stat", cookie=cookie)
 
     return data.get("data", {})
 
@@ -224,18 +828,14 @@ def fetch_user_fans(mid: int) -> Dict[str, Any]:
 #  UP 主资料
 # =============================
 
-def fetch_user_profile(mid: int) -> Dict[str, Any]:
+def fetch_user_profile(mid: int, cookie: str | None = None) -> Dict[str, Any]:
     """
     获取 UP 主空间资料：
     - mid, name, face, sign 等
     """
     params = {"mid": mid}
-    headers = dict(COMMON_HEADERS)
-    headers["Referer"] = f"https://space.bilibili.com/{mid}"
+    headers = _headers(referer=f"https://space.bilibili.com/{mid}")
 
-    resp = requests.get(SPACE_ACC_INFO_URL, params=params, headers=headers, timeout=10)
-    resp.raise_for_status()
-    data = resp.json()
-    if data.get("code") != 0:
-        raise RuntimeError(f"space.acc.info 接口错误: {data}")
+    data = request_json(SPACE_ACC_INFO_URL, params=params, headers=headers,
+                        what="space.acc.info", cookie=cookie)
     return data.get("data", {})
@@ -0,0 +1,396 @@
+#!/usr/bin/env python3
+# bulk_import.py
+#
+# 批量导入外部历史数据到 video_snapshots / account_snapshots。
+# 支持 CSV（首行为表头）、JSON（对象数组）与 JSON Lines；
+# 含 bvid 字段的记录写入 video_snapshots，否则写入 account_snapshots。
+# 记录中没有 mid 字段时归属 --mid 指定的账号（默认账号）。
+#
+# 用法：
+#   python bulk_import.py history.csv [more.jsonl ...] [--replace] [--batch-size 5000] [--mid 12345]
+
+import argparse
+import csv
+import json
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+from accounts import resolve_mid
+from cohort import rebuild_cohort
+from title_search import refresh_titles
+from db import bump_data_version, create_indexes, drop_indexes, get_conn, init_db
+
+VIDEO_COLUMNS = (
+    "snapshot_date", "bvid", "title",
+    "view", "like", "coin", "favorite", "reply", "danmaku", "share",
+    "pubdate", "duration", "snapshot_ts", "mid",
+)
+ACCOUNT_COLUMNS = (
+    "snapshot_date", "follower",
+    "total_view", "total_like", "total_coin",
+    "total_favorite", "total_reply", "total_danmaku", "total_share", "mid",
+)
+
+# 外部数据中常见的别名字段
+FIELD_ALIASES = {
+    "date": "snapshot_date",
+    "day": "snapshot_date",
+    "ts": "snapshot_ts",
+    "timestamp": "snapshot_ts",
+    "time": "snapshot_ts",
+    "views": "view",
+    "likes": "like",
+    "coins": "coin",
+    "favorites": "favorite",
+    "fav": "favorite",
+    "replies": "reply",
+    "danmakus": "danmaku",
+    "dm": "danmaku",
+    "shares": "share",
+    "uid": "mid",
+    "fans": "follower",
+    "followers": "follower",
+}
+
+_INT_COLUMNS = set(VIDEO_COLUMNS + ACCOUNT_COLUMNS) - {"snapshot_date", "bvid", "title", "snapshot_ts", "mid"}
+
+
+# ==========================
+# 读取 & 规整
+# ==========================
+
+def _is_number(value: Any) -> bool:
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, (int, float)):
+        return True
+    return isinstance(value, str) and value.strip().replace(".", "", 1).isdigit()
+
+
+def _epoch_seconds(value: Any) -> int:
+    # 数字时间戳：超过 1e11 的视为毫秒（1e11 秒已是 5138 年）
+    ts = float(value)
+    return int(ts / 1000 if ts > 1e11 else ts)
+
+
+def normalize_date(value: Any) -> str:
+    """
+    统一为 YYYY-MM-DD：支持 ISO 日期/时间字符串、YYYY/MM/DD、YYYYMMDD、epoch 秒 / 毫秒（按本地时间取日期）。
+    """
+    if _is_number(value):
+        text = str(value).strip()
+        # 8 位纯数字先按 YYYYMMDD 解析：作为 epoch 秒只能落在 1970 年，不会是真实的采样时间
+        if len(text) == 8 and text.isdigit():
+            try:
+                return datetime.strptime(text, "%Y%m%d").date().isoformat()
+            except ValueError:
+                pass
+        try:
+            return datetime.fromtimestamp(_epoch_seconds(value)).date().isoformat()
+        except (OverflowError, OSError) as e:
+            raise ValueError(f"无法识别的日期: {value!r}") from e
+    text = str(value).strip().replace("/", "-")
+    try:
+        return date.fromisoformat(text[:10]).isoformat()
+    except ValueError:
+        raise ValueError(f"无法识别的日期: {value!r}")
+
+
+def normalize_ts(value: Any) -> int:
+    """
+    采样时刻统一为 epoch 秒：支持数字（秒 / 毫秒）与 ISO 时间字符串（无时区按本地时间）。
+    """
+    if _is_number(value):
+        return _epoch_seconds(value)
+    return int(datetime.fromisoformat(str(value).strip()).timestamp())
+
+
+def _to_int(value: Any) -> int | None:
+    if value is None or value == "":
+        return None
+    return int(float(value))
+
+
+def normalize_record(raw: Dict[str, Any], mid: str | None = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    返回 (kind, record)，kind 为 "video" 或 "account"。
+    """
+    rec: Dict[str, Any] = {}
+    for k, v in raw.items():
+        key = FIELD_ALIASES.get(str(k).strip().lower(), str(k).strip().lower())
+        rec[key] = v
+
+    if not rec.get("snapshot_date"):
+        if not rec.get("snapshot_ts"):
+            raise ValueError(f"缺少 snapshot_date: {raw!r}")
+        rec["snapshot_date"] = rec["snapshot_ts"]
+    rec["snapshot_date"] = normalize_date(rec["snapshot_date"])
+
+    # 只有日期的历史数据：snapshot_ts 先留空，导入后由 dedup_snapshots 按日去重，
+    # 再补为当日本地 00:00（与数字时间戳换算日期时使用同一时区）
+    if rec.get("snapshot_ts") not in (None, ""):
+        rec["snapshot_ts"] = normalize_ts(rec["snapshot_ts"])
+    else:
+        rec["snapshot_ts"] = None
+
+    for k in _INT_COLUMNS:
+        if k in rec:
+            rec[k] = _to_int(rec[k])
+    rec["mid"] = resolve_mid(str(rec.get("mid") or "").strip() or mid)
+
+    kind = "video" if rec.get("bvid") else "account"
+    return kind, rec
+
+
+def iter_records(path: Path) -> Iterator[Dict[str, Any]]:
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        with path.open(newline="", encoding="utf-8-sig") as f:
+            yield from csv.DictReader(f)
+    elif suffix in (".jsonl", ".ndjson"):
+        with path.open(encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    elif suffix == ".json":
+        with path.open(encoding="utf-8") as f:
+            data = json.load(f)
+        if isinstance(data, dict):
+            # 兼容 {"BVxxx": [{...}, ...]} 这种按视频分组的结构
+            for bvid, rows in data.items():
+                for r in rows:
+                    r.setdefault("bvid", bvid)
+                    yield r
+        else:
+            yield from data
+    else:
+        raise ValueError(f"不支持的文件格式: {path}")
+
+
+# ==========================
+# 批量写入
+# ==========================
+
+def _insert_sql(table: str, columns: Tuple[str, ...]) -> str:
+    cols = ", ".join(f'"{c}"' for c in columns)
+    marks = ", ".join("?" for _ in columns)
+    return f"INSERT INTO {table} ({cols}) VALUES ({marks});"
+
+
+# 只有日期的导入记录按日合并时，覆盖到当天最后一次采样上的字段
+_DAY_MERGE_COLUMNS = (
+    "title", "view", "like", "coin", "favorite", "reply", "danmaku", "share", "pubdate", "duration",
+)
+
+
+def dedup_snapshots(cur, replace: bool = False) -> Tuple[int, int]:
+    """
+    视频快照去重：
+    - 带采样时刻的记录按 (mid, bvid, snapshot_date, snapshot_ts) 去重（一天内的多次采样各自保留）；
+    - 只有日期的导入记录（snapshot_ts 为空）按 (mid, bvid, snapshot_date) 去重：当天已有采样时，
+      replace=False 丢弃导入记录，replace=True 以导入记录的各项数值覆盖当天最后一次采样；
+      当天没有采样的保留一条，snapshot_ts 补为当日本地 00:00。
+    账号按 (mid, snapshot_date) 去重。
+    replace=False：保留最早写入的一条（已有数据优先）；replace=True：保留最后写入的一条。
+    """
+    keep = "MAX(id)" if replace else "MIN(id)"
+    cur.execute(
+        f"""
+        DELETE FROM video_snapshots
+        WHERE snapshot_ts IS NOT NULL AND id NOT IN (
+            SELECT {keep} FROM video_snapshots
+            WHERE snapshot_ts IS NOT NULL
+            GROUP BY mid, bvid, snapshot_date, snapshot_ts
+        );
+        """
+    )
+    video_removed = cur.rowcount
+    cur.execute(
+        f"""
+        DELETE FROM video_snapshots
+        WHERE snapshot_ts IS NULL AND id NOT IN (
+            SELECT {keep} FROM video_snapshots
+            WHERE snapshot_ts IS NULL
+            GROUP BY mid, bvid, snapshot_date
+        );
+        """
+    )
+    video_removed += cur.rowcount
+
+    if replace:
+        cols = ", ".join(f'"{c}"' for c in _DAY_MERGE_COLUMNS)
+        merged = ", ".join(f'COALESCE(n."{c}", v."{c}")' for c in _DAY_MERGE_COLUMNS)
+        # 逐条定位当天 snapshot_ts 最大的已有采样；导入后尚未 ANALYZE，规划器会误选 (mid, snapshot_date) 索引，
+        # 这里及下面的按日查找都指定 (bvid, snapshot_date, snapshot_ts) 索引
+        cur.execute(
+            f"""
+            UPDATE video_snapshots AS v
+            SET ({cols}) = (
+                SELECT {merged} FROM video_snapshots n INDEXED BY idx_video_snapshots_bvid_date_ts
+                WHERE n.snapshot_ts IS NULL
+                  AND n.bvid = v.bvid AND n.snapshot_date = v.snapshot_date AND n.mid = v.mid
+            )
+            WHERE v.id IN (
+                SELECT (
+                    SELECT w.id FROM video_snapshots w INDEXED BY idx_video_snapshots_bvid_date_ts
+                    WHERE w.bvid = n.bvid AND w.snapshot_date = n.snapshot_date AND w.mid = n.mid
+                      AND w.snapshot_ts IS NOT NULL
+                    ORDER BY w.snapshot_ts DESC, w.id DESC
+                    LIMIT 1
+                )
+                FROM video_snapshots n
+                WHERE n.snapshot_ts IS NULL
+            );
+            """
+        )
+    cur.execute(
+        """
+        DELETE FROM video_snapshots AS n
+        WHERE n.snapshot_ts IS NULL AND EXISTS (
+            SELECT 1 FROM video_snapshots w INDEXED BY idx_video_snapshots_bvid_date_ts
+            WHERE w.bvid = n.bvid AND w.snapshot_date = n.snapshot_date AND w.mid = n.mid
+              AND w.snapshot_ts IS NOT NULL
+        );
+        """
+    )
+    video_removed += cur.rowcount
+    # 'utc' 修饰符把本地时间的当日 00:00 换算为 UTC，与 datetime.fromisoformat(date).timestamp() 一致
+    cur.execute(
+        """
+        UPDATE video_snapshots
+        SET snapshot_ts = CAST(strftime('%s', snapshot_date, 'utc') AS INTEGER)
+        WHERE snapshot_ts IS NULL;
+        """
+    )
+
+    cur.execute(
+        f"""
+        DELETE FROM account_snapshots
+        WHERE id NOT IN (
+            SELECT {keep} FROM account_snapshots GROUP BY mid, snapshot_date
+        );
+        """
+    )
+    return video_removed, cur.rowcount
+
+
+def bulk_insert(records: Iterable[Dict[str, Any]],
+                db_path: Path | None = None,
+                replace: bool = False,
+                batch_size: int = 5000,
+                mid: str | None = None) -> Dict[str, int]:
+    """
+    批量写入已规整或原始记录（没有 mid 字段的记录归属 mid 账号）：
+    - 导入期间删除索引，以 WAL + synchronous=NORMAL 按 batch_size 分批提交；
+    - 全部写完后重建索引并按日期去重。
+    """
+    init_db(db_path)
+    conn = get_conn(db_path)
+    cur = conn.cursor()
+    # 保持 init_db 设置的 WAL：导入期间 Web 端与 daemon 仍可读取，进程崩溃也不会损坏数据库；
+    # WAL 下 NORMAL 只在检查点时同步写盘，批量提交的开销已经很小（synchronous 只作用于本连接）
+    cur.execute("PRAGMA journal_mode = WAL;")
+    cur.execute("PRAGMA synchronous = NORMAL;")
+    cur.execute("PRAGMA cache_size = -65536;")
+
+    video_sql = _insert_sql("video_snapshots", VIDEO_COLUMNS)
+    account_sql = _insert_sql("account_snapshots", ACCOUNT_COLUMNS)
+
+    stats = {"video": 0, "account": 0, "invalid": 0}
+    mids = set()
+    video_batch: List[Tuple[Any, ...]] = []
+    account_batch: List[Tuple[Any, ...]] = []
+
+    def flush():
+        if video_batch:
+            cur.executemany(video_sql, video_batch)
+            video_batch.clear()
+        if account_batch:
+            cur.executemany(account_sql, account_batch)
+            account_batch.clear()
+        conn.commit()
+
+    drop_indexes(cur)
+    conn.commit()
+    try:
+        for raw in records:
+            try:
+                kind, rec = normalize_record(raw, mid)
+            except (ValueError, TypeError) as e:
+                stats["invalid"] += 1
+                if stats["invalid"] <= 10:
+                    print(f"[import] 跳过无效记录: {e}")
+                continue
+
+            mids.add(rec["mid"])
+            if kind == "video":
+                video_batch.append(tuple(rec.get(c) for c in VIDEO_COLUMNS))
+            else:
+                account_batch.append(tuple(rec.get(c) for c in ACCOUNT_COLUMNS))
+            stats[kind] += 1
+
+            if len(video_batch) + len(account_batch) >= batch_size:
+                flush()
+        flush()
+    finally:
+        create_indexes(cur)
+        conn.commit()
+
+    video_removed, account_removed = dedup_snapshots(cur, replace=replace)
+    stats["video_duplicates"] = video_removed
+    stats["account_duplicates"] = account_removed
+    conn.commit()
+
+    # 导入的历史快照绕过了快照任务，cohort 矩阵整体重建、标题索引按最新采样刷新
+    rebuild_cohort(cur)
+    refresh_titles(cur)
+    for m in mids:
+        bump_data_version(cur, m)
+    conn.commit()
+
+    cur.execute("ANALYZE;")
+    conn.commit()
+    conn.close()
+    return stats
+
+
+def import_files(paths: List[Path],
+                 db_path: Path | None = None,
+                 replace: bool = False,
+                 batch_size: int = 5000,
+                 mid: str | None = None) -> Dict[str, int]:
+
+    def all_records():
+        for p in paths:
+            print(f"[import] 读取 {p}")
+            yield from iter_records(p)
+
+    return bulk_insert(all_records(), db_path=db_path, replace=replace, batch_size=batch_size, mid=mid)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批量导入历史快照数据")
+    parser.add_argument("files", nargs="+", type=Path, help="CSV / JSON / JSONL 文件")
+    parser.add_argument("--db", type=Path, default=None, help="目标数据库（默认 biliinsights.db）")
+    parser.add_argument("--replace", action="store_true",
+                        help="同一 (bvid, snapshot_date) 已存在时用导入数据覆盖（默认保留已有数据）")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--mid", default=None, help="记录中没有 mid 字段时归属的账号（默认账号）")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    stats = import_files(args.files, db_path=args.db, replace=args.replace,
+                         batch_size=args.batch_size, mid=args.mid)
+    elapsed = time.perf_counter() - t0
+    print(
+        f"[import] 完成：视频快照 {stats['video']} 条（去重 {stats['video_duplicates']}），"
+        f"账号快照 {stats['account']} 条（去重 {stats['account_duplicates']}），"
+        f"无效 {stats['invalid']} 条，耗时 {elapsed:.1f}s"
+    )
+
+
+if __name__ == "__main__":
+    main()
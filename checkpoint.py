@@ -0,0 +1,178 @@
+# checkpoint.py
+#
+# 快照任务断点续跑：每次 run_snapshot 生成一个 run_id，
+# 投稿列表、逐视频拉取状态（pending / done / failed）及解析后的统计实时落库。
+# 进程中途退出后，run_snapshot(resume=True) 只补拉未完成的视频，再汇总账号维度。
+# 任务结束（完成或被放弃）后投稿列表等 JSON 即清空，超过 RUN_RETENTION_DAYS 的已结束任务连同逐视频记录一并删除。
+
+import json
+import sqlite3
+import time
+from typing import Any, Dict, Iterable, List
+
+STAT_FIELDS = ("view", "like", "coin", "favorite", "reply", "danmaku", "share")
+
+# 已结束任务的保留天数（只用于排查，不再参与恢复）
+RUN_RETENTION_DAYS = 7
+
+
+def create_run(cur: sqlite3.Cursor,
+               mid: str,
+               snapshot_date: str,
+               archives: List[Dict[str, Any]],
+               carried: List[str],
+               adaptive: bool) -> int:
+    now = int(time.time())
+    cur.execute(
+        """
+        INSERT INTO snapshot_runs (mid, snapshot_date, status, adaptive, archives_json, carried_json, started_at)
+        VALUES (?, ?, 'running', ?, ?, ?, ?);
+        """,
+        (mid, snapshot_date, int(adaptive), json.dumps(archives, ensure_ascii=False), json.dumps(carried), now),
+    )
+    run_id = cur.lastrowid
+    cur.executemany(
+        """
+        INSERT OR IGNORE INTO snapshot_run_items (run_id, seq, bvid, title, status, updated_at)
+        VALUES (?, ?, ?, ?, 'pending', ?);
+        """,
+        [
+            (run_id, seq, v["bvid"], v.get("title") or "", now)
+            for seq, v in enumerate(archives, start=1) if v.get("bvid")
+        ],
+    )
+    return run_id
+
+
+def load_run(cur: sqlite3.Cursor, mid: str, run_id: int | None = None) -> Dict[str, Any] | None:
+    """
+    取指定 run_id，或该账号最近一次未完成（status='running'）的任务。
+    """
+    if run_id is not None:
+        cur.execute("SELECT * FROM snapshot_runs WHERE run_id = ? AND mid = ?;", (run_id, mid))
+    else:
+        cur.execute(
+            "SELECT * FROM snapshot_runs WHERE status = 'running' AND mid = ? "
+            "ORDER BY run_id DESC LIMIT 1;",
+            (mid,),
+        )
+    row = cur.fetchone()
+    if not row:
+        return None
+    run = dict(row)
+    run["archives"] = json.loads(run.pop("archives_json") or "[]")
+    run["carried"] = json.loads(run.pop("carried_json") or "[]")
+    return run
+
+
+def run_owner(cur: sqlite3.Cursor, run_id: int) -> str | None:
+    """
+    任务所属账号；run_id 不存在时返回 None。
+    """
+    cur.execute("SELECT mid FROM snapshot_runs WHERE run_id = ?;", (run_id,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def unfinished_items(cur: sqlite3.Cursor, run_id: int) -> List[Dict[str, Any]]:
+    cur.execute(
+        """
+        SELECT seq, bvid, title, status
+        FROM snapshot_run_items
+        WHERE run_id = ? AND status != 'done'
+        ORDER BY seq ASC;
+        """,
+        (run_id,),
+    )
+    return [dict(r) for r in cur.fetchall()]
+
+
+def mark_done(cur: sqlite3.Cursor, run_id: int, bvid: str, stats: Dict[str, int]) -> None:
+    cur.execute(
+        f"""
+        UPDATE snapshot_run_items
+        SET status = 'done', reason = NULL, updated_at = ?,
+            {", ".join(f'"{k}" = ?' for k in STAT_FIELDS)}
+        WHERE run_id = ? AND bvid = ?;
+        """,
+        (int(time.time()), *(stats.get(k) or 0 for k in STAT_FIELDS), run_id, bvid),
+    )
+
+
+def mark_failed(cur: sqlite3.Cursor, run_id: int, bvid: str, reason: str) -> None:
+    cur.execute(
+        """
+        UPDATE snapshot_run_items
+        SET status = 'failed', reason = ?, updated_at = ?
+        WHERE run_id = ? AND bvid = ?;
+        """,
+        (reason, int(time.time()), run_id, bvid),
+    )
+
+
+def done_totals(cur: sqlite3.Cursor, run_id: int) -> Dict[str, int]:
+    cur.execute(
+        f"""
+        SELECT COUNT(*), {", ".join(f'SUM("{k}")' for k in STAT_FIELDS)}
+        FROM snapshot_run_items
+        WHERE run_id = ? AND status = 'done';
+        """,
+        (run_id,),
+    )
+    row = cur.fetchone()
+    totals = {k: int(v or 0) for k, v in zip(STAT_FIELDS, row[1:])}
+    totals["count"] = int(row[0] or 0)
+    return totals
+
+
+def failed_items(cur: sqlite3.Cursor, run_id: int) -> List[Dict[str, Any]]:
+    cur.execute(
+        """
+        SELECT bvid, title, reason
+        FROM snapshot_run_items
+        WHERE run_id = ? AND status = 'failed'
+        ORDER BY seq ASC;
+        """,
+        (run_id,),
+    )
+    return [dict(r) for r in cur.fetchall()]
+
+
+def finish_run(cur: sqlite3.Cursor, run_id: int, status: str = "done") -> None:
+    # 已完成的任务不会再被恢复，投稿列表与沿用列表不再需要
+    cur.execute(
+        "UPDATE snapshot_runs SET status = ?, finished_at = ?, archives_json = NULL, carried_json = NULL "
+        "WHERE run_id = ?;",
+        (status, int(time.time()), run_id),
+    )
+
+
+def abandon_runs(cur: sqlite3.Cursor, mid: str, keep: Iterable[int] = ()) -> int:
+    """
+    新任务开始时，将该账号遗留的未完成任务标记为 abandoned，避免之后被误恢复。
+    其他账号正在并发执行的任务不受影响。
+    """
+    keep = tuple(keep)
+    marks = ", ".join("?" for _ in keep)
+    sql = (
+        "UPDATE snapshot_runs SET status = 'abandoned', archives_json = NULL, carried_json = NULL "
+        "WHERE status = 'running' AND mid = ?"
+    )
+    if keep:
+        sql += f" AND run_id NOT IN ({marks})"
+    cur.execute(sql + ";", (mid, *keep))
+    return cur.rowcount
+
+
+def prune_runs(cur: sqlite3.Cursor, mid: str, now: int, keep_days: int = RUN_RETENTION_DAYS) -> int:
+    """
+    删除该账号开始于 keep_days 天前、已结束（非 running）的任务及其逐视频记录，返回删除的任务数。
+    """
+    cutoff = now - keep_days * 86400
+    where = "mid = ? AND status != 'running' AND started_at < ?"
+    cur.execute(
+        f"DELETE FROM snapshot_run_items WHERE run_id IN (SELECT run_id FROM snapshot_runs WHERE {where});",
+        (mid, cutoff),
+    )
+    cur.execute(f"DELETE FROM snapshot_runs WHERE {where};", (mid, cutoff))
+    return cur.rowcount
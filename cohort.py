@@ -0,0 +1,78 @@
+# cohort.py
+#
+# 发布后第 N 天的 cohort 矩阵：video_cohort 表每个 (mid, bvid, 发布后天数) 一行，
+# 保存当天最后一次采样的各项计数。run_snapshot 每写入一条视频快照就增量更新对应的格子，
+# 分析接口直接读取该表，无需再从全部历史快照中对齐发布日。
+# 发布日与快照日均按本地日期计算（snapshot_date 即本地日期）；只保留发布后 COHORT_MAX_DAYS 天以内的数据。
+
+import sqlite3
+from datetime import date
+from typing import Any, Dict
+
+COHORT_MAX_DAYS = 180
+COHORT_METRICS = ("view", "like", "coin", "favorite", "reply", "danmaku", "share")
+
+_COLUMNS = ", ".join(f'"{k}"' for k in COHORT_METRICS)
+_UPSERT_SQL = f"""
+    INSERT INTO video_cohort (mid, bvid, age, {_COLUMNS}, snapshot_ts)
+    VALUES (?, ?, ?, {", ".join("?" for _ in COHORT_METRICS)}, ?)
+    ON CONFLICT(mid, age, bvid) DO UPDATE SET
+        {", ".join(f'"{k}" = excluded."{k}"' for k in COHORT_METRICS)},
+        snapshot_ts = excluded.snapshot_ts
+    WHERE excluded.snapshot_ts >= video_cohort.snapshot_ts;
+"""
+
+
+def age_days(snapshot_date: str, pubdate: int | None) -> int | None:
+    """
+    快照日距发布日的天数；发布时间未知时返回 None。
+    """
+    if not pubdate or pubdate <= 0:
+        return None
+    return date.fromisoformat(snapshot_date).toordinal() - date.fromtimestamp(int(pubdate)).toordinal()
+
+
+def record_sample(cur: sqlite3.Cursor,
+                  mid: str,
+                  bvid: str,
+                  pubdate: int | None,
+                  snapshot_date: str,
+                  snapshot_ts: int,
+                  stats: Dict[str, Any]) -> bool:
+    """
+    把一次视频采样写入 cohort 矩阵；同一天内更晚的采样覆盖更早的。超出范围时不写入，返回 False。
+    """
+    age = age_days(snapshot_date, pubdate)
+    if age is None or age < 0 or age > COHORT_MAX_DAYS:
+        return False
+    cur.execute(
+        _UPSERT_SQL,
+        (mid, bvid, age, *(int(stats.get(k) or 0) for k in COHORT_METRICS), snapshot_ts),
+    )
+    return True
+
+
+def rebuild_cohort(cur: sqlite3.Cursor, mid: str | None = None) -> int:
+    """
+    从 video_snapshots 全量重建 cohort 矩阵（旧库首次升级、批量导入之后使用）。
+    按采样时刻顺序写入，INSERT OR REPLACE 使每天最后一次采样生效。返回写入的行数。
+    """
+    where, params = ("AND mid = ?", (mid,)) if mid is not None else ("", ())
+    cur.execute(f"DELETE FROM video_cohort WHERE 1 = 1 {where};", params)
+    cur.execute(
+        f"""
+        INSERT OR REPLACE INTO video_cohort (mid, bvid, age, {_COLUMNS}, snapshot_ts)
+        SELECT mid, bvid, age, {_COLUMNS}, snapshot_ts FROM (
+            SELECT mid, bvid,
+                   CAST(julianday(snapshot_date) - julianday(date(pubdate, 'unixepoch', 'localtime')) AS INTEGER) AS age,
+                   {", ".join(f'COALESCE("{k}", 0) AS "{k}"' for k in COHORT_METRICS)},
+                   COALESCE(snapshot_ts, 0) AS snapshot_ts, id
+            FROM video_snapshots
+            WHERE pubdate > 0 {where}
+        )
+        WHERE age BETWEEN 0 AND ?
+        ORDER BY snapshot_ts ASC, id ASC;
+        """,
+        (*params, COHORT_MAX_DAYS),
+    )
+    return cur.rowcount
@@ -6,4 +6,50 @@ MY_MID = "你的 B 站账户 UID"
 
 ACCOUNT_NAME = "你的 B 站账户昵称"
 ACCOUNT_INTRO = "你的 B 站账户简介"
-AVATAR_PATH = "esp32/resources/你的 B 站账户头像.jpg"
\ No newline at end of file
+AVATAR_PATH = "esp32/resources/你的 B 站账户头像.jpg"
+
+# 多账号（可选）：配置后忽略上面的 MY_MID / ACCOUNT_NAME 等单账号配置，第一个账号为默认账号。
+# cookie 省略时使用 BILI_COOKIE；device 为该账号墨水屏设备名，看板输出到 esp_output/<device>/
+# ACCOUNTS = [
+#     {"mid": "UID1", "name": "昵称1", "intro": "简介1", "avatar": "esp32/resources/avatar1.jpg"},
+#     {"mid": "UID2", "cookie": "账号 2 的 COOKIE", "name": "昵称2", "device": "living-room"},
+# ]
+# 全局请求速率上限（次/秒）与并发抓取的账号数。所有账号、所有线程共用这一上限；
+# 缺省 2 次/秒较为保守，设为 0 则不限流（容易触发 -412 / -799 风控，不建议）
+API_RATE_LIMIT = 2
+SNAPSHOT_WORKERS = 4
+
+# 凭据池（可选）：请求在这些 Cookie、BILI_COOKIE 与各账号 cookie 之间轮换，优先使用最健康的一个。
+# rate 为单个 Cookie 的请求上限（次/秒，缺省为 CREDENTIAL_RATE，0 为不限）；
+# 触发风控的 Cookie 自动隔离 CREDENTIAL_QUARANTINE_SEC 秒（连续触发时翻倍）。
+# CREDENTIALS = [
+#     {"name": "小号1", "cookie": "COOKIE1", "rate": 2},
+#     {"name": "小号2", "cookie": "COOKIE2"},
+# ]
+CREDENTIAL_RATE = 0
+CREDENTIAL_QUARANTINE_SEC = 600
+
+# 常驻调度（daemon.py）：执行间隔（分钟）、随机抖动（秒）、是否自适应轮询、是否在 app.py 进程内运行
+DAEMON_INTERVAL_MIN = 60
+DAEMON_JITTER_SEC = 120
+DAEMON_ADAPTIVE = True
+DAEMON_IN_APP = False
+
+# 墨水屏看板底部显示昨日播放涨幅前三的视频，替代默认的“最近发布”
+ESP_MOVERS_PANEL = False
+
+# 墨水屏看板直接画在 7 色调色板画布上，只对头像做误差扩散；设为 False 回退为 RGB 画布 + 整幅误差扩散
+ESP_PALETTE_RENDER = True
+
+# 渲染的墨水屏目标（见 render_targets.RENDER_TARGETS）：7c_800x480 为 7.3 寸 7 色屏，
+# bwr_400x300 / bw_400x300 为 4.2 寸黑白红 / 黑白屏；多个目标时共用一次数据准备，并行渲染
+ESP_RENDER_TARGETS = ["7c_800x480"]
+
+# 渲染时同时写出预览图；默认不写，预览图在请求 /api/esp32/preview.png 时从帧缓冲即时生成
+ESP_WRITE_PREVIEWS = False
+
+# 接口根地址（可选）：指向 bench/standin_server.py 等本地替身服务器，默认 https://api.bilibili.com
+# BILI_API_BASE = "http://127.0.0.1:18765"
+
+# WBI 签名 key 的磁盘缓存（多个进程共享，1 小时有效）
+# WBI_CACHE_PATH = "wbi_keys.json"
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+# daemon.py
+#
+# 常驻调度进程：替代 cron + snapshot_job.py + esp_render.py 的组合。
+# 进程内保持 HTTP 连接池、WBI key、字体与 NumPy/PIL 等常驻，
+# 按 “快照 → 渲染 → 缓存失效” 流水线定时执行（带随机抖动），数据无变化时跳过渲染。
+# 多账号时并发抓取全部账号，只为数据有变化的账号重新渲染看板。
+#
+# 用法：
+#   python daemon.py                      # 按 config 中的间隔常驻运行
+#   python daemon.py --interval 60 --once # 只执行一轮
+#
+# 运行状态写入 daemon_status.json，Web 端通过 /api/daemon/status 查看。
+
+import argparse
+import json
+import os
+import random
+import signal
+import threading
+import time
+import traceback
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import config
+from accounts import ACCOUNTS
+from db import get_data_version, init_db
+
+STATUS_PATH = Path("daemon_status.json")
+
+DEFAULT_INTERVAL_MIN = getattr(config, "DAEMON_INTERVAL_MIN", 60)
+DEFAULT_JITTER_SEC = getattr(config, "DAEMON_JITTER_SEC", 120)
+DEFAULT_ADAPTIVE = getattr(config, "DAEMON_ADAPTIVE", True)
+
+# 数据版本变化后调用的回调（缓存失效等），参数为新的数据版本号。
+# 内存缓存（看板、序列 / 降采样、排行）都在 Web 进程内，由 app.py 注册；
+# 独立运行的 daemon 进程没有这些缓存，Web 端的缓存按数据版本自行失效。
+_invalidation_hooks: List[Callable[[str], None]] = []
+
+
+def on_data_changed(fn: Callable[[str], None]) -> Callable[[str], None]:
+    _invalidation_hooks.append(fn)
+    return fn
+
+
+def _now_str() -> str:
+    return datetime.now().isoformat(timespec="seconds")
+
+
+def write_status(status: Dict[str, Any]) -> None:
+    # 先写临时文件再替换，Web 端不会读到写了一半的 JSON
+    tmp = STATUS_PATH.with_suffix(".json.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(status, f, ensure_ascii=False, indent=2)
+    os.replace(tmp, STATUS_PATH)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # 进程存在，只是属于其他用户
+        return True
+    except OSError:
+        return False
+    return True
+
+
+def read_status() -> Dict[str, Any] | None:
+    """
+    读取 daemon_status.json；写入该文件的进程已退出（被 kill、崩溃）时 state 报告为 stopped。
+    """
+    if not STATUS_PATH.exists():
+        return None
+    try:
+        with open(STATUS_PATH, encoding="utf-8") as f:
+            status = json.load(f)
+    except (OSError, ValueError):
+        return None
+    pid = status.get("pid")
+    if status.get("state") != "stopped" and not (isinstance(pid, int) and _pid_alive(pid)):
+        status["state"] = "stopped"
+        status["next_run_at"] = None
+    return status
+
+
+class Daemon:
+
+    def __init__(self,
+                 interval_min: float = DEFAULT_INTERVAL_MIN,
+                 jitter_sec: float = DEFAULT_JITTER_SEC,
+                 adaptive: bool = DEFAULT_ADAPTIVE,
+                 render: bool = True):
+        self.interval_sec = interval_min * 60
+        self.jitter_sec = jitter_sec
+        self.adaptive = adaptive
+        self.render = render
+        self.stop_event = threading.Event()
+        self.last_version: str | None = None
+        self.last_render_versions: Dict[str, str] = {}
+        self.status: Dict[str, Any] = {
+            "pid": os.getpid(),
+            "started_at": _now_str(),
+            "state": "idle",
+            "interval_sec": self.interval_sec,
+            "jitter_sec": self.jitter_sec,
+            "adaptive": self.adaptive,
+            "runs": 0,
+            "last_run": None,
+            "next_run_at": None,
+        }
+
+    def _set_state(self, state: str) -> None:
+        self.status["state"] = state
+        write_status(self.status)
+
+    def run_pipeline(self) -> Dict[str, Any]:
+        # 延迟导入：首次执行时加载，之后常驻于进程内
+        from snapshot_job import run_all_snapshots
+        import esp_render
+
+        run: Dict[str, Any] = {"started_at": _now_str(), "timings": {}, "error": None}
+        t_all = time.perf_counter()
+        try:
+            self._set_state("snapshot")
+            t0 = time.perf_counter()
+            run["snapshot"] = run_all_snapshots(adaptive=self.adaptive)
+            run["timings"]["snapshot"] = round(time.perf_counter() - t0, 3)
+
+            version = get_data_version()
+            run["data_version"] = version
+            changed = version != self.last_version
+            self.last_version = version
+
+            versions = {a["mid"]: get_data_version(a["mid"]) for a in ACCOUNTS}
+            stale = [m for m, v in versions.items() if v != self.last_render_versions.get(m)]
+            if self.render and stale:
+                self._set_state("render")
+                t0 = time.perf_counter()
+                esp_render.main(stale)
+                run["timings"]["render"] = round(time.perf_counter() - t0, 3)
+                self.last_render_versions.update({m: versions[m] for m in stale})
+            run["rendered"] = stale if self.render else []
+
+            if changed:
+                self._set_state("invalidate")
+                t0 = time.perf_counter()
+                for hook in _invalidation_hooks:
+                    hook(version)
+                run["timings"]["invalidate"] = round(time.perf_counter() - t0, 3)
+        except Exception as e:
+            run["error"] = repr(e)
+            print(f"[daemon] 本轮执行失败: {e!r}")
+            traceback.print_exc()
+
+        run["timings"]["total"] = round(time.perf_counter() - t_all, 3)
+        run["finished_at"] = _now_str()
+        self.status["runs"] += 1
+        self.status["last_run"] = run
+        self._set_state("idle")
+        return run
+
+    def next_delay(self) -> float:
+        jitter = random.uniform(-self.jitter_sec, self.jitter_sec)
+        return max(1.0, self.interval_sec + jitter)
+
+    def run_forever(self) -> None:
+        init_db()
+        print(
+            f"[daemon] 启动：间隔 {self.interval_sec:.0f}s ± {self.jitter_sec:.0f}s，"
+            f"adaptive={self.adaptive}, render={self.render}"
+        )
+        while not self.stop_event.is_set():
+            run = self.run_pipeline()
+            delay = self.next_delay()
+            self.status["next_run_at"] = datetime.fromtimestamp(time.time() + delay).isoformat(timespec="seconds")
+            write_status(self.status)
+            print(
+                f"[daemon] 本轮耗时 {run['timings']['total']:.1f}s，"
+                f"{delay:.0f}s 后执行下一轮（{self.status['next_run_at']}）"
+            )
+            self.stop_event.wait(delay)
+
+        self._set_state("stopped")
+        print("[daemon] 已停止。")
+
+    def stop(self, *_args) -> None:
+        self.stop_event.set()
+
+    def start_thread(self) -> threading.Thread:
+        t = threading.Thread(target=self.run_forever, name="bili-daemon", daemon=True)
+        t.start()
+        return t
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bili-Insights 常驻调度进程")
+    parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL_MIN, help="执行间隔（分钟）")
+    parser.add_argument("--jitter", type=float, default=DEFAULT_JITTER_SEC, help="随机抖动（秒）")
+    parser.add_argument("--full", action="store_true", help="每轮全量拉取（默认自适应轮询）")
+    parser.add_argument("--no-render", action="store_true", help="不渲染墨水屏看板")
+    parser.add_argument("--once", action="store_true", help="只执行一轮后退出")
+    args = parser.parse_args()
+
+    daemon = Daemon(
+        interval_min=args.interval,
+        jitter_sec=args.jitter,
+        adaptive=DEFAULT_ADAPTIVE and not args.full,
+        render=not args.no_render,
+    )
+
+    if args.once:
+        init_db()
+        daemon.run_pipeline()
+        return
+
+    signal.signal(signal.SIGTERM, daemon.stop)
+    signal.signal(signal.SIGINT, daemon.stop)
+    daemon.run_forever()
+
+
+if __name__ == "__main__":
+    main()
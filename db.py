@@ -1,26 +1,200 @@
 # db.py
 
+import secrets
 import sqlite3
+import time
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List
+
+from accounts import ACCOUNTS, DEFAULT_MID, resolve_mid
+from cohort import COHORT_METRICS, rebuild_cohort
+import title_search
+import anomaly
 
 DB_PATH = Path("biliinsights.db")
 
+# 视频未被刷新时，最新视图中沿用其旧快照的最长天数（需不小于最长轮询间隔）
+CARRY_FORWARD_DAYS = 8
+
+# 流式读取最新视频列表时每批从游标取出的行数
+STREAM_FETCH_SIZE = 500
+
+# 互动类指标：名称 -> (分子字段, 分母字段)，分母为 0 时记为 0.0。
+# 视频列表的 SQL 表达式与 analytics 中的向量化排行共用这一份定义。
+ENGAGEMENT_RATES = {
+    "like_rate": (("like",), "view"),
+    "coin_rate": (("coin",), "view"),
+    "fav_rate": (("favorite",), "view"),
+    "reply_rate": (("reply",), "view"),
+    "danmaku_rate": (("danmaku",), "view"),
+    "share_rate": (("share",), "view"),
+    "engagement_rate": (("like", "coin", "favorite", "reply", "danmaku"), "view"),
+    "coins_per_like": (("coin",), "like"),
+}
+
+
+def engagement_rate_sql(name: str) -> str:
+    nums, den = ENGAGEMENT_RATES[name]
+    num = " + ".join(f'COALESCE("{k}", 0)' for k in nums)
+    return f'CASE WHEN "{den}" > 0 THEN CAST({num} AS REAL) / "{den}" ELSE 0.0 END AS {name}'
+
+
+# 索引单独列出，便于批量导入时先删除、导入完成后再统一重建
+INDEXES = {
+    "idx_video_snapshots_bvid_date_ts":
+        "CREATE INDEX IF NOT EXISTS idx_video_snapshots_bvid_date_ts "
+        "ON video_snapshots (bvid, snapshot_date, snapshot_ts);",
+    "idx_video_snapshots_mid_date":
+        "CREATE INDEX IF NOT EXISTS idx_video_snapshots_mid_date "
+        "ON video_snapshots (mid, snapshot_date);",
+    "idx_video_schedule_mid_next_due":
+        "CREATE INDEX IF NOT EXISTS idx_video_schedule_mid_next_due "
+        "ON video_schedule (mid, next_due);",
+    "idx_account_snapshots_mid_date":
+        "CREATE INDEX IF NOT EXISTS idx_account_snapshots_mid_date "
+        "ON account_snapshots (mid, snapshot_date);",
+}
+
+# 多账号改造前的旧索引名，init_db 时删除
+_LEGACY_INDEXES = (
+    "idx_video_snapshots_bvid_date",
+    "idx_video_snapshots_date",
+    "idx_video_schedule_next_due",
+    "idx_account_snapshots_date",
+)
+
+# 每个 (bvid, snapshot_date) 只取当天最后一次采样，作为“日粒度”视频快照。
+# 依赖 (bvid, snapshot_date, snapshot_ts) 索引逐行探测，外层对 snapshot_date 的过滤可直接下推；
+# 写成标准 SQL，SQLite 与 DuckDB 均可使用。
+VIDEO_DAILY_SQL = """
+    SELECT *
+    FROM video_snapshots v
+    WHERE NOT EXISTS (
+        SELECT 1 FROM video_snapshots w
+        WHERE w.bvid = v.bvid
+          AND w.mid = v.mid
+          AND w.snapshot_date = v.snapshot_date
+          AND (w.snapshot_ts > v.snapshot_ts
+               OR (w.snapshot_ts = v.snapshot_ts AND w.id > v.id))
+    )
+"""
+
+# 某视频最后一次采样的 id：在 (bvid, snapshot_date, snapshot_ts) 索引上倒序取第一条，每个视频一次索引查找，
+# 不随一天内的采样次数增加而多读行（snapshot_date 由 snapshot_ts 换算而来，按二者排序与只按 snapshot_ts 一致）。
+# 视频列表取自 video_titles（每个 (mid, bvid) 一行，由快照任务与批量导入维护）。
+LATEST_SAMPLE_SQL = """
+    SELECT s.id FROM video_snapshots s
+    WHERE s.bvid = {bvid} AND s.mid = {mid}
+    ORDER BY s.snapshot_date DESC, s.snapshot_ts DESC, s.id DESC
+    LIMIT 1
+"""
+
+HISTORY_RESOLUTIONS = ("raw", "hour", "day")
 
-def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
+
+def get_conn(db_path: Path | None = None) -> sqlite3.Connection:
+    # 多账号并发写入时等待锁，而不是立刻报 database is locked
+    conn = sqlite3.connect(db_path or DB_PATH, timeout=30)
     conn.row_factory = sqlite3.Row
     return conn
 
 
-def init_db() -> None:
+def create_indexes(cur: sqlite3.Cursor) -> None:
+    for sql in INDEXES.values():
+        cur.execute(sql)
+
+
+def drop_indexes(cur: sqlite3.Cursor) -> None:
+    for name in INDEXES:
+        cur.execute(f"DROP INDEX IF EXISTS {name};")
+
+
+def _ensure_column(cur: sqlite3.Cursor, table: str, column: str, decl: str) -> bool:
+    cur.execute(f"PRAGMA table_info({table});")
+    if any(r[1] == column for r in cur.fetchall()):
+        return False
+    cur.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl};")
+    return True
+
+
+def _migrate_video_schedule(cur: sqlite3.Cursor) -> None:
     """
-    初始化数据库：账号维度 + 单视频维度快照表。
+    旧版 video_schedule 以 bvid 为主键、没有 mid 列：重建为 (mid, bvid) 主键并保留调度状态。
     """
-    conn = get_conn()
+    cur.execute("PRAGMA table_info(video_schedule);")
+    if any(r[1] == "mid" for r in cur.fetchall()):
+        return
+    cur.execute("ALTER TABLE video_schedule RENAME TO _video_schedule_old;")
+    cur.execute(
+        """
+        CREATE TABLE video_schedule (
+            mid TEXT NOT NULL,
+            bvid TEXT NOT NULL,
+            pubdate INTEGER,
+            interval_sec INTEGER NOT NULL,
+            next_due INTEGER NOT NULL,
+            last_fetch INTEGER,
+            last_view INTEGER,
+            velocity REAL,
+            PRIMARY KEY (mid, bvid)
+        );
+        """
+    )
+    cur.execute(
+        """
+        INSERT INTO video_schedule (mid, bvid, pubdate, interval_sec, next_due, last_fetch, last_view, velocity)
+        SELECT ?, bvid, pubdate, interval_sec, next_due, last_fetch, last_view, velocity
+        FROM _video_schedule_old;
+        """,
+        (DEFAULT_MID,),
+    )
+    cur.execute("DROP TABLE _video_schedule_old;")
+
+
+def sync_accounts(cur: sqlite3.Cursor) -> None:
+    """
+    把 config 中的账号写入 accounts 表（不含 Cookie）；已从配置中移除的账号保留，历史数据仍可查询。
+    """
+    now = int(time.time())
+    cur.executemany(
+        """
+        INSERT INTO accounts (mid, name, intro, avatar, device, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(mid) DO UPDATE SET
+            name = excluded.name,
+            intro = excluded.intro,
+            avatar = excluded.avatar,
+            device = excluded.device,
+            updated_at = excluded.updated_at;
+        """,
+        [(a["mid"], a["name"], a["intro"], a["avatar"], a["device"], now) for a in ACCOUNTS],
+    )
+
+
+def init_db(db_path: Path | None = None) -> None:
+    """
+    初始化数据库：账号表 + 账号维度 + 单视频维度快照表。
+    各快照表以 mid 区分账号。
+    """
+    conn = get_conn(db_path)
     cur = conn.cursor()
+    # WAL：多账号并发写入时读请求（Web 端）不被阻塞
+    cur.execute("PRAGMA journal_mode = WAL;")
 
-    # 单视频每日快照
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS accounts (
+            mid TEXT PRIMARY KEY,
+            name TEXT,
+            intro TEXT,
+            avatar TEXT,
+            device TEXT,
+            updated_at INTEGER
+        );
+        """
+    )
+
+    # 单视频快照：snapshot_date 为日期键，snapshot_ts 为采样时刻（epoch 秒），一天内可有多次采样
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS video_snapshots (
@@ -36,7 +210,9 @@ def init_db() -> None:
             danmaku INTEGER,
             share INTEGER,
             pubdate INTEGER,
-            duration INTEGER
+            duration INTEGER,
+            snapshot_ts INTEGER,
+            mid TEXT
         );
         """
     )
@@ -54,81 +230,294 @@ def init_db() -> None:
             total_favorite INTEGER,
             total_reply INTEGER,
             total_danmaku INTEGER,
-            total_share INTEGER
+            total_share INTEGER,
+            mid TEXT
+        );
+        """
+    )
+
+    # 自适应轮询：每个视频的刷新间隔与下次到期时间（epoch 秒）
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS video_schedule (
+            mid TEXT NOT NULL,
+            bvid TEXT NOT NULL,
+            pubdate INTEGER,
+            interval_sec INTEGER NOT NULL,
+            next_due INTEGER NOT NULL,
+            last_fetch INTEGER,
+            last_view INTEGER,
+            velocity REAL,
+            PRIMARY KEY (mid, bvid)
+        );
+        """
+    )
+
+    # 自适应轮询上次同步投稿列表的时刻（每个账号一行）
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS archive_sync (
+            mid TEXT PRIMARY KEY,
+            synced_at INTEGER NOT NULL
+        );
+        """
+    )
+
+    # 各账号的数据版本计数器，见 bump_data_version
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS data_version (
+            mid TEXT PRIMARY KEY,
+            version INTEGER NOT NULL
+        );
+        """
+    )
+    # 数据库标识：建库（或首次升级）时生成的随机值，作为数据版本号的前缀。
+    # 数据库被删除重建后计数器从头开始，标识随之改变，磁盘上旧的渲染结果不会被误认为最新
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS db_meta (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+        """
+    )
+    cur.execute(
+        "INSERT OR IGNORE INTO db_meta (key, value) VALUES ('epoch', ?);",
+        (secrets.token_hex(4),),
+    )
+
+    # 快照任务断点：每轮一条 snapshot_runs，逐视频的拉取状态与解析后的统计写入 snapshot_run_items
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS snapshot_runs (
+            run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            snapshot_date TEXT NOT NULL,
+            status TEXT NOT NULL,
+            adaptive INTEGER NOT NULL DEFAULT 0,
+            archives_json TEXT,
+            carried_json TEXT,
+            started_at INTEGER,
+            finished_at INTEGER,
+            mid TEXT
+        );
+        """
+    )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS snapshot_run_items (
+            run_id INTEGER NOT NULL,
+            seq INTEGER NOT NULL,
+            bvid TEXT NOT NULL,
+            title TEXT,
+            status TEXT NOT NULL,
+            reason TEXT,
+            view INTEGER,
+            like INTEGER,
+            coin INTEGER,
+            favorite INTEGER,
+            reply INTEGER,
+            danmaku INTEGER,
+            share INTEGER,
+            updated_at INTEGER,
+            PRIMARY KEY (run_id, bvid)
         );
         """
     )
 
+    # cohort 矩阵：(账号, 发布后天数, 视频) -> 当天最后一次采样的各项计数，由快照任务增量维护；
+    # 主键以天数在前，按天数范围读取时为连续的索引区间
+    cur.execute(
+        f"""
+        CREATE TABLE IF NOT EXISTS video_cohort (
+            mid TEXT NOT NULL,
+            bvid TEXT NOT NULL,
+            age INTEGER NOT NULL,
+            {", ".join(f'"{k}" INTEGER' for k in COHORT_METRICS)},
+            snapshot_ts INTEGER,
+            PRIMARY KEY (mid, age, bvid)
+        ) WITHOUT ROWID;
+        """
+    )
+
+    # 标题全文检索（FTS5 trigram），由 run_snapshot 同步
+    title_search.create_tables(cur)
+
+    # 播放异常检测结果，每轮快照结束后由 anomaly.detect_anomalies 重写当日结果
+    anomaly.create_table(cur)
+
+    # 旧库迁移：补 snapshot_ts 列，历史数据按当日本地 00:00 回填（与批量导入只有日期的记录一致；
+    # 'utc' 修饰符把本地时间换算为 UTC，得到本地零点的时间戳）
+    if _ensure_column(cur, "video_snapshots", "snapshot_ts", "INTEGER"):
+        cur.execute(
+            """
+            UPDATE video_snapshots
+            SET snapshot_ts = CAST(strftime('%s', snapshot_date, 'utc') AS INTEGER)
+            WHERE snapshot_ts IS NULL;
+            """
+        )
+
+    # 旧库迁移：补 mid 列，单账号时期的数据归属默认账号
+    for table in ("video_snapshots", "account_snapshots", "snapshot_runs"):
+        _ensure_column(cur, table, "mid", "TEXT")
+        cur.execute(f"UPDATE {table} SET mid = ? WHERE mid IS NULL;", (DEFAULT_MID,))
+    _migrate_video_schedule(cur)
+
+    # 旧库迁移：cohort 矩阵为空而已有视频快照时，从历史数据一次性回填
+    cur.execute("SELECT 1 FROM video_cohort LIMIT 1;")
+    if cur.fetchone() is None:
+        rebuild_cohort(cur)
+    cur.execute("SELECT 1 FROM video_titles LIMIT 1;")
+    if cur.fetchone() is None:
+        title_search.refresh_titles(cur)
+
+    for name in _LEGACY_INDEXES:
+        cur.execute(f"DROP INDEX IF EXISTS {name};")
+    create_indexes(cur)
+    sync_accounts(cur)
+
     conn.commit()
     conn.close()
 
 
-def get_latest_account_snapshot() -> Dict[str, Any] | None:
+def get_accounts() -> List[Dict[str, Any]]:
+    conn = get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT * FROM accounts ORDER BY mid ASC;")
+    rows = cur.fetchall()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def bump_data_version(cur: sqlite3.Cursor, mid: str) -> None:
+    """
+    账号数据有变化（写入视频采样或账号快照、批量导入）时调用，与写入在同一事务内提交。
+    """
+    cur.execute(
+        "INSERT INTO data_version (mid, version) VALUES (?, 1) "
+        "ON CONFLICT(mid) DO UPDATE SET version = version + 1;",
+        (str(mid),),
+    )
+
+
+def get_data_version(mid: str | None = None) -> str:
+    """
+    数据版本号：“数据库标识:计数器”。计数器在快照任务与批量导入每次写入数据时递增（bump_data_version），
+    均按主键读取，与数据量无关。版本号不变说明数据没有变化，可用于跳过重复渲染、作为缓存键。
+    mid 为空时覆盖全部账号（各账号计数之和），否则只看该账号的数据。
+    """
+    conn = get_conn()
+    cur = conn.cursor()
+    if mid is None:
+        count_sql, params = "SELECT SUM(version) FROM data_version", ()
+    else:
+        count_sql, params = "SELECT version FROM data_version WHERE mid = ?", (str(mid),)
+    cur.execute(
+        f"SELECT (SELECT value FROM db_meta WHERE key = 'epoch'), ({count_sql});",
+        params,
+    )
+    epoch, count = cur.fetchone()
+    conn.close()
+    return f"{epoch or ''}:{count or 0}"
+
+
+def get_latest_account_snapshot(mid: str | None = None) -> Dict[str, Any] | None:
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
         """
         SELECT *
         FROM account_snapshots
+        WHERE mid = ?
         ORDER BY snapshot_date DESC, id DESC
         LIMIT 1;
-        """
+        """,
+        (resolve_mid(mid),),
     )
     row = cur.fetchone()
     conn.close()
     return dict(row) if row else None
 
 
-def get_last_two_account_snapshots() -> List[Dict[str, Any]]:
+def get_last_two_account_snapshots(mid: str | None = None) -> List[Dict[str, Any]]:
     conn = get_conn()
     cur = conn.cursor()
     cur.execute(
         """
         SELECT *
         FROM account_snapshots
+        WHERE mid = ?
         ORDER BY snapshot_date DESC, id DESC
         LIMIT 2;
-        """
+        """,
+        (resolve_mid(mid),),
     )
     rows = cur.fetchall()
     conn.close()
     return [dict(r) for r in rows]
 
 
-def get_latest_video_snapshots() -> List[Dict[str, Any]]:
+def iter_latest_video_snapshots(mid: str | None = None, with_rates: bool = False) -> Iterator[tuple]:
     """
-    取最新 snapshot_date 的所有视频快照，用于 Web 列表。
+    取某个账号（默认账号）每个视频最近一次的快照，用于 Web 列表。
+    自适应轮询下冷门视频不会每次都刷新，这里沿用其最近 CARRY_FORWARD_DAYS 天内的最后一条记录；
+    超出该窗口仍未出现的视频（已删除 / 不可见）不再返回。
+
+    生成器：首个产出为列名元组，之后按 view 降序逐行产出值元组。
+    行按 STREAM_FETCH_SIZE 分批从游标读取，不在内存中整体物化，连接在迭代结束或生成器关闭时释放。
+    with_rates 时在查询中一并计算 ENGAGEMENT_RATES 中的各项互动率（追加在原有列之后）。
     """
+    mid = resolve_mid(mid)
     conn = get_conn()
-    cur = conn.cursor()
-    cur.execute("SELECT MAX(snapshot_date) FROM video_snapshots;")
-    row = cur.fetchone()
-    if not row or not row[0]:
+    conn.row_factory = None
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT MAX(snapshot_date) FROM video_snapshots WHERE mid = ?;", (mid,))
+        row = cur.fetchone()
+        if not row or not row[0]:
+            return
+
+        latest_date = row[0]
+        rates = "".join(f",\n                   {engagement_rate_sql(k)}" for k in ENGAGEMENT_RATES) if with_rates else ""
+        cur.execute(
+            f"""
+            SELECT v.*{rates}
+            FROM video_titles t
+            JOIN video_snapshots v ON v.id = ({LATEST_SAMPLE_SQL.format(mid="t.mid", bvid="t.bvid")})
+            WHERE t.mid = ? AND v.snapshot_date >= date(?, ?)
+            ORDER BY v.view DESC;
+            """,
+            (mid, latest_date, f"-{CARRY_FORWARD_DAYS} days"),
+        )
+        yield tuple(d[0] for d in cur.description)
+        while True:
+            rows = cur.fetchmany(STREAM_FETCH_SIZE)
+            if not rows:
+                break
+            yield from rows
+    finally:
         conn.close()
-        return []
 
-    latest_date = row[0]
-    cur.execute(
-        """
-        SELECT *
-        FROM video_snapshots
-        WHERE snapshot_date = ?
-        ORDER BY view DESC;
-        """,
-        (latest_date,),
-    )
-    rows = cur.fetchall()
-    conn.close()
-    return [dict(r) for r in rows]
+
+def get_latest_video_snapshots(mid: str | None = None) -> List[Dict[str, Any]]:
+    """
+    iter_latest_video_snapshots 的列表形式，每行为 dict（渲染等需要随机访问的场景使用）。
+    """
+    it = iter_latest_video_snapshots(mid)
+    columns = next(it, None)
+    if columns is None:
+        return []
+    return [dict(zip(columns, r)) for r in it]
 
 
-def get_account_history(limit_days: int | None = None) -> List[Dict[str, Any]]:
+def get_account_history(limit_days: int | None = None, mid: str | None = None) -> List[Dict[str, Any]]:
     """
     账号维度历史记录：
     - 若 limit_days 为 None：返回全部
     - 否则：按日期倒序取最近 limit_days 条，再在 Python 里升序返回
       （这里的 "days" 更准确说是 "最近 N 条快照"）
     """
+    mid = resolve_mid(mid)
     conn = get_conn()
     cur = conn.cursor()
 
@@ -137,18 +526,21 @@ def get_account_history(limit_days: int | None = None) -> List[Dict[str, Any]]:
             """
             SELECT *
             FROM account_snapshots
+            WHERE mid = ?
             ORDER BY snapshot_date ASC, id ASC;
-            """
+            """,
+            (mid,),
         )
     else:
         cur.execute(
             """
             SELECT *
             FROM account_snapshots
+            WHERE mid = ?
             ORDER BY snapshot_date DESC, id DESC
             LIMIT ?;
             """,
-            (limit_days,),
+            (mid, limit_days),
         )
 
     rows = cur.fetchall()
@@ -161,21 +553,64 @@ def get_account_history(limit_days: int | None = None) -> List[Dict[str, Any]]:
     return [dict(r) for r in reversed(rows)]
 
 
-def get_video_history(bvid: str) -> List[Dict[str, Any]]:
+def get_video_history(bvid: str, resolution: str = "day", mid: str | None = None) -> List[Dict[str, Any]]:
     """
-    某条视频的时间序列数据（按 snapshot_date 升序）。
+    某条视频的时间序列数据（按时间升序）：
+    - day：每天最后一次采样（默认，兼容原有的每日快照）
+    - hour：每小时最后一次采样，用于观察新视频发布后的前 24 小时
+    - raw：全部采样
+    bvid 已能确定视频，mid 仅在多位 UP 主合作投稿（同一 bvid 出现在多个账号下）时用于区分。
     """
+    if resolution not in HISTORY_RESOLUTIONS:
+        raise ValueError(f"unsupported resolution: {resolution!r}")
+
+    where = "bvid = ?"
+    params: tuple = (bvid,)
+    if mid is not None:
+        where += " AND mid = ?"
+        params += (str(mid),)
+
     conn = get_conn()
     cur = conn.cursor()
-    cur.execute(
-        """
-        SELECT *
-        FROM video_snapshots
-        WHERE bvid = ?
-        ORDER BY snapshot_date ASC, id ASC;
-        """,
-        (bvid,),
-    )
+    if resolution == "raw":
+        cur.execute(
+            f"""
+            SELECT *
+            FROM video_snapshots
+            WHERE {where}
+            ORDER BY snapshot_ts ASC, id ASC;
+            """,
+            params,
+        )
+    else:
+        bucket = "snapshot_date" if resolution == "day" else "snapshot_ts / 3600"
+        cur.execute(
+            f"""
+            SELECT *
+            FROM video_snapshots
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, MAX(snapshot_ts)
+                    FROM video_snapshots
+                    WHERE {where}
+                    GROUP BY mid, {bucket}
+                )
+            )
+            ORDER BY snapshot_ts ASC, id ASC;
+            """,
+            params,
+        )
     rows = cur.fetchall()
     conn.close()
     return [dict(r) for r in rows]
+
+
+def search_videos(q: str, mid: str | None = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    按标题检索某个账号（默认账号）的视频，结果按相关度排序，见 title_search.search。
+    """
+    conn = get_conn()
+    try:
+        return title_search.search(conn.cursor(), resolve_mid(mid), q, limit)
+    finally:
+        conn.close()
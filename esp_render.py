@@ -1,21 +1,39 @@
 #!/usr/bin/env python3
 # esp_render.py
 
+import argparse
+import functools
+import hashlib
+import io
 import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 from typing import Dict, Any, List, Tuple
 from datetime import datetime
 
 from PIL import Image, ImageDraw, ImageFont
 import numpy as np
 
-from config import ACCOUNT_NAME, ACCOUNT_INTRO, AVATAR_PATH
+import config
+import analytics
+import series
+from accounts import ACCOUNTS, DEFAULT_MID, get_account
 from db import (
+    get_data_version,
     get_latest_account_snapshot,
     get_last_two_account_snapshots,
-    get_account_history,
     get_latest_video_snapshots,
     get_video_history,
 )
+from render_targets import (
+    DEFAULT_TARGET,
+    ENABLED_TARGETS,
+    PALETTE_7C,
+    RenderTarget,
+    get_target,
+    pack_codes,
+    target_dir,
+)
 
 # ==========================
 # 基本参数 & 配色
@@ -27,6 +45,8 @@ WHITE = (255, 255, 255)
 BLACK = (0, 0, 0)
 RED = (255, 0, 0)
 YELLOW = (255, 255, 0)
+SHADOW = (200, 200, 200)
+CARD_FILL = (255, 255, 220)
 
 BAYER_4x4 = [
     [0, 8, 2, 10],
@@ -36,47 +56,94 @@ BAYER_4x4 = [
 ]
 
 OUTPUT_DIR = "esp_output"
+# 渲染结果对应的数据版本，写在全部输出文件之后，按需渲染据此判断是否过期
+VERSION_FILE = "dashboard.version"
 V_MARGIN = 18
+CHART_POINT_SPACING = 12  # 折线图相邻两点的最小间距（像素）
+
+# 底部区域改为显示昨日播放涨幅前三的视频（默认显示最近发布视频）
+MOVERS_PANEL = getattr(config, "ESP_MOVERS_PANEL", False)
+
+# 调色板模式：文字、线条、色块直接画在只含目标屏幕调色板颜色的 'P' 画布上（不抗锯齿），
+# 阴影与卡片底色按 FILL_PATTERNS 映射为固定点阵，只有头像等位图需要误差扩散（结果缓存在磁盘上）。
+# 关闭后回退为 RGB 画布 + 整幅误差扩散。
+PALETTE_RENDER = getattr(config, "ESP_PALETTE_RENDER", True)
+
+# 渲染时是否同时写出预览图（dashboard_preview.png 与量化后的预览）；默认不写，
+# 量化后的预览由 /api/esp32/preview.png 被请求时从帧缓冲即时生成。python esp_render.py --preview 可单次开启
+WRITE_PREVIEWS = getattr(config, "ESP_WRITE_PREVIEWS", False)
+# PNG 压缩级别：预览与头像缓存均为只有几种颜色的调色板图，低压缩级别编码更快，文件大小差别不大
+PNG_COMPRESS_LEVEL = 1
 
 
 # ==========================
 # 字体加载（可将自定义中文字体放入esp32/resource/fonts/中）
 # ==========================
 
-def load_font(size: int) -> ImageFont.ImageFont:
-    # 优先使用项目内的自定义中文字体，其次尝试常见系统字体
-    candidates = [
-        # 项目自带字体
-        "esp32/resources/fonts/LXGWFasmartGothicMN.ttf",
-        # "esp32/resources/fonts/LXGWHeartSerifCL.ttf",
-        # macOS
-        "/System/Library/Fonts/PingFang.ttc",
-        "/System/Library/Fonts/STHeiti Medium.ttc",
-        # Linux Noto
-        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-        "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
-        # Windows
-        "C:/Windows/Fonts/msyh.ttc",
-        "C:/Windows/Fonts/simhei.ttf",
-    ]
-    for path in candidates:
+# 优先使用项目内的自定义中文字体，其次尝试常见系统字体
+FONT_CANDIDATES = [
+    # 项目自带字体
+    "esp32/resources/fonts/LXGWFasmartGothicMN.ttf",
+    # "esp32/resources/fonts/LXGWHeartSerifCL.ttf",
+    # macOS
+    "/System/Library/Fonts/PingFang.ttc",
+    "/System/Library/Fonts/STHeiti Medium.ttc",
+    # Linux Noto
+    "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+    "/usr/share/fonts/truetype/noto/NotoSansCJK-Regular.ttc",
+    # Windows
+    "C:/Windows/Fonts/msyh.ttc",
+    "C:/Windows/Fonts/simhei.ttf",
+]
+
+# 字体层级：标题 > 核心数字 > 普通文字 > 标注
+FONT_SIZES = {
+    "name": 36,
+    "tagline": 18,
+    "date": 20,
+    "metric_big": 40,
+    "metric_inc": 32,
+    "metric_label": 20,
+    "small": 18,
+    "tiny": 14,
+}
+
+
+@functools.lru_cache(maxsize=1)
+def font_path() -> str | None:
+    # 字体文件只探测一次：返回第一个存在且可解析的候选路径
+    for path in FONT_CANDIDATES:
         if os.path.exists(path):
             try:
-                return ImageFont.truetype(path, size=size)
+                ImageFont.truetype(path, size=12)
+                return path
             except Exception:
                 continue
-    return ImageFont.load_default()
+    return None
 
 
-# 字体层级：标题 > 核心数字 > 普通文字 > 标注
-FONT_NAME = load_font(36)
-FONT_TAGLINE = load_font(18)
-FONT_DATE = load_font(20)
-FONT_METRIC_BIG = load_font(40)
-FONT_METRIC_INC = load_font(32)
-FONT_METRIC_LABEL = load_font(20)
-FONT_SMALL = load_font(18)
-FONT_TINY = load_font(14)
+@functools.lru_cache(maxsize=None)
+def load_font(size: int) -> ImageFont.ImageFont:
+    path = font_path()
+    if path is None:
+        return ImageFont.load_default()
+    return ImageFont.truetype(path, size=size)
+
+
+class FontRegistry:
+    """
+    按用途取字体（FONTS.small 等，见 FONT_SIZES）：首次用到时才加载，同一字号共用一个字体对象。
+    """
+
+    def __getattr__(self, role: str) -> ImageFont.ImageFont:
+        try:
+            size = FONT_SIZES[role]
+        except KeyError:
+            raise AttributeError(role) from None
+        return load_font(size)
+
+
+FONTS = FontRegistry()
 
 # ==========================
 # 圆角矩形工具
@@ -99,11 +166,20 @@ def draw_round_rect(draw: ImageDraw.ImageDraw,
 # 字体测量工具
 # ==========================
 
+# 同一段文字在一次渲染中会被反复测量（对齐、截断），按 (文字, 字体) 缓存包围盒
+TEXT_METRICS_CACHE_SIZE = 4096
+
+
+@functools.lru_cache(maxsize=TEXT_METRICS_CACHE_SIZE)
+def _text_bbox(text: str, font: ImageFont.ImageFont) -> Tuple[int, int, int, int]:
+    return font.getbbox(text)
+
+
 def measure_text(text: str, font: ImageFont.ImageFont) -> Tuple[int, int]:
 
     if not text:
         return 0, 0
-    box = font.getbbox(text)  # (x0, y0, x1, y1)
+    box = _text_bbox(text, font)  # (x0, y0, x1, y1)
     return box[2] - box[0], box[3] - box[1]
 
 
@@ -111,8 +187,51 @@ def measure_text(text: str, font: ImageFont.ImageFont) -> Tuple[int, int]:
 # 工具函数
 # ==========================
 
-def ensure_output_dir():
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
+def output_dir_for(mid: str | None = None) -> str:
+    """
+    默认账号输出到 esp_output/（与单账号时的路径一致，已部署的设备无需改动），
+    其他账号输出到 esp_output/<device>/。
+    """
+    account = get_account(mid)
+    if account["mid"] == DEFAULT_MID:
+        return OUTPUT_DIR
+    return os.path.join(OUTPUT_DIR, account["device"])
+
+
+def ensure_output_dir(path: str = OUTPUT_DIR):
+    os.makedirs(path, exist_ok=True)
+
+
+def write_atomic(path: str, data: bytes) -> None:
+    # 先写同目录下的临时文件再 rename 替换，设备与 Web 端不会读到写了一半的文件
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def encode_png(img: Image.Image) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, format="PNG", compress_level=PNG_COMPRESS_LEVEL)
+    return buf.getvalue()
+
+
+def save_png_atomic(img: Image.Image, path: str) -> None:
+    write_atomic(path, encode_png(img))
+
+
+def read_render_version(out_dir: str) -> str | None:
+    try:
+        with open(os.path.join(out_dir, VERSION_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
 
 
 def short_number(n: int) -> str:
@@ -142,12 +261,16 @@ def trunc_text(draw: ImageDraw.ImageDraw, text: str,
     w, _ = measure_text(text, font)
     if w <= max_width:
         return text
-    for i in range(len(text), 0, -1):
-        t = text[:i] + "…"
-        w2, _ = measure_text(t, font)
+    # 二分查找能放下“前缀 + …”的最长前缀（宽度随前缀长度单调不减），只需 O(log n) 次测量
+    lo, hi = 0, len(text) - 1
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        w2, _ = measure_text(text[:mid] + "…", font)
         if w2 <= max_width:
-            return t
-    return text
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo] + "…" if lo > 0 else text
 
 
 def draw_line_chart(draw: ImageDraw.ImageDraw,
@@ -169,7 +292,7 @@ def draw_line_chart(draw: ImageDraw.ImageDraw,
 
     # 标题
     if title:
-        draw.text((x0 + 4, y0), title, font=FONT_SMALL, fill=BLACK)
+        draw.text((x0 + 4, y0), title, font=FONTS.small, fill=BLACK)
 
     if chart_right <= chart_left or chart_bottom <= chart_top:
         return
@@ -182,6 +305,14 @@ def draw_line_chart(draw: ImageDraw.ImageDraw,
     if not values:
         return
 
+    # 点数超过横轴可容纳的数量（圆点直径 + 间隔）时按 LTTB 降采样，保留峰谷
+    max_points = max(series.MIN_POINTS, (chart_right - chart_left - 8) // CHART_POINT_SPACING)
+    if len(values) > max_points:
+        idx = series.lttb_indices(range(len(values)), values, max_points)
+        if labels:
+            labels = [labels[0], labels[-1]]  # 点数较多时只标起止日期
+        values = [values[i] for i in idx]
+
     n = len(values)
     max_v = max(values)
     min_v = min(values)
@@ -217,19 +348,19 @@ def draw_line_chart(draw: ImageDraw.ImageDraw,
         if len(labels) == n:
             # 每个点下方都有对应日期
             for i, lab in enumerate(labels):
-                lw, lh = measure_text(lab, FONT_TINY)
+                lw, lh = measure_text(lab, FONTS.tiny)
                 draw.text((xs[i] - lw // 2, chart_bottom + 2),
-                          lab, font=FONT_TINY, fill=BLACK)
+                          lab, font=FONTS.tiny, fill=BLACK)
         elif len(labels) >= 2:
             # 回退：只标起止日期
             left_label = labels[0]
             right_label = labels[-1]
-            lw, lh = measure_text(left_label, FONT_TINY)
-            rw, rh = measure_text(right_label, FONT_TINY)
+            lw, lh = measure_text(left_label, FONTS.tiny)
+            rw, rh = measure_text(right_label, FONTS.tiny)
             draw.text((chart_left, chart_bottom + 2),
-                      left_label, font=FONT_TINY, fill=BLACK)
+                      left_label, font=FONTS.tiny, fill=BLACK)
             draw.text((chart_right - rw, chart_bottom + 2),
-                      right_label, font=FONT_TINY, fill=BLACK)
+                      right_label, font=FONTS.tiny, fill=BLACK)
 
 
 # ==========================
@@ -242,10 +373,9 @@ def compute_deltas(seq: List[int]) -> List[int]:
     return [seq[i] - seq[i - 1] for i in range(1, len(seq))]
 
 
-def build_account_context() -> Dict[str, Any]:
-    latest = get_latest_account_snapshot()
-    snaps = get_last_two_account_snapshots()
-    history = get_account_history(30)  # 从中取 15 日
+def build_account_context(mid: str | None = None) -> Dict[str, Any]:
+    latest = get_latest_account_snapshot(mid)
+    snaps = get_last_two_account_snapshots(mid)
 
     daily_diff = None
     if len(snaps) >= 2:
@@ -259,43 +389,20 @@ def build_account_context() -> Dict[str, Any]:
             "inc_total_view": diff("total_view"),
         }
 
-    # 15 日涨粉/播放日增
-    history_sorted = sorted(
-        history,
-        key=lambda r: str(r.get("snapshot_date") or "")
-    )
-    date_list: List[str] = []
-    for r in history_sorted:
-        d = r.get("snapshot_date")
-        if d:
-            try:
-                dt = datetime.strptime(d, "%Y-%m-%d")
-                # 只显示日
-                date_list.append(f"{dt.day}")
-            except Exception:
-                date_list.append(str(d))
-        else:
-            date_list.append("")
-
-    follower_list: List[int] = [int(r.get("follower") or 0) for r in history_sorted]
-    view_list: List[int] = [int(r.get("total_view") or 0) for r in history_sorted]
-
-    follower_deltas = compute_deltas(follower_list)
-    view_deltas = compute_deltas(view_list)
-
-    # deltas 的日期标签与第二个点开始对齐
-    delta_labels = date_list[1:] if len(date_list) > 1 else []
-    follower_labels = delta_labels
-    view_labels = delta_labels
-
-    # 只保留最近 7 天的日增，用于中间两张卡片
-    follower_deltas_15 = follower_deltas[-7:] if len(follower_deltas) > 7 else follower_deltas
-    view_deltas_15 = view_deltas[-7:] if len(view_deltas) > 7 else view_deltas
+    # 最近 7 天的涨粉/播放日增，用于中间两张卡片
+    def daily(metric: str) -> Tuple[List[int], List[str]]:
+        ser = series.account_series(metric, window=7, agg="delta", mid=mid)
+        labels = [str(datetime.strptime(d, "%Y-%m-%d").day) for d in ser["dates"]]  # 只显示日
+        return [int(v) for v in ser["values"]], labels
 
-    follower_labels_15 = follower_labels[-len(follower_deltas_15):] if follower_deltas_15 else []
-    view_labels_15 = view_labels[-len(view_deltas_15):] if view_deltas_15 else []
+    follower_deltas_15, follower_labels_15 = daily("follower")
+    view_deltas_15, view_labels_15 = daily("total_view")
 
+    account = get_account(mid)
     return {
+        "name": account["name"],
+        "intro": account["intro"],
+        "avatar": account["avatar"],
         "latest": latest,
         "daily_diff": daily_diff,
         "follower_deltas_15": follower_deltas_15,
@@ -305,13 +412,14 @@ def build_account_context() -> Dict[str, Any]:
     }
 
 
-def build_video_context() -> Dict[str, Any]:
-    videos = get_latest_video_snapshots() or []
+def build_video_context(mid: str | None = None) -> Dict[str, Any]:
+    videos = get_latest_video_snapshots(mid) or []
     if not videos:
         return {
             "latest_video": None,
             "metric_deltas": {},
             "view_deltas_7": [],
+            "movers": [],
         }
 
     # 按发布时间选最近一条
@@ -322,7 +430,7 @@ def build_video_context() -> Dict[str, Any]:
     bvid = latest_video.get("bvid")
 
     # 视频历史（用于总量趋势 & 7 日增量）
-    history_rows = get_video_history(bvid) or []
+    history_rows = get_video_history(bvid, mid=latest_video.get("mid")) or []
     history_sorted = sorted(
         history_rows,
         key=lambda r: str(r.get("snapshot_date") or "")
@@ -370,11 +478,16 @@ def build_video_context() -> Dict[str, Any]:
             "share": d("share"),
         }
 
+    movers: List[Dict[str, Any]] = []
+    if MOVERS_PANEL:
+        movers = analytics.movers("view", window=1, limit=3, mid=mid)["top"]
+
     return {
         "latest_video": latest_video,
         "metric_deltas": metric_deltas,
         "view_deltas_7": view_deltas_7,
         "view_labels_7": view_labels_7,
+        "movers": movers,
     }
 
 
@@ -382,7 +495,62 @@ def build_video_context() -> Dict[str, Any]:
 # 头像绘制
 # ==========================
 
-def draw_avatar(img: Image.Image, x: int, y: int, size: int = 120):
+def new_canvas(size: Tuple[int, int] = (W, H), palette=PALETTE_7C) -> Image.Image:
+    if not PALETTE_RENDER:
+        return Image.new("RGB", size, WHITE)
+    # 调色板前几项固定为目标屏幕的调色板（下标 0 为白色底），绘制时用到的其他颜色由 Pillow 追加在后面
+    img = Image.new("P", size, 0)
+    img.putpalette([v for _code, rgb in palette for v in rgb])
+    return img
+
+
+def _rounded_mask(size: int, radius: int) -> Image.Image:
+    mask = Image.new("L", (size, size), 0)
+    mdraw = ImageDraw.Draw(mask)
+    try:
+        mdraw.rounded_rectangle((0, 0, size, size), radius=radius, fill=255)
+    except AttributeError:
+        mdraw.rectangle((0, 0, size, size), fill=255)
+    return mask
+
+
+def dithered_avatar(path: str, size: int, palette=PALETTE_7C) -> Image.Image:
+    """
+    把头像缩放、转灰度后误差扩散到 palette，返回调色板下标与 new_canvas 一致的 'P' 图。
+    结果缓存在 OUTPUT_DIR/.cache/ 下，以头像文件路径、修改时间、大小、目标尺寸和调色板为键，头像不变时不再重复扩散。
+    """
+    st = os.stat(path)
+    # 默认调色板沿用原先的缓存键，已有缓存继续有效
+    palette_key = "" if palette == PALETTE_7C else "|" + ",".join(f"{c:02x}" for c, _rgb in palette)
+    key = hashlib.sha1(
+        f"{os.path.abspath(path)}|{st.st_mtime_ns}|{st.st_size}|{size}{palette_key}".encode("utf-8")
+    ).hexdigest()[:16]
+    cache_dir = os.path.join(OUTPUT_DIR, ".cache")
+    cache_path = os.path.join(cache_dir, f"avatar_{key}.png")
+    if os.path.exists(cache_path):
+        try:
+            with Image.open(cache_path) as cached:
+                cached.load()
+                return cached
+        except OSError:
+            pass
+
+    av = Image.open(path).convert("L")  # 灰度
+    av = av.resize((size, size), Image.LANCZOS)
+    codes = error_diffusion_codes(Image.merge("RGB", (av, av, av)), palette)
+
+    code_to_index = np.zeros(256, dtype=np.uint8)
+    for i, (code, _rgb) in enumerate(palette):
+        code_to_index[code] = i
+    out = Image.fromarray(code_to_index[codes], mode="P")
+    out.putpalette([v for _code, rgb in palette for v in rgb])
+
+    ensure_output_dir(cache_dir)
+    save_png_atomic(out, cache_path)
+    return out
+
+
+def draw_avatar(img: Image.Image, x: int, y: int, size: int = 120, path: str = "", palette=PALETTE_7C):
     draw = ImageDraw.Draw(img)
     radius = size // 6
 
@@ -390,9 +558,9 @@ def draw_avatar(img: Image.Image, x: int, y: int, size: int = 120):
     shadow_box = (x + shadow_offset, y + shadow_offset,
                   x + size + shadow_offset, y + size + shadow_offset)
     draw_round_rect(draw, shadow_box, radius=radius,
-                    fill=(200, 200, 200), outline=None, width=0)
+                    fill=SHADOW, outline=None, width=0)
 
-    if not os.path.exists(AVATAR_PATH):
+    if not path or not os.path.exists(path):
         box = (x, y, x + size, y + size)
         draw_round_rect(draw, box, radius=radius,
                         fill=None, outline=BLACK, width=2)
@@ -401,19 +569,16 @@ def draw_avatar(img: Image.Image, x: int, y: int, size: int = 120):
         return
 
     try:
-        av = Image.open(AVATAR_PATH).convert("L")  # 灰度
-        av = av.resize((size, size), Image.LANCZOS)
-        av_rgb = Image.merge("RGB", (av, av, av))
-
-        mask = Image.new("L", (size, size), 0)
-        mdraw = ImageDraw.Draw(mask)
-        try:
-            mdraw.rounded_rectangle((0, 0, size, size), radius=radius, fill=255)
-        except AttributeError:
-            mdraw.rectangle((0, 0, size, size), fill=255)
+        if img.mode == "P":
+            # 调色板画布：粘贴预先扩散好的头像，下标直接对应画布调色板
+            av = dithered_avatar(path, size, palette)
+        else:
+            av = Image.open(path).convert("L")  # 灰度
+            av = av.resize((size, size), Image.LANCZOS)
+            av = Image.merge("RGB", (av, av, av))
 
         # 用 mask 粘贴，实现头像四角裁掉
-        img.paste(av_rgb, (x, y), mask)
+        img.paste(av, (x, y), _rounded_mask(size, radius))
     except Exception:
         box = (x, y, x + size, y + size)
         draw_round_rect(draw, box, radius=radius,
@@ -425,8 +590,9 @@ def draw_avatar(img: Image.Image, x: int, y: int, size: int = 120):
 # ==========================
 
 def render_dashboard(account_ctx: Dict[str, Any],
-                     video_ctx: Dict[str, Any]) -> Image.Image:
-    img = Image.new("RGB", (W, H), WHITE)
+                     video_ctx: Dict[str, Any],
+                     palette=PALETTE_7C) -> Image.Image:
+    img = new_canvas((W, H), palette)
     draw = ImageDraw.Draw(img)
 
     latest = account_ctx.get("latest") or {}
@@ -449,22 +615,25 @@ def render_dashboard(account_ctx: Dict[str, Any],
 
     # ===== 顶部区域：头像 + 名称 + 简介 + 日期 =====
     avatar_x, avatar_y, avatar_size = 30, 18, 80
-    draw_avatar(img, x=avatar_x, y=avatar_y, size=avatar_size)
+    account_name = account_ctx.get("name") or ""
+    account_intro = account_ctx.get("intro") or ""
+    draw_avatar(img, x=avatar_x, y=avatar_y, size=avatar_size, path=account_ctx.get("avatar") or "",
+                palette=palette)
 
     name_x = avatar_x + avatar_size + 20
     name_y = avatar_y + 8
     tagline_x = name_x
     tagline_y = avatar_y + 48
 
-    draw.text((name_x, name_y), ACCOUNT_NAME, font=FONT_NAME, fill=BLACK)
-    draw.text((tagline_x, tagline_y), ACCOUNT_INTRO, font=FONT_TAGLINE, fill=BLACK)
+    draw.text((name_x, name_y), account_name, font=FONTS.name, fill=BLACK)
+    draw.text((tagline_x, tagline_y), account_intro, font=FONTS.tagline, fill=BLACK)
 
     if snapshot_date:
-        w_d, h_d = measure_text(snapshot_date, FONT_DATE)
-        draw.text((W - w_d - 20, tagline_y), snapshot_date, font=FONT_DATE, fill=BLACK)
+        w_d, h_d = measure_text(snapshot_date, FONTS.date)
+        draw.text((W - w_d - 20, tagline_y), snapshot_date, font=FONTS.date, fill=BLACK)
 
-    name_w, name_h = measure_text(ACCOUNT_NAME, FONT_NAME)
-    tag_w, tag_h = measure_text(ACCOUNT_INTRO, FONT_TAGLINE)
+    name_w, name_h = measure_text(account_name, FONTS.name)
+    tag_w, tag_h = measure_text(account_intro, FONTS.tagline)
     header_bottom = max(
         avatar_y + avatar_size,
         name_y + name_h,
@@ -486,22 +655,22 @@ def render_dashboard(account_ctx: Dict[str, Any],
         shadow_box = (x0 + shadow_offset, y0 + shadow_offset,
                       x0 + w + shadow_offset, y0 + h + shadow_offset)
         draw_round_rect(draw, shadow_box, radius=10,
-                        fill=(200, 200, 200), outline=None, width=0)
+                        fill=SHADOW, outline=None, width=0)
 
         card_box = (x0, y0, x0 + w, y0 + h)
         draw_round_rect(draw, card_box, radius=10,
-                        fill=(255, 255, 220), outline=BLACK, width=2)
+                        fill=CARD_FILL, outline=BLACK, width=2)
 
-        draw.text((x0 + 10, y0 + 6), title, font=FONT_METRIC_LABEL, fill=BLACK)
+        draw.text((x0 + 10, y0 + 6), title, font=FONTS.metric_label, fill=BLACK)
 
         total_text = short_number(total)
-        w_t, h_t = measure_text(total_text, FONT_METRIC_BIG)
+        w_t, h_t = measure_text(total_text, FONTS.metric_big)
         num_center_y = y0 + 50
-        draw.text((x0 + 10, num_center_y - h_t // 2), total_text, font=FONT_METRIC_BIG, fill=BLACK)
+        draw.text((x0 + 10, num_center_y - h_t // 2), total_text, font=FONTS.metric_big, fill=BLACK)
 
         inc_text = format_cn_delta(inc)
-        w_i, h_i = measure_text(inc_text, FONT_METRIC_INC)
-        draw.text((x0 + w - w_i - 12, num_center_y - h_i // 2), inc_text, font=FONT_METRIC_INC, fill=RED)
+        w_i, h_i = measure_text(inc_text, FONTS.metric_inc)
+        draw.text((x0 + w - w_i - 12, num_center_y - h_i // 2), inc_text, font=FONTS.metric_inc, fill=RED)
 
         chart_rect = (x0 + 10, y0 + 66, x0 + w - 10, y0 + h - 12)
         draw_line_chart(draw, chart_rect, series, "", labels=labels, line_color=RED)
@@ -534,11 +703,15 @@ def render_dashboard(account_ctx: Dict[str, Any],
     second_line_y = charts_bottom + V_MARGIN
     draw.line((20, second_line_y, W - 20, second_line_y), fill=BLACK, width=1)
 
-    # ===== 底部：最近视频 =====
+    # ===== 底部：最近视频 / 涨幅榜 =====
     base_y = second_line_y + V_MARGIN
 
+    if MOVERS_PANEL:
+        draw_movers_panel(draw, base_y, video_ctx.get("movers") or [])
+        return img
+
     if not latest_video:
-        draw.text((20, base_y), "最近发布：暂无视频数据", font=FONT_METRIC_LABEL, fill=BLACK)
+        draw.text((20, base_y), "最近发布：暂无视频数据", font=FONTS.metric_label, fill=BLACK)
         return img
 
     title = latest_video.get("title") or ""
@@ -554,16 +727,16 @@ def render_dashboard(account_ctx: Dict[str, Any],
     pub_str = datetime.fromtimestamp(pub_ts).strftime("%Y-%m-%d") if pub_ts else ""
 
     prefix = "最近发布："
-    prefix_w, _ = measure_text(prefix, FONT_METRIC_LABEL)
+    prefix_w, _ = measure_text(prefix, FONTS.metric_label)
     max_title_w = W - 40 - 120  # 右侧预留日期宽度
-    title_shown = trunc_text(draw, title, max_title_w - prefix_w, FONT_METRIC_LABEL)
+    title_shown = trunc_text(draw, title, max_title_w - prefix_w, FONTS.metric_label)
 
-    draw.text((20, base_y), prefix, font=FONT_METRIC_LABEL, fill=BLACK)
-    draw.text((20 + prefix_w, base_y), title_shown, font=FONT_METRIC_LABEL, fill=BLACK)
+    draw.text((20, base_y), prefix, font=FONTS.metric_label, fill=BLACK)
+    draw.text((20 + prefix_w, base_y), title_shown, font=FONTS.metric_label, fill=BLACK)
 
     if pub_str:
-        pub_w, _ = measure_text(pub_str, FONT_METRIC_LABEL)
-        draw.text((W - pub_w - 20, base_y), pub_str, font=FONT_METRIC_LABEL, fill=BLACK)
+        pub_w, _ = measure_text(pub_str, FONTS.metric_label)
+        draw.text((W - pub_w - 20, base_y), pub_str, font=FONTS.metric_label, fill=BLACK)
 
     metrics_y1 = base_y + 30
     metrics_y2 = metrics_y1 + 28
@@ -574,13 +747,13 @@ def render_dashboard(account_ctx: Dict[str, Any],
         shadow_box = (x0 + shadow_offset, y0 + shadow_offset,
                       x0 + w + shadow_offset, y0 + h + shadow_offset)
         draw_round_rect(draw, shadow_box, radius=8,
-                        fill=(200, 200, 200), outline=None, width=0)
+                        fill=SHADOW, outline=None, width=0)
 
         card_box = (x0, y0, x0 + w, y0 + h)
         draw_round_rect(draw, card_box, radius=8,
-                        fill=(255, 255, 220), outline=BLACK, width=1)
+                        fill=CARD_FILL, outline=BLACK, width=1)
 
-        lw, lh = measure_text(label, FONT_SMALL)
+        lw, lh = measure_text(label, FONTS.small)
         tag_pad_x = 6
         tag_pad_y = 2
         tag_x0 = x0 + 10
@@ -593,21 +766,21 @@ def render_dashboard(account_ctx: Dict[str, Any],
                         (tag_x0, tag_y0, tag_x1, tag_y1),
                         radius=6, fill=None, outline=BLACK, width=1)
         text_x = tag_x0 + tag_pad_x
-        draw.text((text_x, text_y), label, font=FONT_SMALL, fill=BLACK)
+        draw.text((text_x, text_y), label, font=FONTS.small, fill=BLACK)
 
         total_text = format_cn_number(total)
         inc_text = format_cn_delta(inc)
 
-        w_t, h_t = measure_text(total_text, FONT_METRIC_LABEL)
-        w_i, h_i = measure_text(inc_text, FONT_SMALL)
+        w_t, h_t = measure_text(total_text, FONTS.metric_label)
+        w_i, h_i = measure_text(inc_text, FONTS.small)
 
         total_x = tag_x1 + 8
         total_y = y0 + (h - h_t) // 2
-        draw.text((total_x, total_y), total_text, font=FONT_METRIC_LABEL, fill=BLACK)
+        draw.text((total_x, total_y), total_text, font=FONTS.metric_label, fill=BLACK)
 
         inc_x = x0 + w - w_i - 10
         inc_y = y0 + (h - h_i) // 2
-        draw.text((inc_x, inc_y), inc_text, font=FONT_SMALL, fill=RED)
+        draw.text((inc_x, inc_y), inc_text, font=FONTS.small, fill=RED)
 
     def get_inc(field: str) -> int:
         return int(metric_deltas.get(field) or 0)
@@ -633,6 +806,106 @@ def render_dashboard(account_ctx: Dict[str, Any],
 
 
 
+def draw_movers_panel(draw: ImageDraw.ImageDraw, y0: int, movers: List[Dict[str, Any]]):
+    draw.text((20, y0), "昨日播放涨幅", font=FONTS.metric_label, fill=BLACK)
+    if not movers:
+        draw.text((160, y0), "暂无数据", font=FONTS.metric_label, fill=BLACK)
+        return
+
+    row_y = y0 + 28
+    for i, m in enumerate(movers[:3], start=1):
+        inc_text = format_cn_delta(int(m.get("delta") or 0))
+        inc_w, _ = measure_text(inc_text, FONTS.small)
+        prefix = f"{i}. "
+        prefix_w, _ = measure_text(prefix, FONTS.small)
+        title = trunc_text(draw, m.get("title") or m.get("bvid") or "",
+                           W - 40 - prefix_w - inc_w - 20, FONTS.small)
+
+        draw.text((20, row_y), prefix, font=FONTS.small, fill=BLACK)
+        draw.text((20 + prefix_w, row_y), title, font=FONTS.small, fill=BLACK)
+        draw.text((W - inc_w - 20, row_y), inc_text, font=FONTS.small, fill=RED)
+        row_y += 24
+
+
+def render_dashboard_compact(account_ctx: Dict[str, Any],
+                             video_ctx: Dict[str, Any],
+                             target: RenderTarget) -> Image.Image:
+    """
+    小屏精简版（4.2 寸 400×300 等）：不画头像与卡片，只保留名称、日期、粉丝/播放总量与日增、
+    近 15 日播放日增折线，以及最近发布视频（或涨幅榜）。
+    """
+    w, h = target.size
+    img = new_canvas(target.size, target.palette)
+    draw = ImageDraw.Draw(img)
+
+    latest = account_ctx.get("latest") or {}
+    daily = account_ctx.get("daily_diff") or {}
+    snapshot_date = latest.get("snapshot_date") or ""
+
+    # ===== 顶部：名称 + 日期 =====
+    date_w = 0
+    if snapshot_date:
+        date_w, _ = measure_text(snapshot_date, FONTS.tiny)
+        draw.text((w - date_w - 12, 12), snapshot_date, font=FONTS.tiny, fill=BLACK)
+    name = trunc_text(draw, account_ctx.get("name") or "", w - 36 - date_w, FONTS.metric_label)
+    draw.text((12, 8), name, font=FONTS.metric_label, fill=BLACK)
+    draw.line((12, 36, w - 12, 36), fill=BLACK, width=1)
+
+    # ===== 中段：粉丝 / 播放 =====
+    col_w = (w - 36) // 2
+    stats = [
+        ("粉丝", int(latest.get("follower") or 0), int(daily.get("inc_follower") or 0)),
+        ("播放", int(latest.get("total_view") or 0), int(daily.get("inc_total_view") or 0)),
+    ]
+    for i, (label, total, inc) in enumerate(stats):
+        x0 = 12 + i * (col_w + 12)
+        draw.text((x0, 44), label, font=FONTS.small, fill=BLACK)
+        inc_text = format_cn_delta(inc)
+        inc_w, _ = measure_text(inc_text, FONTS.small)
+        draw.text((x0 + col_w - inc_w, 44), inc_text, font=FONTS.small, fill=RED)
+        draw.text((x0, 66), format_cn_number(total), font=FONTS.metric_inc, fill=BLACK)
+
+    draw_line_chart(draw, (12, 106, w - 12, 222), account_ctx.get("view_deltas_15") or [],
+                    "近15日播放", labels=account_ctx.get("view_labels_15") or [], line_color=RED)
+    draw.line((12, 228, w - 12, 228), fill=BLACK, width=1)
+
+    # ===== 底部：最近视频 / 涨幅榜 =====
+    base_y = 236
+    if MOVERS_PANEL:
+        movers = video_ctx.get("movers") or []
+        if not movers:
+            draw.text((12, base_y), "昨日播放涨幅：暂无数据", font=FONTS.small, fill=BLACK)
+        for i, m in enumerate(movers[:2]):
+            row_y = base_y + i * 26
+            inc_text = format_cn_delta(int(m.get("delta") or 0))
+            inc_w, _ = measure_text(inc_text, FONTS.small)
+            title = trunc_text(draw, m.get("title") or m.get("bvid") or "", w - 36 - inc_w, FONTS.small)
+            draw.text((12, row_y), title, font=FONTS.small, fill=BLACK)
+            draw.text((w - inc_w - 12, row_y), inc_text, font=FONTS.small, fill=RED)
+        return img
+
+    latest_video = video_ctx.get("latest_video")
+    if not latest_video:
+        draw.text((12, base_y), "最近发布：暂无视频数据", font=FONTS.small, fill=BLACK)
+        return img
+
+    prefix = "最近发布："
+    prefix_w, _ = measure_text(prefix, FONTS.small)
+    title = trunc_text(draw, latest_video.get("title") or "", w - 24 - prefix_w, FONTS.small)
+    draw.text((12, base_y), prefix, font=FONTS.small, fill=BLACK)
+    draw.text((12 + prefix_w, base_y), title, font=FONTS.small, fill=BLACK)
+
+    metric_deltas: Dict[str, int] = video_ctx.get("metric_deltas") or {}
+    cell_w = (w - 24) // 4
+    for i, (label, field) in enumerate([("播", "view"), ("赞", "like"), ("币", "coin"), ("藏", "favorite")]):
+        x0 = 12 + i * cell_w
+        draw.text((x0, base_y + 24), f"{label} {format_cn_number(int(latest_video.get(field) or 0))}",
+                  font=FONTS.tiny, fill=BLACK)
+        draw.text((x0, base_y + 42), format_cn_delta(int(metric_deltas.get(field) or 0)),
+                  font=FONTS.tiny, fill=RED)
+    return img
+
+
 def clamp01(a):
     return np.clip(a, 0.0, 1.0)
 
@@ -641,30 +914,56 @@ def clamp01(a):
 # PNG -> GxEPD2 7C 原始帧缓冲（二进制）
 # ==========================
 
-# GoodDisplay / GxEPD2 7色色码（这里只用其中 4 色）
-# code, (R,G,B)
-PALETTE_7C = [
-    (0xFF, (255, 255, 255)),  # white
-    (0x00, (0,   0,   0  )),  # black
-    (0xE5, (230, 0,   18 )),  # red
-    (0xFC, (255, 242, 0  )),  # yellow
-]
-
-
-def export_dashboard_7c_bin(img: Image.Image,
-                            out_bin_name: str = "dashboard7c_800x480.bin",
-                            preview_name: str = "dashboard7c_preview.png"):
-
-    preview_rgb_path = os.path.join(OUTPUT_DIR, "dashboard_preview.png")
-    img_rgb = img.convert("RGB")
-    if img_rgb.size != (W, H):
-        img_rgb = img_rgb.resize((W, H), Image.LANCZOS)
-    img_rgb.save(preview_rgb_path)
-
+# 各屏幕的调色板（色码与 RGB）、分辨率与帧缓冲打包方式见 render_targets.RENDER_TARGETS
+
+
+# 调色板模式下不在调色板中的填充色 -> (底色, 点色, 4x4 Bayer 矩阵中点色所占格数)，
+# 点阵密度与原先整幅误差扩散后的平均效果相当
+FILL_PATTERNS = {
+    SHADOW: (WHITE, BLACK, 3),
+    CARD_FILL: (WHITE, YELLOW, 2),
+}
+
+
+def nearest_codes(colors: np.ndarray, palette=PALETTE_7C) -> np.ndarray:
+    """
+    每个 RGB 颜色在 palette 中最接近的色码。
+    """
+    codes = np.array([c for c, _rgb in palette], dtype=np.uint8)
+    rgbs = np.array([rgb for _c, rgb in palette], dtype=np.int64)
+    diff = np.asarray(colors, dtype=np.int64)[:, None, :] - rgbs[None, :, :]
+    return codes[np.argmin(np.sum(diff * diff, axis=2), axis=1)]
+
+
+def palette_codes(img: Image.Image, target_palette=PALETTE_7C) -> np.ndarray:
+    """
+    调色板画布 -> 色码矩阵：调色板中的每种颜色经查找表映射为最接近的色码，
+    FILL_PATTERNS 中的填充色替换为对应的 Bayer 点阵，全程为 NumPy 整幅运算，无需误差扩散。
+    """
+    idx = np.asarray(img)
+    palette = np.array(img.getpalette(), dtype=np.int64).reshape(-1, 3)
+    codes = nearest_codes(palette, target_palette)[idx]
+
+    h, w = idx.shape
+    bayer = np.tile(np.array(BAYER_4x4), (h // 4 + 1, w // 4 + 1))[:h, :w]
+    for color, (base, dot, count) in FILL_PATTERNS.items():
+        hits = np.flatnonzero((palette == color).all(axis=1))
+        if hits.size == 0:
+            continue
+        base_code, dot_code = nearest_codes([base, dot], target_palette)
+        mask = np.isin(idx, hits)
+        codes[mask] = np.where(bayer[mask] < count, dot_code, base_code)
+    return codes
+
+
+def error_diffusion_codes(img_rgb: Image.Image, palette=PALETTE_7C) -> np.ndarray:
+    """
+    Floyd–Steinberg 误差扩散，把 RGB 图量化为 palette 色码矩阵。
+    """
     arr = np.asarray(img_rgb, dtype=np.float32) / 255.0  # H x W x 3
 
-    codes = np.array([c for c, _rgb in PALETTE_7C], dtype=np.uint8)
-    colors = np.array([_rgb for _c, _rgb in PALETTE_7C], dtype=np.float32) / 255.0  # N x 3
+    codes = np.array([c for c, _rgb in palette], dtype=np.uint8)
+    colors = np.array([_rgb for _c, _rgb in palette], dtype=np.float32) / 255.0  # N x 3
 
     h, w, _ = arr.shape
     out = np.zeros((h, w), dtype=np.uint8)
@@ -689,47 +988,136 @@ def export_dashboard_7c_bin(img: Image.Image,
                 arr[y + 1, x] = clamp01(arr[y + 1, x] + err * (5.0 / 16.0))
                 if x + 1 < w:
                     arr[y + 1, x + 1] = clamp01(arr[y + 1, x + 1] + err * (1.0 / 16.0))
+    return out
+
+
+def preview_image(codes: np.ndarray, palette=PALETTE_7C) -> Image.Image:
+    """
+    色码矩阵 -> 模拟墨水屏显示效果的 'P' 图：256 项查找表把色码一次索引为调色板下标（未知色码为白色）。
+    只有几种颜色，存为调色板 PNG 比 RGB 编码快一个数量级，文件也更小。
+    """
+    lut = np.zeros(256, dtype=np.uint8)  # 下标 0 为白色
+    for i, (code, _rgb) in enumerate(palette):
+        lut[code] = i
+    out = Image.fromarray(lut[codes], mode="P")
+    out.putpalette([v for _code, rgb in palette for v in rgb])
+    return out
+
+
+def export_dashboard_bin(img: Image.Image,
+                         target: RenderTarget | None = None,
+                         out_dir: str = OUTPUT_DIR,
+                         previews: bool | None = None):
+    target = target or get_target(DEFAULT_TARGET)
+    previews = WRITE_PREVIEWS if previews is None else previews
+    size = target.size
+
+    if img.mode == "P" and img.size == size:
+        img_rgb = None
+        out = palette_codes(img, target.palette)
+    else:
+        img_rgb = img.convert("RGB")
+        if img_rgb.size != size:
+            img_rgb = img_rgb.resize(size, Image.LANCZOS)
+        out = error_diffusion_codes(img_rgb, target.palette)
 
-    flat = out.flatten()
-    assert flat.size == W * H
-
-
-    out_bin_path = os.path.join(OUTPUT_DIR, out_bin_name)
-    with open(out_bin_path, "wb") as f:
-        f.write(flat.tobytes())
-    print(f"[esp_render] 7C bin written: {out_bin_path}  ({flat.size} bytes)")
+    data = pack_codes(out, target)
 
-    sim = Image.new("RGB", (W, H), WHITE)
-    sim_px = sim.load()
+    out_bin_path = os.path.join(out_dir, target.bin_name)
+    write_atomic(out_bin_path, data)
+    print(f"[esp_render] {target.name} bin written: {out_bin_path}  ({len(data)} bytes)")
 
-    code_to_rgb = {code: rgb for code, rgb in PALETTE_7C}
-    for y in range(H):
-        for x in range(W):
-            code = int(out[y, x])
-            rgb = code_to_rgb.get(code, (255, 255, 255))
-            sim_px[x, y] = rgb
+    if not previews:
+        return
 
-    preview_path = os.path.join(OUTPUT_DIR, preview_name)
-    sim.save(preview_path)
+    # 调色板画布直接存为调色板 PNG，像素与转为 RGB 后相同
+    save_png_atomic(img if img_rgb is None else img_rgb, os.path.join(out_dir, "dashboard_preview.png"))
 
-    print(f"[esp_render] 7C preview: {preview_path}")
+    preview_path = os.path.join(out_dir, target.preview_name)
+    save_png_atomic(preview_image(out, target.palette), preview_path)
+    print(f"[esp_render] {target.name} preview: {preview_path}")
 
 
 # ==========================
 # 主流程
 # ==========================
 
-def main():
-    ensure_output_dir()
-
-    account_ctx = build_account_context()
-    video_ctx = build_video_context()
-
-    img = render_dashboard(account_ctx, video_ctx)
-    export_dashboard_7c_bin(img)
-
-    print("[esp_render] dashboard rendered & 7C bin generated.")
+def render_target(name: str,
+                  account_ctx: Dict[str, Any],
+                  video_ctx: Dict[str, Any],
+                  out_dir: str,
+                  version: str,
+                  previews: bool | None = None) -> str:
+    """
+    按一个渲染目标绘制、量化并写出帧缓冲（previews 为真时连同预览图），最后写入该目标的 VERSION_FILE，返回输出目录。
+    在进程池中执行，参数只含可 pickle 的数据上下文。
+    """
+    target = get_target(name)
+    out_dir = target_dir(out_dir, target)
+    ensure_output_dir(out_dir)
+
+    if target.layout == "compact":
+        img = render_dashboard_compact(account_ctx, video_ctx, target)
+    else:
+        img = render_dashboard(account_ctx, video_ctx, target.palette)
+    export_dashboard_bin(img, target, out_dir, previews)
+    write_atomic(os.path.join(out_dir, VERSION_FILE), version.encode("utf-8"))
+    return out_dir
+
+
+def render_account(mid: str | None = None,
+                   targets: List[str] | None = None,
+                   previews: bool | None = None) -> str:
+    """
+    渲染一个账号的看板，返回本次渲染所用数据的版本号（同时写入各目标的 VERSION_FILE）。
+    版本号在读取数据之前取得：渲染期间若有新快照写入，结果会被视为过期并在下次请求时重新渲染。
+    数据上下文只准备一次；targets（缺省为 ENABLED_TARGETS）多于一个时各目标在进程池中并行绘制与量化。
+    """
+    names = list(targets or ENABLED_TARGETS)
+    for name in names:
+        get_target(name)  # 未注册的目标在读库之前就报错
+
+    out_dir = output_dir_for(mid)
+    ensure_output_dir(out_dir)
+    version = get_data_version(get_account(mid)["mid"])
+
+    account_ctx = build_account_context(mid)
+    video_ctx = build_video_context(mid)
+
+    if len(names) == 1:
+        render_target(names[0], account_ctx, video_ctx, out_dir, version, previews)
+    else:
+        workers = min(len(names), os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(render_target, name, account_ctx, video_ctx, out_dir, version, previews)
+                for name in names
+            ]
+            for f in futures:
+                f.result()
+
+    print(f"[esp_render] mid={get_account(mid)['mid']} dashboard rendered ({', '.join(names)}): {out_dir}")
+    return version
+
+
+def main(mids: List[str] | None = None,
+         targets: List[str] | None = None,
+         previews: bool | None = None):
+    """
+    为每个账号（或 mids 指定的账号）渲染各自设备的看板，targets 缺省为 ENABLED_TARGETS，
+    previews 缺省为 ESP_WRITE_PREVIEWS。
+    """
+    for mid in mids or [a["mid"] for a in ACCOUNTS]:
+        render_account(mid, targets, previews)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="渲染 ESP32 墨水屏看板")
+    parser.add_argument("--mid", action="append", default=None,
+                        help="只渲染指定账号，可重复；默认渲染 config 中的全部账号")
+    parser.add_argument("--target", action="append", default=None,
+                        help="只渲染指定目标（见 render_targets.RENDER_TARGETS），可重复；默认为 ESP_RENDER_TARGETS")
+    parser.add_argument("--preview", action="store_true",
+                        help="同时写出预览图（默认只写帧缓冲，预览由 /api/esp32/preview.png 按需生成）")
+    args = parser.parse_args()
+    main(args.mid, args.target, True if args.preview else None)
\ No newline at end of file
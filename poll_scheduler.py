@@ -0,0 +1,149 @@
+# poll_scheduler.py
+#
+# 自适应轮询：根据视频的发布时长与最近播放增速决定刷新间隔，
+# 新发布 / 正在爆发的视频每小时刷新，长期稳定的老视频每周刷新一次。
+# 每次 run_snapshot(adaptive=True) 只拉取已到期的视频，状态按账号（mid）持久化在 video_schedule 表。
+# 投稿列表（分页接口）只按 ARCHIVE_REFRESH_INTERVAL 每天同步一次，其余各轮直接使用 video_schedule 中的视频，
+# 每小时运行时接口调用量与每日全量快照相当。
+
+import sqlite3
+from typing import Any, Dict, Iterable, List, Tuple
+
+HOUR = 3600
+DAY = 24 * HOUR
+
+# (发布不超过 N 天, 或播放增速 >= V 次/小时) -> 刷新间隔（秒），自上而下匹配第一条
+INTERVAL_TIERS: List[Tuple[float, float, int]] = [
+    (2, 100.0, HOUR),
+    (7, 20.0, 6 * HOUR),
+    (30, 2.0, DAY),
+]
+MAX_INTERVAL = 7 * DAY
+
+# 提前量：在到期前该时间内的视频也算作本轮到期，避免因 cron 抖动错过一轮
+DUE_SLACK = 5 * 60
+
+# 投稿列表的同步间隔：新投稿最迟在下一次同步时进入调度
+ARCHIVE_REFRESH_INTERVAL = DAY
+
+
+def compute_interval(age_sec: float, velocity: float | None) -> int:
+    age_days = age_sec / DAY
+    v = velocity or 0.0
+    for max_age_days, min_velocity, interval in INTERVAL_TIERS:
+        if age_days <= max_age_days or v >= min_velocity:
+            return interval
+    return MAX_INTERVAL
+
+
+def sync_schedule(cur: sqlite3.Cursor, mid: str, archives: Iterable[Dict[str, Any]], now: int) -> Tuple[int, int]:
+    """
+    以某个账号的投稿列表为准同步 video_schedule：新视频立即到期，已不在列表中的视频移除。
+    返回 (新增数, 移除数)。
+    """
+    current = {
+        v["bvid"]: int(v.get("created") or v.get("pubdate") or 0)
+        for v in archives if v.get("bvid")
+    }
+
+    cur.execute("SELECT bvid FROM video_schedule WHERE mid = ?;", (mid,))
+    known = {r[0] for r in cur.fetchall()}
+
+    added = [(mid, bvid, pub, HOUR, now) for bvid, pub in current.items() if bvid not in known]
+    cur.executemany(
+        "INSERT INTO video_schedule (mid, bvid, pubdate, interval_sec, next_due) VALUES (?, ?, ?, ?, ?);",
+        added,
+    )
+
+    removed = [(mid, bvid) for bvid in known if bvid not in current]
+    cur.executemany("DELETE FROM video_schedule WHERE mid = ? AND bvid = ?;", removed)
+    return len(added), len(removed)
+
+
+def archives_due(cur: sqlite3.Cursor, mid: str, now: int) -> bool:
+    """
+    是否需要重新拉取投稿列表：从未同步、距上次同步已满 ARCHIVE_REFRESH_INTERVAL，或调度表为空。
+    """
+    cur.execute("SELECT synced_at FROM archive_sync WHERE mid = ?;", (mid,))
+    row = cur.fetchone()
+    if row is None or now - row[0] >= ARCHIVE_REFRESH_INTERVAL - DUE_SLACK:
+        return True
+    cur.execute("SELECT 1 FROM video_schedule WHERE mid = ? LIMIT 1;", (mid,))
+    return cur.fetchone() is None
+
+
+def mark_archives_synced(cur: sqlite3.Cursor, mid: str, now: int) -> None:
+    cur.execute(
+        "INSERT INTO archive_sync (mid, synced_at) VALUES (?, ?) "
+        "ON CONFLICT(mid) DO UPDATE SET synced_at = excluded.synced_at;",
+        (mid, now),
+    )
+
+
+def scheduled_archives(cur: sqlite3.Cursor, mid: str) -> List[Dict[str, Any]]:
+    """
+    不拉取投稿列表的轮次：以 video_schedule 中的视频代替，标题取自 video_titles。
+    """
+    cur.execute(
+        """
+        SELECT s.bvid, COALESCE(t.title, ''), s.pubdate
+        FROM video_schedule s
+        LEFT JOIN video_titles t ON t.mid = s.mid AND t.bvid = s.bvid
+        WHERE s.mid = ?
+        ORDER BY s.pubdate DESC;
+        """,
+        (mid,),
+    )
+    return [{"bvid": r[0], "title": r[1], "created": r[2]} for r in cur.fetchall()]
+
+
+def due_bvids(cur: sqlite3.Cursor, mid: str, now: int, budget: int | None = None) -> List[str]:
+    """
+    已到期的视频，按到期先后排序；budget 限制本轮最多拉取的条数。
+    """
+    sql = (
+        "SELECT bvid FROM video_schedule WHERE mid = ? AND next_due <= ? "
+        "ORDER BY next_due ASC, interval_sec ASC"
+    )
+    params: Tuple[Any, ...] = (mid, now + DUE_SLACK)
+    if budget is not None:
+        sql += " LIMIT ?"
+        params += (budget,)
+    cur.execute(sql + ";", params)
+    return [r[0] for r in cur.fetchall()]
+
+
+def record_fetch(cur: sqlite3.Cursor, mid: str, bvid: str, view: int, pubdate: int | None, now: int) -> int:
+    """
+    记录一次成功拉取：用与上一次拉取的播放差计算增速，并据此安排下次到期时间。
+    返回新的刷新间隔（秒）。
+    """
+    cur.execute(
+        "SELECT last_fetch, last_view, pubdate FROM video_schedule WHERE mid = ? AND bvid = ?;",
+        (mid, bvid),
+    )
+    row = cur.fetchone()
+    last_fetch, last_view, known_pub = (row[0], row[1], row[2]) if row else (None, None, None)
+
+    velocity = None
+    if last_fetch and last_view is not None and now > last_fetch:
+        velocity = max(0, view - last_view) / ((now - last_fetch) / HOUR)
+
+    pub = pubdate or known_pub or now
+    interval = compute_interval(now - pub, velocity)
+
+    cur.execute(
+        """
+        INSERT INTO video_schedule (mid, bvid, pubdate, interval_sec, next_due, last_fetch, last_view, velocity)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(mid, bvid) DO UPDATE SET
+            pubdate = excluded.pubdate,
+            interval_sec = excluded.interval_sec,
+            next_due = excluded.next_due,
+            last_fetch = excluded.last_fetch,
+            last_view = excluded.last_view,
+            velocity = excluded.velocity;
+        """,
+        (mid, bvid, pub, interval, now + interval, now, view, velocity),
+    )
+    return interval
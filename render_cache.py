@@ -0,0 +1,103 @@
+# render_cache.py
+#
+# 墨水屏看板按需渲染：设备拉取 /api/esp32/dashboard.bin、/api/esp32/<target>/dashboard.bin（或 .png 预览）时，
+# 若磁盘上该目标渲染结果的数据版本（esp_render.VERSION_FILE）落后于当前数据版本，则当场只重新渲染这一个目标。
+# 同一账号同一目标同一时刻只进行一次渲染（single-flight），并发的其他请求等待并复用这次的结果；
+# 结果按 (账号, 目标) 缓存在内存中（附数据版本），磁盘文件由 esp_render 先写临时文件再 rename 原子替换。
+# 预览图不随渲染写出，/api/esp32/preview.png 首次请求某版本时才从帧缓冲解包生成，并与该版本一起缓存。
+
+import os
+import threading
+from typing import Any, Dict, Tuple
+
+from accounts import get_account
+from db import get_data_version
+from render_targets import RenderTarget, get_target, target_dir, unpack_codes
+
+_memory: Dict[Tuple[str, str], Dict[str, Any]] = {}
+_locks: Dict[Tuple[str, str], threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+def _lock_for(key: Tuple[str, str]) -> threading.Lock:
+    with _locks_guard:
+        return _locks.setdefault(key, threading.Lock())
+
+
+def _read_disk(out_dir: str, target: RenderTarget, version: str | None) -> Dict[str, Any] | None:
+    """
+    读取磁盘上的帧缓冲；version 不为空时只接受该版本，文件缺失时返回 None。
+    """
+    import esp_render
+
+    stamp = esp_render.read_render_version(out_dir)
+    if version is not None and stamp != version:
+        return None
+    try:
+        with open(os.path.join(out_dir, target.bin_name), "rb") as f:
+            return {"version": stamp, "bin": f.read()}
+    except OSError:
+        return None
+
+
+def invalidate(version: str | None = None) -> None:
+    """
+    丢弃内存中的全部看板（daemon 数据变化后的缓存失效回调），下次请求重新读取磁盘或渲染。
+    """
+    with _locks_guard:
+        _memory.clear()
+
+
+def get_dashboard(mid: str | None = None, target: str | None = None) -> Dict[str, Any]:
+    """
+    返回某渲染目标（缺省为默认目标）与当前数据版本一致的看板：{"version", "bin"}，必要时先渲染。
+    未配置的 mid 或未注册的目标抛出 KeyError；渲染失败时退回磁盘上的旧结果，连旧结果也没有时抛出原异常。
+    """
+    # 延迟导入：渲染模块会加载字体，只在设备拉取看板时需要
+    import esp_render
+
+    mid = get_account(mid)["mid"]
+    spec = get_target(target)
+    key = (mid, spec.name)
+    version = get_data_version(mid)
+    entry = _memory.get(key)
+    if entry is not None and entry["version"] == version:
+        return entry
+
+    with _lock_for(key):
+        # 等锁期间可能已由另一个请求渲染完成
+        entry = _memory.get(key)
+        if entry is not None and entry["version"] == version:
+            return entry
+
+        out_dir = target_dir(esp_render.output_dir_for(mid), spec)
+        entry = _read_disk(out_dir, spec, version)
+        if entry is None:
+            try:
+                rendered = esp_render.render_account(mid, targets=[spec.name])
+            except Exception as e:
+                print(f"[render] mid={mid} target={spec.name} 按需渲染失败: {e!r}，尝试使用旧的渲染结果")
+                entry = _read_disk(out_dir, spec, None)
+                if entry is None:
+                    raise
+                return entry
+            entry = _read_disk(out_dir, spec, rendered)
+            if entry is None:
+                raise RuntimeError(f"render output missing after rendering mid={mid} target={spec.name}")
+        _memory[key] = entry
+    return entry
+
+
+def get_preview(mid: str | None = None, target: str | None = None) -> Dict[str, Any]:
+    """
+    与 get_dashboard 相同，另外保证 entry["png"] 为该版本帧缓冲的模拟显示预览图（首次请求时生成）。
+    """
+    import esp_render
+
+    entry = get_dashboard(mid, target)
+    if "png" not in entry:
+        # 并发请求可能各自生成一次，结果相同，直接覆盖即可
+        spec = get_target(target)
+        img = esp_render.preview_image(unpack_codes(entry["bin"], spec), spec.palette)
+        entry["png"] = esp_render.encode_png(img)
+    return entry
@@ -0,0 +1,121 @@
+# render_targets.py
+#
+# 墨水屏渲染目标注册表：每种屏幕一项，记录分辨率、调色板（色码与对应的 RGB）、
+# 帧缓冲的位打包方式与版式。esp_render 对同一账号的数据上下文只准备一次，再按目标分别绘制、量化、打包；
+# /api/esp32/<target>/dashboard.bin 按目标名返回对应的帧缓冲。
+#   - byte  ：每像素 1 字节色码（GxEPD2 7C 原始帧缓冲，原有格式）；
+#   - planes：黑、红两个 1bpp 平面先后拼接，每行按 8 像素对齐、高位在前，0 表示该像素着色（GxEPD2 三色屏）；
+#   - mono  ：单个 1bpp 黑色平面，编码同上。
+# 默认目标 7c_800x480 输出到账号目录本身（与原先路径、文件名一致），其他目标输出到其下的 <target>/ 子目录。
+
+import os
+from typing import Dict, List, NamedTuple, Tuple
+
+import numpy as np
+
+import config
+
+CODE_WHITE = 0xFF
+CODE_BLACK = 0x00
+CODE_RED = 0xE5
+CODE_YELLOW = 0xFC
+
+# GoodDisplay / GxEPD2 7色色码（这里只用其中 4 色）
+# code, (R,G,B)
+PALETTE_7C = [
+    (CODE_WHITE, (255, 255, 255)),  # white
+    (CODE_BLACK, (0,   0,   0  )),  # black
+    (CODE_RED,   (230, 0,   18 )),  # red
+    (CODE_YELLOW, (255, 242, 0 )),  # yellow
+]
+
+# 三色屏（黑白红）与黑白屏：色码沿用 7C 的取值，打包时再换算为位平面
+PALETTE_BWR = PALETTE_7C[:3]
+PALETTE_BW = PALETTE_7C[:2]
+
+
+class RenderTarget(NamedTuple):
+    name: str
+    width: int
+    height: int
+    palette: List[Tuple[int, Tuple[int, int, int]]]
+    packing: str  # byte / planes / mono
+    layout: str  # full（800×480 完整版）/ compact（小屏精简版）
+    bin_name: str
+    preview_name: str
+
+    @property
+    def size(self) -> Tuple[int, int]:
+        return (self.width, self.height)
+
+
+RENDER_TARGETS: Dict[str, RenderTarget] = {
+    # 7.3 寸 7 色屏（原有设备）
+    "7c_800x480": RenderTarget("7c_800x480", 800, 480, PALETTE_7C, "byte", "full",
+                               "dashboard7c_800x480.bin", "dashboard7c_preview.png"),
+    # 4.2 寸黑白红三色屏
+    "bwr_400x300": RenderTarget("bwr_400x300", 400, 300, PALETTE_BWR, "planes", "compact",
+                                "dashboard.bin", "dashboard_preview_bwr.png"),
+    # 4.2 寸黑白屏
+    "bw_400x300": RenderTarget("bw_400x300", 400, 300, PALETTE_BW, "mono", "compact",
+                               "dashboard.bin", "dashboard_preview_bw.png"),
+}
+
+DEFAULT_TARGET = "7c_800x480"
+
+# python esp_render.py 与常驻调度默认渲染的目标；按需渲染接口可请求任意已注册的目标
+ENABLED_TARGETS: List[str] = list(getattr(config, "ESP_RENDER_TARGETS", [DEFAULT_TARGET]))
+
+
+def get_target(name: str | None = None) -> RenderTarget:
+    """
+    按名称取渲染目标，缺省为 DEFAULT_TARGET；未注册的名称抛出 KeyError。
+    """
+    return RENDER_TARGETS[name or DEFAULT_TARGET]
+
+
+def target_dir(out_dir: str, target: RenderTarget) -> str:
+    if target.name == DEFAULT_TARGET:
+        return out_dir
+    return os.path.join(out_dir, target.name)
+
+
+def pack_codes(codes: np.ndarray, target: RenderTarget) -> bytes:
+    """
+    色码矩阵（height × width）-> 设备帧缓冲字节。
+    """
+    assert codes.shape == (target.height, target.width)
+    if target.packing == "byte":
+        return codes.tobytes()
+    # 位平面：1 为不着色（白），按行补齐到 8 像素
+    black = np.packbits(codes != CODE_BLACK, axis=1)
+    if target.packing == "mono":
+        return black.tobytes()
+    if target.packing == "planes":
+        red = np.packbits(codes != CODE_RED, axis=1)
+        return black.tobytes() + red.tobytes()
+    raise ValueError(f"unknown packing: {target.packing}")
+
+
+def unpack_codes(data: bytes, target: RenderTarget) -> np.ndarray:
+    """
+    pack_codes 的逆过程：设备帧缓冲字节 -> 色码矩阵（按需生成预览图时使用）。
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    h, w = target.height, target.width
+    if target.packing == "byte":
+        return buf.reshape(h, w)
+
+    row = (w + 7) // 8
+
+    def plane(i: int) -> np.ndarray:
+        bits = np.unpackbits(buf[i * h * row:(i + 1) * h * row].reshape(h, row), axis=1)
+        return bits[:, :w] == 0
+
+    codes = np.full((h, w), CODE_WHITE, dtype=np.uint8)
+    codes[plane(0)] = CODE_BLACK
+    if target.packing == "planes":
+        codes[plane(1)] = CODE_RED
+    elif target.packing != "mono":
+        raise ValueError(f"unknown packing: {target.packing}")
+    return codes
@@ -0,0 +1,226 @@
+# series.py
+#
+# 账号维度时间序列：按账号缓存 account_snapshots 的日期与各项累计值（NumPy 数组），
+# 有新快照时只重新读取变化的尾部，不再每次整表读取。
+# 账号累计值本身就是每日增量的前缀和，因此任意窗口内的增量、累计增长与滑动平均
+# 都是两个前缀和之差，一次向量化运算即可得到，图表只取实际绘制的点。
+#
+# 长序列降采样：LTTB（Largest-Triangle-Three-Buckets）把序列压缩到 N 个点并保留峰谷形状，
+# 接口的 ?points=N 与墨水屏折线图共用；结果按 (序列, N, 数据版本) 缓存。
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Sequence, Tuple
+
+import numpy as np
+
+from accounts import resolve_mid
+from db import get_conn
+
+ACCOUNT_METRICS = (
+    "follower", "total_view", "total_like", "total_coin",
+    "total_favorite", "total_reply", "total_danmaku", "total_share",
+)
+# delta：每日增量；sum：窗口起点以来的累计增长；avg7：每日增量的 7 日滑动平均
+SERIES_AGGS = ("delta", "sum", "avg7")
+MAX_WINDOW = 3650
+
+_cache: Dict[str, Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+
+def _table_key(cur, mid: str) -> Tuple[int, int]:
+    cur.execute("SELECT MAX(id), COUNT(*) FROM account_snapshots WHERE mid = ?;", (mid,))
+    max_id, count = cur.fetchone()
+    return int(max_id or 0), int(count or 0)
+
+
+def _load_rows(cur, mid: str, since: str | None = None) -> List[tuple]:
+    cols = ", ".join(ACCOUNT_METRICS)
+    if since is None:
+        cur.execute(
+            f"SELECT snapshot_date, {cols} FROM account_snapshots WHERE mid = ? ORDER BY snapshot_date ASC;",
+            (mid,),
+        )
+    else:
+        cur.execute(
+            f"SELECT snapshot_date, {cols} FROM account_snapshots "
+            f"WHERE mid = ? AND snapshot_date >= ? ORDER BY snapshot_date ASC;",
+            (mid, since),
+        )
+    return cur.fetchall()
+
+
+def _to_array(rows: List[tuple]) -> np.ndarray:
+    return np.array(
+        [[v or 0 for v in r[1:]] for r in rows], dtype=np.int64
+    ).reshape(-1, len(ACCOUNT_METRICS))
+
+
+def _refresh(cur, mid: str, cached: Dict[str, Any] | None) -> Dict[str, Any]:
+    """
+    增量刷新：读取 id 大于已缓存最大 id 的新快照，从其中最早的日期（快照任务会重写当天记录）起
+    重新读取尾部并拼接到缓存前段；条数对不上（批量导入、去重删除等）时整表重建。
+    """
+    key = _table_key(cur, mid)
+    if cached is not None and cached["key"] == key:
+        return cached
+
+    if cached is not None and cached["dates"] and key[0] > cached["key"][0]:
+        cur.execute(
+            "SELECT MIN(snapshot_date) FROM account_snapshots WHERE mid = ? AND id > ?;",
+            (mid, cached["key"][0]),
+        )
+        since = min(cur.fetchone()[0], cached["dates"][-1])
+        keep = int(np.searchsorted(np.array(cached["dates"]), since, side="left"))
+        tail = _load_rows(cur, mid, since)
+        if keep + len(tail) == key[1]:
+            return {
+                "key": key,
+                "dates": cached["dates"][:keep] + [r[0] for r in tail],
+                "values": np.concatenate([cached["values"][:keep], _to_array(tail)]),
+            }
+
+    rows = _load_rows(cur, mid)
+    return {"key": key, "dates": [r[0] for r in rows], "values": _to_array(rows)}
+
+
+def _account_table(mid: str) -> Dict[str, Any]:
+    conn = get_conn()
+    conn.row_factory = None
+    try:
+        with _lock:
+            table = _refresh(conn.cursor(), mid, _cache.get(mid))
+            _cache[mid] = table
+    finally:
+        conn.close()
+    return table
+
+
+def account_series(metric: str = "follower",
+                   window: int = 30,
+                   agg: str = "delta",
+                   mid: str | None = None) -> Dict[str, Any]:
+    """
+    最近 window 个快照日的账号时间序列（delta 需要多读 1 个点来求差，avg7 需要向前多读 7 个点）。
+    返回 dates 与 values 两个等长列表，以及窗口内的总增量 total。
+    """
+    if metric not in ACCOUNT_METRICS:
+        raise ValueError(f"unsupported metric: {metric!r}")
+    if agg not in SERIES_AGGS:
+        raise ValueError(f"unsupported agg: {agg!r}")
+    if window < 1 or window > MAX_WINDOW:
+        raise ValueError(f"window must be within 1..{MAX_WINDOW}: {window!r}")
+
+    table = _account_table(resolve_mid(mid))
+    dates = table["dates"]
+    cum = table["values"][:, ACCOUNT_METRICS.index(metric)]
+    result: Dict[str, Any] = {"metric": metric, "agg": agg, "window": window, "dates": [], "values": [], "total": 0}
+    if cum.size < 2:
+        return result
+
+    # 第一个点没有前一日可比，序列从第二个点开始
+    start = max(1, cum.size - window)
+    idx = np.arange(start, cum.size)
+    if agg == "delta":
+        values = cum[idx] - cum[idx - 1]
+    elif agg == "sum":
+        values = cum[idx] - cum[start - 1]
+    else:
+        lo = np.maximum(idx - 7, 0)
+        values = (cum[idx] - cum[lo]) / (idx - lo)
+
+    result["dates"] = [dates[i] for i in idx]
+    result["values"] = values.tolist()
+    result["total"] = int(cum[-1] - cum[start - 1])
+    return result
+
+
+# ==========================
+# LTTB 降采样
+# ==========================
+
+MIN_POINTS = 3
+DOWNSAMPLE_CACHE_SIZE = 256
+
+_downsample_cache: "OrderedDict[Hashable, Any]" = OrderedDict()
+_downsample_lock = threading.Lock()
+
+
+def lttb_indices(x: Sequence[float], y: Sequence[float], points: int) -> np.ndarray:
+    """
+    LTTB 降采样，返回保留点的下标（升序，含首尾）。
+    首尾之外的点等分为 points - 2 个桶，每个桶选出与“上一个选中点”“下一个桶的均值点”
+    构成三角形面积最大的点。桶均值由前缀和一次算出，桶内面积按 NumPy 向量计算，
+    只有“依赖上一个选中点”这一步按桶顺序进行。
+    """
+    size = len(y)
+    if points >= size:
+        return np.arange(size)
+    if points < MIN_POINTS:
+        raise ValueError(f"points must be >= {MIN_POINTS}: {points!r}")
+
+    xs = np.asarray(x, dtype=np.float64)
+    ys = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, size - 1, points - 1).astype(np.int64)
+
+    # 各桶均值：前缀和之差 / 桶长度；最后一个桶的“下一个点”为序列终点
+    cx = np.concatenate(([0.0], np.cumsum(xs)))
+    cy = np.concatenate(([0.0], np.cumsum(ys)))
+    lengths = edges[1:] - edges[:-1]
+    avg_x = np.append((cx[edges[1:]] - cx[edges[:-1]]) / lengths, xs[-1])
+    avg_y = np.append((cy[edges[1:]] - cy[edges[:-1]]) / lengths, ys[-1])
+
+    out = np.empty(points, dtype=np.int64)
+    out[0], out[-1] = 0, size - 1
+    a = 0
+    for b in range(points - 2):
+        lo, hi = edges[b], edges[b + 1]
+        nx, ny = avg_x[b + 1], avg_y[b + 1]
+        area = np.abs((xs[a] - nx) * (ys[lo:hi] - ys[a]) - (xs[a] - xs[lo:hi]) * (ny - ys[a]))
+        a = lo + int(np.argmax(area))
+        out[b + 1] = a
+    return out
+
+
+def downsample_rows(rows: List[Dict[str, Any]],
+                    points: int,
+                    y_field: str,
+                    x: Sequence[float] | None = None) -> List[Dict[str, Any]]:
+    """
+    按 y_field 对整行记录做 LTTB 降采样，保留的行原样返回（其余字段随之保留）。
+    x 为横坐标（如采样时刻），缺省时按行号等距。
+    """
+    if len(rows) <= points:
+        return rows
+    y = [r.get(y_field) or 0 for r in rows]
+    idx = lttb_indices(np.arange(len(rows)) if x is None else x, y, points)
+    return [rows[i] for i in idx]
+
+
+def cached_downsample(key: Hashable, version: str, build: Callable[[], Any]) -> Any:
+    """
+    降采样结果的 LRU 缓存：key 标识序列与点数，version 为数据版本，数据变化后旧结果自然失效。
+    """
+    full_key = (key, version)
+    with _downsample_lock:
+        if full_key in _downsample_cache:
+            _downsample_cache.move_to_end(full_key)
+            return _downsample_cache[full_key]
+
+    result = build()
+    with _downsample_lock:
+        _downsample_cache[full_key] = result
+        while len(_downsample_cache) > DOWNSAMPLE_CACHE_SIZE:
+            _downsample_cache.popitem(last=False)
+    return result
+
+
+def invalidate(version: str | None = None) -> None:
+    """
+    清空账号序列表与降采样结果（daemon 数据变化后的缓存失效回调）。
+    """
+    with _lock:
+        _cache.clear()
+    with _downsample_lock:
+        _downsample_cache.clear()
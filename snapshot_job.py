@@ -1,178 +1,388 @@
 # snapshot_job.py
 
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
+import argparse
 import time
 
-import requests
-
-from config import MY_MID
-from bili_api import fetch_user_archives, fetch_video_info, fetch_user_fans
-from db import get_conn, init_db
-
-
-def safe_fetch_video_info(
+import config
+from accounts import ACCOUNTS, get_account
+from bili_api import (
+    fetch_user_archives,
+    fetch_video_stat,
+    fetch_user_fans,
+    classify_error,
+    BiliAPIError,
+    RetryPolicy,
+    VideoStat,
+    BREAKER,
+    RATE_LIMITER,
+    POOL,
+)
+from db import get_conn, init_db, bump_data_version, CARRY_FORWARD_DAYS, LATEST_SAMPLE_SQL
+from poll_scheduler import (
+    archives_due,
+    due_bvids,
+    mark_archives_synced,
+    record_fetch,
+    scheduled_archives,
+    sync_schedule,
+)
+from cohort import record_sample
+from title_search import sync_title
+from anomaly import detect_anomalies
+from checkpoint import (
+    create_run,
+    load_run,
+    run_owner,
+    unfinished_items,
+    mark_done,
+    mark_failed,
+    done_totals,
+    failed_items,
+    finish_run,
+    abandon_runs,
+    prune_runs,
+)
+
+# 临时失败视频在本轮末尾统一重试前的等待时间（秒）
+DEFERRED_RETRY_DELAY = 10.0
+
+# 多账号并发抓取的线程数（每个账号一个线程，账号内仍逐条拉取）
+SNAPSHOT_WORKERS = getattr(config, "SNAPSHOT_WORKERS", 4)
+
+
+def safe_fetch_video_stat(
     bvid: str,
-    retries: int = 3,
-    delay: float = 1.0,
-) -> Optional[Dict[str, Any]]:
-
-    last_err: Optional[Exception] = None
-    for attempt in range(1, retries + 1):
-        try:
-            return fetch_video_info(bvid)
-        except (requests.exceptions.RequestException, Exception) as e:
-            last_err = e
-            print(
-                f"[warn] fetch_video_info {bvid} 失败({attempt}/{retries}): {repr(e)}"
-            )
-            if attempt < retries:
-                time.sleep(delay)
-            else:
-                print(
-                    f"[error] bvid={bvid} 在调用 /x/web-interface/view 时连续失败，"
-                    f"已重试 {retries} 次，最后一次异常: {repr(e)}"
-                )
-                return None
-    return None
+    policy: Optional[RetryPolicy] = None,
+    cookie: Optional[str] = None,
+) -> Tuple[Optional[VideoStat], Optional[BiliAPIError]]:
+    """
+    重试（指数退避 + 抖动）由 bili_api.request_json 负责；
+    这里只兜底异常，返回 (info, None) 或 (None, 归类后的错误)。
+    """
+    try:
+        return fetch_video_stat(bvid, policy=policy, cookie=cookie), None
+    except Exception as e:
+        err = classify_error(e)
+        print(
+            f"[error] bvid={bvid} 在调用 /x/web-interface/view 时失败"
+            f"（{'可稍后重试' if err.retryable else '不可重试'}），最后一次异常: {err}"
+        )
+        return None, err
 
 
-def run_snapshot(snapshot_date: str | None = None) -> None:
+def _carried_totals(cur, mid: str, bvids: List[str], snapshot_date: str) -> Dict[str, int]:
+    """
+    自适应模式下本轮未刷新的视频：沿用其最近一次快照，计入账号维度汇总。
+    """
+    totals = dict.fromkeys(
+        ("view", "like", "coin", "favorite", "reply", "danmaku", "share"), 0
+    )
+    if not bvids:
+        return totals
+
+    cur.execute("CREATE TEMP TABLE IF NOT EXISTS _carry_bvids (bvid TEXT PRIMARY KEY);")
+    cur.execute("DELETE FROM _carry_bvids;")
+    cur.executemany("INSERT OR IGNORE INTO _carry_bvids (bvid) VALUES (?);", [(b,) for b in bvids])
+    # 每个视频在索引上查找一次最后一条采样，见 db.LATEST_SAMPLE_SQL
+    cur.execute(
+        f"""
+        SELECT SUM(v.view), SUM(v.like), SUM(v.coin), SUM(v.favorite),
+               SUM(v.reply), SUM(v.danmaku), SUM(v.share)
+        FROM _carry_bvids c
+        JOIN video_snapshots v ON v.id = ({LATEST_SAMPLE_SQL.format(mid="?", bvid="c.bvid")})
+        WHERE v.snapshot_date >= date(?, ?);
+        """,
+        (mid, snapshot_date, f"-{CARRY_FORWARD_DAYS} days"),
+    )
+    row = cur.fetchone()
+    for key, val in zip(totals, row):
+        totals[key] = int(val or 0)
+    return totals
+
+
+def _short(title: str) -> str:
+    return title if len(title) <= 40 else title[:37] + "..."
+
+
+def _snapshot_video(conn, cur, account: Dict[str, Any], run_id: int, snapshot_date: str,
+                    item: Dict[str, Any], adaptive: bool) -> Tuple[bool, bool]:
+    """
+    拉取并写入单条视频，同时更新断点。返回 (是否成功, 失败时是否值得稍后重试)。
+    """
+    bvid = item["bvid"]
+    title = item.get("title") or ""
+
+    mid = account["mid"]
+    info, err = safe_fetch_video_stat(bvid, cookie=account["cookie"])
+    if info is None:
+        reason = "view_api_failed"
+        if err is not None and err.code is not None:
+            reason += f": code={err.code}"
+        mark_failed(cur, run_id, bvid, reason)
+        conn.commit()
+        return False, bool(err and err.retryable)
+
+    detail_title = info.title or title
+    pubdate = info.pubdate
+    duration = info.duration
+
+    view = info.view
+    like = info.like
+    coin = info.coin
+    favorite = info.favorite
+    reply = info.reply
+    danmaku = info.danmaku
+    share = info.share
+
+    snapshot_ts = int(time.time())
+    stats = {
+        "view": view, "like": like, "coin": coin, "favorite": favorite,
+        "reply": reply, "danmaku": danmaku, "share": share,
+    }
 
-    init_db()
+    try:
+        cur.execute(
+            """
+            INSERT INTO video_snapshots (
+                snapshot_date, bvid, title,
+                view, like, coin, favorite, reply, danmaku, share,
+                pubdate, duration, snapshot_ts, mid
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
+            """,
+            (
+                snapshot_date,
+                bvid,
+                detail_title,
+                view,
+                like,
+                coin,
+                favorite,
+                reply,
+                danmaku,
+                share,
+                pubdate,
+                duration,
+                snapshot_ts,
+                mid,
+            ),
+        )
+    except Exception as e:
+        print(
+            f"[error] bvid={bvid} 在写入 video_snapshots 时失败: {repr(e)}，该视频本次跳过。"
+        )
+        mark_failed(cur, run_id, bvid, f"db_insert_failed: {e}")
+        conn.commit()
+        return False, False
 
-    if snapshot_date is None:
-        snapshot_date = date.today().isoformat()
+    record_sample(cur, mid, bvid, pubdate, snapshot_date, snapshot_ts, stats)
+    sync_title(cur, mid, bvid, detail_title)
+    bump_data_version(cur, mid)
+    mark_done(cur, run_id, bvid, stats)
 
-    print("=" * 80)
-    print(f"[snapshot] 开始快照 snapshot_date={snapshot_date}")
-    print("[snapshot] 步骤 1：拉取投稿列表 /x/space/wbi/arc/search")
+    if adaptive:
+        record_fetch(cur, mid, bvid, view, pubdate, int(time.time()))
 
-    archives = fetch_user_archives(MY_MID)
-    total_archives = len(archives)
-    print(f"[snapshot] 共获取到 {total_archives} 条投稿记录。")
+    # 每条视频单独提交，作为断点
+    conn.commit()
+    return True, False
+
+
+def run_snapshot(snapshot_date: str | None = None,
+                 adaptive: bool = False,
+                 budget: int | None = None,
+                 resume: bool = False,
+                 run_id: int | None = None,
+                 mid: str | None = None) -> Dict[str, Any]:
+    """
+    对单个账号（mid 为空时为默认账号）执行一轮快照。
+    adaptive=False：全量拉取所有投稿（原有的每日快照）。
+    adaptive=True：只拉取 video_schedule 中已到期的视频（最多 budget 条），
+    其余视频沿用最近一次快照；可在 cron 中每小时执行。
+    resume=True：从最近一次（或 run_id 指定的）未完成任务的断点继续，
+    只补拉未完成的视频，然后汇总账号维度。
+    """
+
+    account = get_account(mid)
+    mid = account["mid"]
+    tag = f"[snapshot {mid}]"
 
-    if total_archives == 0:
-        print("[snapshot] 未获取到任何投稿，直接结束。")
-        print("=" * 80)
-        return
+    init_db()
+    # 熔断器为进程内全局共享，只统计本次运行期间新增的熔断次数
+    trips_start = BREAKER.trips
 
     conn = get_conn()
     cur = conn.cursor()
 
-    print("[snapshot] 步骤 2：清理当日旧快照记录（video_snapshots / account_snapshots）")
-    cur.execute("DELETE FROM video_snapshots WHERE snapshot_date = ?;", (snapshot_date,))
-    cur.execute("DELETE FROM account_snapshots WHERE snapshot_date = ?;", (snapshot_date,))
-
-    total_view = total_like = total_coin = 0
-    total_fav = total_reply = total_dm = total_share = 0
-
-    success_count = 0
+    run = None
+    if resume:
+        run = load_run(cur, mid, run_id)
+        if run is None:
+            print(f"{tag} 没有可恢复的未完成任务，开始新的一轮快照。")
+        elif run["status"] == "done":
+            print(f"{tag} 任务 run_id={run['run_id']} 已完成，无需恢复。")
+            conn.close()
+            return {"snapshot_date": run["snapshot_date"], "success": 0, "failed": 0,
+                    "fetched": 0, "run_id": run["run_id"], "mid": mid}
+
+    now = int(time.time())
     failed_list: List[Dict[str, Any]] = []
 
-    print("[snapshot] 步骤 3：逐条拉取视频详细信息 /x/web-interface/view 并写入 video_snapshots")
-
-    for idx, v in enumerate(archives, start=1):
-        bvid = v.get("bvid")
-        title = v.get("title") or ""
-        if not bvid:
-            print(f"[warn] 第 {idx}/{total_archives} 条没有 bvid，跳过。原始记录: {v}")
-            failed_list.append({"bvid": None, "title": title, "reason": "no_bvid"})
-            continue
-
-        short_title = title if len(title) <= 40 else title[:37] + "..."
-        print(
-            f"[snapshot] [{idx}/{total_archives}] 准备拉取视频 "
-            f"bvid={bvid}，标题=\"{short_title}\""
-        )
+    if run is not None:
+        run_id = run["run_id"]
+        snapshot_date = run["snapshot_date"]
+        adaptive = bool(run["adaptive"])
+        carried: List[str] = run["carried"]
+        print("=" * 80)
+        print(f"{tag} 恢复快照任务 run_id={run_id} snapshot_date={snapshot_date}")
+    else:
+        if snapshot_date is None:
+            snapshot_date = date.today().isoformat()
 
-        info = safe_fetch_video_info(bvid, retries=3, delay=1.0)
-        if info is None:
-            failed_list.append(
-                {"bvid": bvid, "title": title, "reason": "view_api_failed"}
+        print("=" * 80)
+        print(f"{tag} 开始快照 snapshot_date={snapshot_date}")
+
+        # 自适应模式下投稿列表每天只同步一次，其余轮次只拉取到期的视频
+        refresh = not adaptive or archives_due(cur, mid, now)
+        if refresh:
+            print(f"{tag} 步骤 1：拉取投稿列表 /x/space/wbi/arc/search")
+            try:
+                archives = fetch_user_archives(mid, cookie=account["cookie"])
+            except Exception as e:
+                err = classify_error(e)
+                print(f"[error] 拉取投稿列表失败: {err}，本次快照中止（不会写入不完整的账号汇总）。")
+                print("=" * 80)
+                conn.close()
+                return {"snapshot_date": snapshot_date, "success": 0, "failed": 0, "fetched": 0,
+                        "mid": mid, "error": str(err)}
+            total_archives = len(archives)
+            print(f"{tag} 共获取到 {total_archives} 条投稿记录。")
+        else:
+            archives = scheduled_archives(cur, mid)
+            total_archives = len(archives)
+            print(f"{tag} 步骤 1：投稿列表今日已同步，使用调度表中的 {total_archives} 条视频。")
+
+        if total_archives == 0:
+            print(f"{tag} 未获取到任何投稿，直接结束。")
+            print("=" * 80)
+            conn.close()
+            return {"snapshot_date": snapshot_date, "success": 0, "failed": 0, "fetched": 0, "mid": mid}
+
+        carried = []
+        if adaptive:
+            if refresh:
+                added, removed = sync_schedule(cur, mid, archives, now)
+                mark_archives_synced(cur, mid, now)
+                print(f"{tag} 自适应轮询：同步投稿列表，新增 {added} 条、移除 {removed} 条。")
+            due = set(due_bvids(cur, mid, now, budget))
+            carried = [v["bvid"] for v in archives if v.get("bvid") and v["bvid"] not in due]
+            archives = [v for v in archives if v.get("bvid") in due]
+            total_archives = len(archives)
+            print(
+                f"{tag} 自适应轮询：本轮到期 {total_archives} 条，沿用旧快照 {len(carried)} 条。"
             )
-            continue
 
-        detail_title = info.get("title") or title
-        pubdate = info.get("pubdate")
-        duration = info.get("duration")
-        stat = info.get("stat") or {}
+        for idx, v in enumerate(archives, start=1):
+            if not v.get("bvid"):
+                print(f"[warn] 第 {idx}/{total_archives} 条没有 bvid，跳过。原始记录: {v}")
+                failed_list.append({"bvid": None, "title": v.get("title") or "", "reason": "no_bvid"})
+
+        abandoned = abandon_runs(cur, mid)
+        if abandoned:
+            print(f"{tag} 已放弃 {abandoned} 个遗留的未完成任务。")
+        pruned = prune_runs(cur, mid, now)
+        if pruned:
+            print(f"{tag} 已清理 {pruned} 个过期的快照任务记录。")
+        run_id = create_run(cur, mid, snapshot_date, archives, carried, adaptive)
+        conn.commit()
+        print(f"{tag} 创建快照任务 run_id={run_id}（可用 --resume 从断点继续）")
+
+    items = unfinished_items(cur, run_id)
+    total_archives = len(items)
+    success_count = 0
 
-        view = stat.get("view") or 0
-        like = stat.get("like") or 0
-        coin = stat.get("coin") or 0
-        favorite = stat.get("favorite") or 0
-        reply = stat.get("reply") or 0
-        danmaku = stat.get("danmaku") or 0
-        share = stat.get("share") or 0
+    # 视频快照按采样时刻追加（日粒度视图取每天最后一次采样），无需清理当日记录
+    print(f"{tag} 步骤 2：本轮待拉取视频 {total_archives} 条（run_id={run_id}）")
 
-        try:
-            cur.execute(
-                """
-                INSERT INTO video_snapshots (
-                    snapshot_date, bvid, title,
-                    view, like, coin, favorite, reply, danmaku, share,
-                    pubdate, duration
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
-                """,
-                (
-                    snapshot_date,
-                    bvid,
-                    detail_title,
-                    view,
-                    like,
-                    coin,
-                    favorite,
-                    reply,
-                    danmaku,
-                    share,
-                    pubdate,
-                    duration,
-                ),
-            )
-        except Exception as e:
-            print(
-                f"[error] bvid={bvid} 在写入 video_snapshots 时失败: {repr(e)}，该视频本次跳过。"
-            )
-            failed_list.append(
-                {"bvid": bvid, "title": detail_title, "reason": f"db_insert_failed: {e}"}
-            )
-            continue
+    print(f"{tag} 步骤 3：逐条拉取视频详细信息 /x/web-interface/view 并写入 video_snapshots")
 
-        total_view += view
-        total_like += like
-        total_coin += coin
-        total_fav += favorite
-        total_reply += reply
-        total_dm += danmaku
-        total_share += share
+    deferred: List[Dict[str, Any]] = []
+    for idx, item in enumerate(items, start=1):
+        short_title = _short(item.get("title") or "")
+        print(
+            f"{tag} [{idx}/{total_archives}] 准备拉取视频 "
+            f"bvid={item['bvid']}，标题=\"{short_title}\""
+        )
 
-        success_count += 1
+        ok, retryable = _snapshot_video(conn, cur, account, run_id, snapshot_date, item, adaptive)
+        if ok:
+            success_count += 1
+        elif retryable:
+            deferred.append(item)
 
         if idx % 10 == 0 or idx == total_archives:
             print(
-                f"[snapshot] 已处理 {idx}/{total_archives} 条视频，"
-                f"当前成功 {success_count} 条，失败 {len(failed_list)} 条。"
+                f"{tag} 已处理 {idx}/{total_archives} 条视频，"
+                f"当前成功 {success_count} 条，失败 {idx - success_count} 条。"
             )
 
-    print("[snapshot] 步骤 4：拉取粉丝数 /x/relation/stat")
+    # 延迟重试队列：临时性失败（限流 / 超时等）的视频在本轮最后统一再试一次
+    if deferred:
+        print(
+            f"{tag} 步骤 3b：{DEFERRED_RETRY_DELAY:.0f}s 后重试 {len(deferred)} 条临时失败的视频"
+        )
+        time.sleep(DEFERRED_RETRY_DELAY)
+        for idx, item in enumerate(deferred, start=1):
+            print(f"{tag} [retry {idx}/{len(deferred)}] bvid={item['bvid']}")
+            ok, _ = _snapshot_video(conn, cur, account, run_id, snapshot_date, item, adaptive)
+            if ok:
+                success_count += 1
+
+    # 账号维度汇总：本任务内所有已完成视频（含此前中断前完成的部分）+ 沿用旧快照的视频
+    done = done_totals(cur, run_id)
+    total_view = done["view"]
+    total_like = done["like"]
+    total_coin = done["coin"]
+    total_fav = done["favorite"]
+    total_reply = done["reply"]
+    total_dm = done["danmaku"]
+    total_share = done["share"]
+    failed_list.extend(failed_items(cur, run_id))
+
+    if carried:
+        carry = _carried_totals(cur, mid, carried, snapshot_date)
+        total_view += carry["view"]
+        total_like += carry["like"]
+        total_coin += carry["coin"]
+        total_fav += carry["favorite"]
+        total_reply += carry["reply"]
+        total_dm += carry["danmaku"]
+        total_share += carry["share"]
+
+    print(f"{tag} 步骤 4：拉取粉丝数 /x/relation/stat")
     try:
-        fans = fetch_user_fans(MY_MID)
+        fans = fetch_user_fans(mid, cookie=account["cookie"])
         follower = fans.get("follower") or 0
     except Exception as e:
         print(f"[error] 拉取粉丝数失败: {repr(e)}，follower 记为 0。")
         follower = 0
         failed_list.append({"bvid": None, "title": "粉丝数", "reason": f"fans_api_failed: {e}"})
 
-    print("[snapshot] 步骤 5：写入账号维度快照 account_snapshots")
+    print(f"{tag} 步骤 5：写入账号维度快照 account_snapshots（账号维度每天只保留一条）")
     try:
+        cur.execute(
+            "DELETE FROM account_snapshots WHERE snapshot_date = ? AND mid = ?;",
+            (snapshot_date, mid),
+        )
         cur.execute(
             """
             INSERT INTO account_snapshots (
                 snapshot_date, follower,
                 total_view, total_like, total_coin,
-                total_favorite, total_reply, total_danmaku, total_share
-            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?);
+                total_favorite, total_reply, total_danmaku, total_share, mid
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?);
             """,
             (
                 snapshot_date,
@@ -184,32 +394,52 @@ def run_snapshot(snapshot_date: str | None = None) -> None:
                 total_reply,
                 total_dm,
                 total_share,
+                mid,
             ),
         )
+        bump_data_version(cur, mid)
     except Exception as e:
         print(
             f"[error] 写入 account_snapshots 失败: {repr(e)}。"
         )
         failed_list.append({"bvid": None, "title": "account_snapshot", "reason": f"db_insert_failed: {e}"})
 
+    finish_run(cur, run_id)
     conn.commit()
+
+    print(f"{tag} 步骤 6：播放异常检测与短期预测")
+    try:
+        found = detect_anomalies(cur, mid, snapshot_date)
+        conn.commit()
+        print(
+            f"{tag} 检测视频 {found['videos']} 条，异常 {found['anomalies']} 条，"
+            f"耗时 {found['elapsed_ms']:.0f}ms。"
+        )
+    except Exception as e:
+        conn.rollback()
+        print(f"[error] 播放异常检测失败: {repr(e)}，不影响本次快照结果。")
     conn.close()
 
     # 汇总日志
-    print("[snapshot] 步骤 6：汇总本次快照结果")
+    print(f"{tag} 步骤 7：汇总本次快照结果")
     print(
-        f"[snapshot] 本次 snapshot_date={snapshot_date} 处理完毕："
+        f"{tag} 本次 snapshot_date={snapshot_date} 处理完毕："
         f"成功 {success_count} 条，失败 {len(failed_list)} 条。"
     )
     print(
-        f"[snapshot] 汇总账号维度：total_view={total_view}, "
+        f"{tag} 汇总账号维度：total_view={total_view}, "
         f"follower={follower}, total_like={total_like}, "
         f"total_coin={total_coin}, total_favorite={total_fav}, "
         f"total_reply={total_reply}, total_danmaku={total_dm}, total_share={total_share}"
     )
 
+    breaker_trips = BREAKER.trips - trips_start
+    if breaker_trips:
+        # 多账号并发时各账号共用一个熔断器，其中可能包含其他账号的请求引发的熔断
+        print(f"{tag} 本次运行期间（全局）熔断器触发 {breaker_trips} 次。")
+
     if failed_list:
-        print("[snapshot] 失败明细列表：")
+        print(f"{tag} 失败明细列表：")
         for item in failed_list:
             bvid = item.get("bvid")
             title = item.get("title") or ""
@@ -219,10 +449,113 @@ def run_snapshot(snapshot_date: str | None = None) -> None:
                 f"  - bvid={bvid or 'N/A'}，标题=\"{short_title}\"，原因={reason}"
             )
     else:
-        print("[snapshot] 本次无任何失败视频。")
+        print(f"{tag} 本次无任何失败视频。")
 
     print("=" * 80)
+    return {
+        "snapshot_date": snapshot_date,
+        "success": success_count,
+        "failed": len(failed_list),
+        "fetched": total_archives,
+        "run_id": run_id,
+        "mid": mid,
+        "breaker_trips": breaker_trips,
+    }
+
+
+
+def run_all_snapshots(snapshot_date: str | None = None,
+                      adaptive: bool = False,
+                      budget: int | None = None,
+                      resume: bool = False,
+                      mids: List[str] | None = None,
+                      workers: int | None = None) -> Dict[str, Any]:
+    """
+    对所有已配置账号（或 mids 指定的账号）执行快照：每个账号一个线程并发抓取，
+    所有请求共用 bili_api 的全局限流器、熔断器与凭据池；单个账号失败不影响其他账号。
+    budget 为每个账号的拉取上限。汇总中的 credentials 为本次运行期间各凭据的请求数、健康度与利用率，
+    breaker_trips 为本次运行期间共享熔断器新增的熔断次数（各账号汇总中的同名字段同样只计该账号运行期间的增量）。
+    """
+    targets = [get_account(m)["mid"] for m in mids] if mids else [a["mid"] for a in ACCOUNTS]
+    init_db()
+    POOL.reset_stats()
+    trips_start = BREAKER.trips
+
+    def one(mid: str) -> Dict[str, Any]:
+        try:
+            return run_snapshot(snapshot_date=snapshot_date, adaptive=adaptive,
+                                budget=budget, resume=resume, mid=mid)
+        except Exception as e:
+            print(f"[error] 账号 mid={mid} 快照失败: {e!r}")
+            return {"snapshot_date": snapshot_date, "success": 0, "failed": 0, "fetched": 0,
+                    "mid": mid, "error": repr(e)}
+
+    workers = max(1, min(workers or SNAPSHOT_WORKERS, len(targets)))
+    t0 = time.perf_counter()
+    if workers == 1:
+        results = [one(m) for m in targets]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="snapshot") as pool:
+            results = list(pool.map(one, targets))
+    elapsed = time.perf_counter() - t0
+
+    summary: Dict[str, Any] = {
+        "accounts": {r["mid"]: r for r in results},
+        "success": sum(r.get("success") or 0 for r in results),
+        "failed": sum(r.get("failed") or 0 for r in results),
+        "fetched": sum(r.get("fetched") or 0 for r in results),
+        "breaker_trips": BREAKER.trips - trips_start,
+        "rate_limit_wait": round(RATE_LIMITER.waited, 3),
+        "elapsed": round(elapsed, 3),
+        "credentials": POOL.stats(),
+    }
+    if len(targets) > 1:
+        print(
+            f"[snapshot] {len(targets)} 个账号快照完成（{workers} 线程，耗时 {elapsed:.1f}s）："
+            f"成功 {summary['success']} 条，失败 {summary['failed']} 条，"
+            f"限流等待累计 {RATE_LIMITER.waited:.1f}s。"
+        )
+    for c in summary["credentials"]:
+        util = f"{c['utilization']:.0%}" if c["utilization"] is not None else "不限速"
+        print(
+            f"[snapshot] 凭据 {c['name']}：请求 {c['requests']} 次，失败 {c['failures']} 次，"
+            f"健康度 {c['health']:.2f}，利用率 {util}"
+            f"{'，隔离中' if c['quarantined'] else ''}"
+        )
+    return summary
 
 
 if __name__ == "__main__":
-    run_snapshot()
+    parser = argparse.ArgumentParser(description="拉取 B 站投稿与账号数据并写入快照")
+    parser.add_argument("--adaptive", action="store_true",
+                        help="只刷新已到期的视频（按发布时长与增速自适应），其余沿用旧快照")
+    parser.add_argument("--budget", type=int, default=None,
+                        help="自适应模式下每个账号本轮最多拉取的视频数")
+    parser.add_argument("--resume", action="store_true",
+                        help="从最近一次未完成的快照任务断点继续")
+    parser.add_argument("--run-id", type=int, default=None,
+                        help="配合 --resume 指定要恢复的任务（需同时指定 --mid，默认账号除外）")
+    parser.add_argument("--mid", action="append", default=None,
+                        help="只处理指定账号，可重复；默认处理 config 中的全部账号")
+    parser.add_argument("--workers", type=int, default=None,
+                        help=f"并发抓取的账号数（默认 {SNAPSHOT_WORKERS}）")
+    args = parser.parse_args()
+    if args.run_id is not None:
+        if not args.resume:
+            parser.error("--run-id 需要配合 --resume 使用")
+        if args.mid and len(args.mid) > 1:
+            parser.error("--run-id 只能配合一个 --mid 使用")
+        target_mid = get_account((args.mid or [None])[0])["mid"]
+        init_db()
+        conn = get_conn()
+        owner = run_owner(conn.cursor(), args.run_id)
+        conn.close()
+        if owner is None:
+            parser.error(f"快照任务 run_id={args.run_id} 不存在")
+        if owner != target_mid:
+            parser.error(f"快照任务 run_id={args.run_id} 属于账号 {owner}，请同时指定 --mid {owner}")
+        run_snapshot(adaptive=args.adaptive, budget=args.budget, resume=True,
+                     run_id=args.run_id, mid=target_mid)
+    else:
+        run_all_snapshots(adaptive=args.adaptive, budget=args.budget, resume=args.resume,
+                          mids=args.mid, workers=args.workers)
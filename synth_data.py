@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# synth_data.py
+#
+# 生成仿真快照数据库（N 个视频 × M 天），供各项性能基准复用。
+# 单视频播放量按“发布初期快速增长、之后趋于饱和 + 长尾”曲线生成，
+# 互动量按各自的转化率随机波动，账号维度为当日所有视频的汇总。
+#
+# 用法：
+#   python synth_data.py --videos 1000 --days 365 --out bench/data/synth.db
+
+import argparse
+import time
+from datetime import date, datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+import numpy as np
+
+from bulk_import import bulk_insert
+
+SYNTH_DIR = Path("bench") / "data"
+
+
+def iter_synthetic_records(n_videos: int,
+                           n_days: int,
+                           seed: int = 42,
+                           end_date: date | None = None) -> Iterator[Dict[str, Any]]:
+    rng = np.random.default_rng(seed)
+    end_date = end_date or date(2025, 12, 31)
+    start_date = end_date - timedelta(days=n_days - 1)
+
+    # 约 1/3 视频发布于统计窗口之前，其余在窗口内均匀发布
+    pub_offset = rng.integers(-n_days // 2, n_days, size=n_videos)
+    pub_days = np.sort(pub_offset)
+    start_ts = int(datetime(start_date.year, start_date.month, start_date.day,
+                            tzinfo=timezone.utc).timestamp())
+    pubdate = start_ts + pub_days * 86400 + rng.integers(8 * 3600, 23 * 3600, size=n_videos)
+
+    # 曲线参数：饱和总量（对数正态，少数爆款）、增长时间常数、长尾日增
+    ceiling = rng.lognormal(mean=8.5, sigma=1.4, size=n_videos)
+    tau = rng.uniform(1.5, 6.0, size=n_videos)
+    tail = ceiling * rng.uniform(0.0005, 0.003, size=n_videos)
+
+    rates = {
+        "like": rng.beta(4, 60, size=n_videos),
+        "coin": rng.beta(2, 80, size=n_videos),
+        "favorite": rng.beta(3, 70, size=n_videos),
+        "reply": rng.beta(1.5, 300, size=n_videos),
+        "danmaku": rng.beta(1.5, 200, size=n_videos),
+        "share": rng.beta(1.2, 400, size=n_videos),
+    }
+    duration = rng.integers(30, 1800, size=n_videos)
+    bvids = [f"BV1sy{i:07d}" for i in range(n_videos)]
+    titles = [f"合成视频 #{i} 的标题" for i in range(n_videos)]
+
+    view = np.zeros(n_videos, dtype=np.int64)
+    counters = {k: np.zeros(n_videos, dtype=np.int64) for k in rates}
+    follower = 1000.0
+
+    for d in range(n_days):
+        snapshot_date = (start_date + timedelta(days=d)).isoformat()
+        age = d - pub_days
+        live = age >= 0
+
+        target = ceiling * (1.0 - np.exp(-(age.clip(min=0) + 1) / tau)) + tail * age.clip(min=0)
+        noise = rng.normal(1.0, 0.03, size=n_videos).clip(0.9, 1.1)
+        view = np.maximum(view, (target * noise).astype(np.int64)) * live
+
+        for k, r in rates.items():
+            counters[k] = np.maximum(counters[k], (view * r).astype(np.int64)) * live
+
+        idx = np.nonzero(live)[0]
+        for i in idx:
+            yield {
+                "snapshot_date": snapshot_date,
+                "bvid": bvids[i],
+                "title": titles[i],
+                "view": int(view[i]),
+                "like": int(counters["like"][i]),
+                "coin": int(counters["coin"][i]),
+                "favorite": int(counters["favorite"][i]),
+                "reply": int(counters["reply"][i]),
+                "danmaku": int(counters["danmaku"][i]),
+                "share": int(counters["share"][i]),
+                "pubdate": int(pubdate[i]),
+                "duration": int(duration[i]),
+            }
+
+        daily_view = int(view.sum())
+        follower += max(0.0, rng.normal(0.002, 0.001)) * (daily_view ** 0.5) + 1
+        yield {
+            "snapshot_date": snapshot_date,
+            "follower": int(follower),
+            "total_view": daily_view,
+            "total_like": int(counters["like"].sum()),
+            "total_coin": int(counters["coin"].sum()),
+            "total_favorite": int(counters["favorite"].sum()),
+            "total_reply": int(counters["reply"].sum()),
+            "total_danmaku": int(counters["danmaku"].sum()),
+            "total_share": int(counters["share"].sum()),
+        }
+
+
+def generate_database(out: Path,
+                      n_videos: int,
+                      n_days: int,
+                      seed: int = 42,
+                      overwrite: bool = False) -> Path:
+    out = Path(out)
+    if out.exists():
+        if not overwrite:
+            return out
+        out.unlink()
+    out.parent.mkdir(parents=True, exist_ok=True)
+
+    t0 = time.perf_counter()
+    stats = bulk_insert(iter_synthetic_records(n_videos, n_days, seed), db_path=out, batch_size=20000)
+    print(
+        f"[synth] {out}: {n_videos} 视频 × {n_days} 天，"
+        f"视频快照 {stats['video']} 条，耗时 {time.perf_counter() - t0:.1f}s"
+    )
+    return out
+
+
+def synthetic_db(n_videos: int, n_days: int, seed: int = 42) -> Path:
+    """
+    基准脚本统一入口：按规模缓存在 bench/data/ 下，已存在则直接复用。
+    """
+    path = SYNTH_DIR / f"synth_{n_videos}x{n_days}_s{seed}.db"
+    return generate_database(path, n_videos, n_days, seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="生成仿真快照数据库")
+    parser.add_argument("--videos", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", type=Path, default=None)
+    parser.add_argument("--overwrite", action="store_true")
+    args = parser.parse_args()
+
+    out = args.out or SYNTH_DIR / f"synth_{args.videos}x{args.days}_s{args.seed}.db"
+    generate_database(out, args.videos, args.days, args.seed, overwrite=args.overwrite)
+
+
+if __name__ == "__main__":
+    main()
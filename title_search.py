@@ -0,0 +1,153 @@
+# title_search.py
+#
+# 视频标题全文检索：video_titles 保存每个 (mid, bvid) 的当前标题，
+# video_titles_fts 为其外部内容（external content）FTS5 索引，使用 trigram 分词，
+# 中文无需分词即可按任意连续 3 个字以上的片段匹配；由触发器随 video_titles 的增删改自动同步。
+# run_snapshot 每写入一条视频快照即调用 sync_title，标题修改后立即反映到检索结果。
+# SQLite 不支持 FTS5 / trigram（3.34 以下）时只建 video_titles，检索回退为 LIKE。
+
+import sqlite3
+from typing import Any, Dict, List
+
+# trigram 分词下少于 3 个字符的词无法走索引，改用 LIKE 过滤
+MIN_TRIGRAM_LEN = 3
+
+# 外部内容表的同步触发器：删除旧内容须以 'delete' 命令写入原标题
+_TRIGGERS = (
+    """
+    CREATE TRIGGER IF NOT EXISTS video_titles_ai AFTER INSERT ON video_titles BEGIN
+        INSERT INTO video_titles_fts (rowid, title) VALUES (new.id, new.title);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS video_titles_ad AFTER DELETE ON video_titles BEGIN
+        INSERT INTO video_titles_fts (video_titles_fts, rowid, title) VALUES ('delete', old.id, old.title);
+    END;
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS video_titles_au AFTER UPDATE OF title ON video_titles BEGIN
+        INSERT INTO video_titles_fts (video_titles_fts, rowid, title) VALUES ('delete', old.id, old.title);
+        INSERT INTO video_titles_fts (rowid, title) VALUES (new.id, new.title);
+    END;
+    """,
+)
+
+
+def create_tables(cur: sqlite3.Cursor) -> bool:
+    """
+    建表与同步触发器，返回 FTS5 索引是否可用。
+    """
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS video_titles (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            mid TEXT NOT NULL,
+            bvid TEXT NOT NULL,
+            title TEXT NOT NULL DEFAULT '',
+            UNIQUE (mid, bvid)
+        );
+        """
+    )
+    try:
+        cur.execute(
+            """
+            CREATE VIRTUAL TABLE IF NOT EXISTS video_titles_fts USING fts5(
+                title, content='video_titles', content_rowid='id', tokenize='trigram'
+            );
+            """
+        )
+    except sqlite3.OperationalError as e:
+        print(f"[db] 当前 SQLite 不支持 FTS5 trigram，标题检索回退为 LIKE: {e}")
+        return False
+
+    for trigger in _TRIGGERS:
+        cur.execute(trigger)
+    return True
+
+
+def fts_available(cur: sqlite3.Cursor) -> bool:
+    cur.execute("SELECT 1 FROM sqlite_master WHERE name = 'video_titles_fts';")
+    return cur.fetchone() is not None
+
+
+def sync_title(cur: sqlite3.Cursor, mid: str, bvid: str, title: str) -> None:
+    """
+    写入或更新一个视频的标题；标题未变化时不触发索引更新。
+    """
+    cur.execute(
+        """
+        INSERT INTO video_titles (mid, bvid, title) VALUES (?, ?, ?)
+        ON CONFLICT(mid, bvid) DO UPDATE SET title = excluded.title
+        WHERE video_titles.title != excluded.title;
+        """,
+        (mid, bvid, title or ""),
+    )
+
+
+def refresh_titles(cur: sqlite3.Cursor) -> None:
+    """
+    以 video_snapshots 中每个视频最近一次采样的标题刷新 video_titles（旧库首次升级、批量导入之后使用）。
+    """
+    # SQLite 中 MAX() 聚合时裸列 title 取自最大值所在行，即每个视频的最后一次采样
+    cur.execute(
+        """
+        INSERT INTO video_titles (mid, bvid, title)
+        SELECT mid, bvid, title FROM (
+            SELECT mid, bvid, COALESCE(title, '') AS title, MAX(snapshot_ts)
+            FROM video_snapshots
+            WHERE mid IS NOT NULL
+            GROUP BY mid, bvid
+        ) WHERE true
+        ON CONFLICT(mid, bvid) DO UPDATE SET title = excluded.title
+        WHERE video_titles.title != excluded.title;
+        """
+    )
+
+
+def _like_pattern(term: str) -> str:
+    escaped = term.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def search(cur: sqlite3.Cursor, mid: str, q: str, limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    按空白切分查询词，所有词都需出现在标题中（不区分大小写）。
+    3 个字符以上的词走 FTS5 索引并按 bm25 相关度排序；较短的词及不支持 FTS5 时用 LIKE 过滤。
+    """
+    terms = [t for t in q.split() if t]
+    if not terms:
+        return []
+    long_terms = [t for t in terms if len(t) >= MIN_TRIGRAM_LEN]
+    short_terms = [t for t in terms if len(t) < MIN_TRIGRAM_LEN]
+
+    use_fts = bool(long_terms) and fts_available(cur)
+    like_terms = short_terms if use_fts else terms
+    like_sql = "".join(" AND t.title LIKE ? ESCAPE '\\'" for _ in like_terms)
+    like_params = [_like_pattern(t) for t in like_terms]
+
+    if use_fts:
+        # 每个词作为短语（双引号内的双引号需成对转义），多个词之间为 AND
+        match = " AND ".join('"' + t.replace('"', '""') + '"' for t in long_terms)
+        cur.execute(
+            f"""
+            SELECT t.bvid AS bvid, t.title AS title, t.mid AS mid, f.rank AS score
+            FROM video_titles_fts f
+            JOIN video_titles t ON t.id = f.rowid
+            WHERE video_titles_fts MATCH ? AND t.mid = ?{like_sql}
+            ORDER BY f.rank
+            LIMIT ?;
+            """,
+            (match, mid, *like_params, limit),
+        )
+    else:
+        cur.execute(
+            f"""
+            SELECT t.bvid AS bvid, t.title AS title, t.mid AS mid, NULL AS score
+            FROM video_titles t
+            WHERE t.mid = ?{like_sql}
+            ORDER BY length(t.title) ASC, t.id DESC
+            LIMIT ?;
+            """,
+            (mid, *like_params, limit),
+        )
+    return [dict(r) for r in cur.fetchall()]